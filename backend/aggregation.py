@@ -0,0 +1,96 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PREDICTION_COLUMNS = ['nb_sentiment', 'svm_sentiment', 'bert_sentiment']
+RAW_DATA_COLUMNS = ['text', 'cleaned_text', 'nb_sentiment', 'svm_sentiment', 'bert_sentiment']
+WORDCLOUD_SENTIMENTS = ['positive', 'negative', 'neutral']
+WORDCLOUD_MAX_WORDS = 100
+
+
+class SentimentAggregator:
+    """
+    Running summary of classified posts, from which the analysis response is built.
+
+    Keeps only counts per (NB, SVM, BERT) label combination, per-day BERT
+    counts, the first unique words per sentiment and (optionally) the first
+    `raw_data_limit` rows, so its size does not grow with the number of posts.
+    With `topics` (see topics.py), topics per sentiment are fitted as posts arrive.
+    Adding a DataFrame in chunks gives the same result as adding it at once.
+    """
+
+    def __init__(self, raw_data_limit: Optional[int] = None, topics=None):
+        self.raw_data_limit = raw_data_limit
+        self.topics = topics  # optional topics.SentimentTopics, fed every chunk
+        self.total = 0
+        self.combinations: Counter = Counter()  # (nb, svm, bert) -> posts
+        self.daily: Dict[Any, Counter] = {}  # date -> BERT label counts
+        self.has_timestamp = False
+        self.words: Dict[str, Dict[str, None]] = {s: {} for s in WORDCLOUD_SENTIMENTS}
+        self.raw_data: List[Dict[str, Any]] = []
+        self.escalated: Optional[int] = None  # posts sent to BERT, when classified in cascade mode
+        self.escalated_combinations: Counter = Counter()  # (nb, svm, bert) -> escalated posts
+
+    def add(self, df: pd.DataFrame, feature_rows=None):
+        """Aggregate classified posts; `feature_rows` (classical.FeatureRows of `df`) is reused by topics."""
+        if df.empty:
+            return
+        self.total += len(df)
+
+        if 'escalated' in df.columns:
+            escalated = df['escalated'].fillna(False).astype(bool)
+            self.escalated = (self.escalated or 0) + int(escalated.sum())
+            for combination, count in df[escalated].groupby(PREDICTION_COLUMNS).size().items():
+                self.escalated_combinations[combination] += int(count)
+
+        for combination, count in df.groupby(PREDICTION_COLUMNS).size().items():
+            self.combinations[combination] += int(count)
+
+        if 'timestamp' in df.columns:
+            self.has_timestamp = True
+            dates = pd.to_datetime(df['timestamp'], errors='coerce').dt.date
+            for (date, sentiment), count in df.groupby([dates, df['bert_sentiment']]).size().items():
+                self.daily.setdefault(date, Counter())[sentiment] += int(count)
+
+        for sentiment, words in self.words.items():
+            if len(words) >= WORDCLOUD_MAX_WORDS:
+                continue
+            for word in ' '.join(df.loc[df['bert_sentiment'] == sentiment, 'cleaned_text']).split():
+                words.setdefault(word, None)
+                if len(words) >= WORDCLOUD_MAX_WORDS:
+                    break
+
+        if self.topics is not None:
+            self.topics.add(df, feature_rows)
+
+        remaining = len(df) if self.raw_data_limit is None else self.raw_data_limit - len(self.raw_data)
+        if remaining > 0:
+            rows = df.head(remaining).reindex(columns=RAW_DATA_COLUMNS, fill_value='')
+            self.raw_data.extend(rows.to_dict('records'))
+
+    def counts(self, model_column: str) -> Counter:
+        """Label counts for one model ('nb_sentiment', 'svm_sentiment' or 'bert_sentiment')."""
+        position = PREDICTION_COLUMNS.index(model_column)
+        counts = Counter()
+        for combination, count in self.combinations.items():
+            counts[combination[position]] += count
+        return counts
+
+    def label_pairs(self, model_column: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (BERT labels, model labels, weights) for weighted sklearn metrics against BERT.
+        In cascade mode only escalated posts carry a label of BERT's own (the rest
+        keep the SVM label), so only they are compared.
+        """
+        position = PREDICTION_COLUMNS.index(model_column)
+        combinations = self.escalated_combinations if self.escalated is not None else self.combinations
+        items = list(combinations.items())
+        y_true = np.array([combination[2] for combination, _ in items], dtype=object)
+        y_pred = np.array([combination[position] for combination, _ in items], dtype=object)
+        weights = np.array([count for _, count in items], dtype=float)
+        return y_true, y_pred, weights
+
+    def words_for_sentiment(self, sentiment: str) -> List[str]:
+        return list(self.words.get(sentiment, {}))
@@ -1,98 +1,319 @@
 import pandas as pd
 import numpy as np
-import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from sklearn.feature_extraction.text import TfidfVectorizer
-import joblib
 import torch
-from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import BertTokenizerFast, BertForSequenceClassification
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import os
+import hashlib
+import logging
+from concurrent.futures.process import BrokenProcessPool
 
-# Ensure NLTK data is available
-nltk.download('stopwords')
-nltk.download('wordnet')
+from . import cascade, parallel
+from .bert_batching import BERT_BATCH_SIZE, BatchEncoder, length_sorted_batches, pad_batch
+from .classical import CLASSICAL_FEATURES, MODEL_MMAP, FeatureRows, load_classical_models
+from .embedding_store import EMBEDDING_STORE, EMBEDDING_STORE_DIR, EmbeddingHead, EmbeddingStore
+from .model_registry import LEGACY_VERSION, MODEL_REGISTRY_DIR, ModelBundle, ModelManifest, ModelRegistry
+from .preprocessing import clean_text
+from .tracing import stage
 
 # --- Paths to Pre-trained Models and Vectorizer ---
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
 PLOTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'plots')
 
-NB_MODEL_PATH = os.path.join(MODELS_DIR, 'naive_bayes_model.pkl')
-SVM_MODEL_PATH = os.path.join(MODELS_DIR, 'svm_model.pkl')
-BERT_MODEL_PATH = os.path.join(MODELS_DIR, 'bert_model.pth')
-VECTORIZER_PATH = os.path.join(MODELS_DIR, 'tfidf_vectorizer.pkl')
+
+logger = logging.getLogger(__name__)
+
+# Parallel mode runs the classical models in worker processes and BERT on a thread (see parallel.py)
+model_executors = parallel.ModelExecutors()
+if parallel.PARALLEL_ANALYSIS:
+    torch.set_num_threads(parallel.torch_thread_budget())
+
+# --- Model Versions ---
+def file_fingerprint(path):
+    """Short content hash of a model file (None if the file is missing)."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
 
 # --- Load Models and Vectorizer ---
-nb_model = joblib.load(NB_MODEL_PATH)
-svm_model = joblib.load(SVM_MODEL_PATH)
-vectorizer = joblib.load(VECTORIZER_PATH)
-
-# Load BERT model and tokenizer
-bert_tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-# Try to load the saved model first to determine the number of labels
-try:
-    saved_state = torch.load(BERT_MODEL_PATH, map_location=torch.device('cpu'))
-    # Check the shape of classifier.weight to determine num_labels
-    classifier_weight_shape = saved_state['classifier.weight'].shape
-    num_labels = classifier_weight_shape[0]  # First dimension is num_labels
-    print(f"Detected {num_labels} labels from saved BERT model")
-    
-    bert_model = BertForSequenceClassification.from_pretrained('bert-base-uncased', num_labels=num_labels)
-    bert_model.load_state_dict(saved_state)
-    bert_model.eval()
-except Exception as e:
-    print(f"Error loading BERT model: {e}")
-    print("Using default BERT model without pre-trained weights")
-    bert_model = BertForSequenceClassification.from_pretrained('bert-base-uncased', num_labels=3)
-    bert_model.eval()
-
-# --- Text Preprocessing ---
-def clean_text(text):
-    lemmatizer = WordNetLemmatizer()
-    stop_words = set(stopwords.words('english'))
-    text = re.sub(r'http\S+', '', text)  # Remove URLs
-    text = re.sub(r'[^a-zA-Z\s]', '', text)  # Remove non-alphabetic characters
-    text = text.lower()  # Convert to lowercase
-    words = text.split()
-    words = [lemmatizer.lemmatize(word) for word in words if word not in stop_words]
-    return ' '.join(words)
+def load_bert_model(path):
+    # Try to load the saved model first to determine the number of labels
+    try:
+        if MODEL_MMAP:
+            # Tensors stay backed by the file's pages, shared by every process that maps it
+            saved_state = torch.load(path, map_location=torch.device('cpu'), mmap=True, weights_only=True)
+        else:
+            saved_state = torch.load(path, map_location=torch.device('cpu'))
+        # Check the shape of classifier.weight to determine num_labels
+        classifier_weight_shape = saved_state['classifier.weight'].shape
+        num_labels = classifier_weight_shape[0]  # First dimension is num_labels
+        print(f"Detected {num_labels} labels from saved BERT model")
+        
+        bert_model = BertForSequenceClassification.from_pretrained('bert-base-uncased', num_labels=num_labels)
+        # assign=True keeps the memory-mapped tensors instead of copying them into fresh parameters
+        bert_model.load_state_dict(saved_state, assign=MODEL_MMAP)
+        bert_model.eval()
+    except Exception as e:
+        print(f"Error loading BERT model: {e}")
+        print("Using default BERT model without pre-trained weights")
+        bert_model = BertForSequenceClassification.from_pretrained('bert-base-uncased', num_labels=3)
+        bert_model.eval()
+    return bert_model
+
+def bert_sentiment_map(bert_model):
+    # Dynamic sentiment mapping based on number of labels
+    if bert_model.num_labels == 2:
+        return {0: 'negative', 1: 'positive'}
+    return {0: 'negative', 1: 'neutral', 2: 'positive'}
+
+def bert_classifier_head(bert_model):
+    """BERT's own classification layer as an `EmbeddingHead` over pooled embeddings."""
+    sentiment_map = bert_sentiment_map(bert_model)
+    return EmbeddingHead(classes=[sentiment_map.get(i, 'neutral') for i in range(bert_model.num_labels)],
+                         weight=bert_model.classifier.weight.detach().float().numpy(),
+                         bias=bert_model.classifier.bias.detach().float().numpy(), name="bert")
+
+def load_model_bundle(manifest: ModelManifest) -> ModelBundle:
+    """Load every model of one registry version (see model_registry.py)."""
+    paths = manifest.paths()
+    # Naive Bayes and SVM share one feature matrix per batch (see classical.py)
+    classical_pipeline = load_classical_models(paths, manifest.features)
+    # Rust tokenizer, batch-encoded, with a cache of token ids per cleaned text (see bert_batching.py)
+    bert_tokenizer = BertTokenizerFast.from_pretrained('bert-base-uncased')
+    bert_model = load_bert_model(paths['bert'])
+
+    # Fingerprints of the loaded models; stored predictions are only reused for the same versions
+    versions = {name: file_fingerprint(path) for name, path in classical_pipeline.paths.items()}
+    if "vectorizer" not in versions:
+        versions["vectorizer"] = classical_pipeline.features
+    versions["bert"] = file_fingerprint(paths['bert']) or "bert-base-uncased"
+    if manifest.version != LEGACY_VERSION:
+        versions["release"] = manifest.version
+    # Pooled embeddings per cleaned text, stored per BERT version (see embedding_store.py)
+    embedding_store = None
+    if EMBEDDING_STORE:
+        embedding_store = EmbeddingStore(os.path.join(EMBEDDING_STORE_DIR, versions["bert"]),
+                                         bert_model.config.hidden_size)
+    return ModelBundle(manifest=manifest, versions=versions, models={
+        "classical": classical_pipeline,
+        "bert": bert_model,
+        "bert_encoder": BatchEncoder(bert_tokenizer),
+        "bert_head": bert_classifier_head(bert_model),
+        "embedding_store": embedding_store,
+    })
+
+# Serves the version named in MODEL_REGISTRY_DIR/ACTIVE, or the flat models/ files
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR, load_model_bundle,
+                               legacy=ModelManifest.legacy(MODELS_DIR, CLASSICAL_FEATURES))
+model_registry.active()
+
+def get_model_versions():
+    """Fingerprints of the active models; stored predictions are only reused for the same versions."""
+    return model_registry.active().versions
 
 # --- Prediction Functions ---
-def predict_sentiment_nb_svm(text, model):
+def predict_sentiment_nb_svm(text, model, bundle=None):
+    bundle = bundle or model_registry.active()
     cleaned_text = clean_text(text)
-    vectorized_text = vectorizer.transform([cleaned_text])
+    vectorized_text = bundle.models['classical'].vectorizer.transform([cleaned_text])
     prediction = model.predict(vectorized_text)
     return prediction[0]
 
-def predict_sentiment_bert(text):
-    cleaned_text = clean_text(text)
-    inputs = bert_tokenizer(cleaned_text, return_tensors='pt', truncation=True, padding=True, max_length=128)
-    with torch.no_grad():
-        outputs = bert_model(**inputs)
-    prediction = torch.argmax(outputs.logits, dim=1).item()
-    
-    # Dynamic sentiment mapping based on number of labels
-    if bert_model.num_labels == 2:
-        sentiment_map = {0: 'negative', 1: 'positive'}
-    else:
-        sentiment_map = {0: 'negative', 1: 'neutral', 2: 'positive'}
-    
-    return sentiment_map.get(prediction, 'neutral')
+def encode_bert_batch(cleaned_texts, batch_size=BERT_BATCH_SIZE, bundle=None):
+    """
+    Pooled BERT embeddings (the classifier's input) for cleaned texts. Texts are
+    grouped by token length and each batch is padded only to its longest member.
+    """
+    bundle = bundle or model_registry.active()
+    bert_model, bert_encoder = bundle.models['bert'], bundle.models['bert_encoder']
+    sequences = bert_encoder.encode(cleaned_texts)
+    embeddings = np.zeros((len(sequences), bert_model.config.hidden_size), dtype=np.float32)
+    for positions in length_sorted_batches([len(ids) for ids in sequences], batch_size):
+        input_ids, attention_mask = pad_batch([sequences[i] for i in positions], bert_encoder.pad_id)
+        with torch.no_grad():
+            outputs = bert_model.bert(input_ids=torch.from_numpy(input_ids),
+                                      attention_mask=torch.from_numpy(attention_mask))
+        embeddings[positions] = outputs.pooler_output.float().numpy()
+    return embeddings
+
+def embed_texts(cleaned_texts, batch_size=BERT_BATCH_SIZE, bundle=None, use_store=True):
+    """
+    Pooled BERT embeddings for cleaned texts. With the embedding store on, stored
+    texts are read from it and only the others go through the encoder (and are added).
+    """
+    bundle = bundle or model_registry.active()
+    store = bundle.models['embedding_store'] if use_store else None
+    cleaned_texts = list(cleaned_texts)
+    if store is None:
+        return encode_bert_batch(cleaned_texts, batch_size, bundle)
+    rows = store.lookup(cleaned_texts)
+    missing = np.flatnonzero(rows < 0)
+    embeddings = np.zeros((len(cleaned_texts), store.dim), dtype=np.float32)
+    found = rows >= 0
+    if found.any():
+        embeddings[found] = store.vectors(rows[found])
+    if len(missing):
+        missing_texts = list(dict.fromkeys(cleaned_texts[i] for i in missing))
+        fresh = encode_bert_batch(missing_texts, batch_size, bundle)
+        store.add(missing_texts, fresh)
+        # Rounded like the stored copy, so a text gets the same result on every run
+        fresh_rows = {text: row for row, text in enumerate(missing_texts)}
+        embeddings[missing] = fresh.astype(np.float16)[[fresh_rows[cleaned_texts[i]] for i in missing]]
+    return embeddings
+
+def predict_sentiment_bert_batch(cleaned_texts, batch_size=BERT_BATCH_SIZE, bundle=None, use_store=True):
+    """BERT labels and confidences for cleaned texts: pooled embeddings through BERT's classifier."""
+    bundle = bundle or model_registry.active()
+    embeddings = embed_texts(cleaned_texts, batch_size, bundle, use_store)
+    return bundle.models['bert_head'].predict_with_confidence(embeddings)
+
+def predict_sentiment_bert_with_confidence(text, bundle=None):
+    labels, confidences = predict_sentiment_bert_batch([clean_text(text)], bundle=bundle)
+    return labels[0], confidences[0]
+
+def predict_sentiment_bert(text, bundle=None):
+    return predict_sentiment_bert_with_confidence(text, bundle)[0]
 
 # --- Main Analysis Function ---
-def run_analysis(df: pd.DataFrame):
-    df['cleaned_text'] = df['text'].apply(clean_text)
+PREDICTION_COLUMNS = ['nb_sentiment', 'svm_sentiment', 'bert_sentiment']
+CONFIDENCE_COLUMNS = ['nb_confidence', 'svm_confidence', 'bert_confidence']
+
+def run_analysis(df: pd.DataFrame, trace=None, with_confidence=False, cascade_threshold=None, bundle=None,
+                 feature_rows=None):
+    """
+    Clean and classify posts with all three models.
+    Rows that already carry predictions (materialized corpora, see materialize.py)
+    are kept as they are; only the remaining rows are classified.
+    With a cascade threshold (or CASCADE_MODE), only posts the classical models
+    are unsure about go to BERT and an `escalated` column marks them (see cascade.py).
+    All models come from one registry bundle (the active one unless given), whose
+    release and fingerprints are stored in `df.attrs['model_versions']`.
+    The classical feature rows computed on the way are recorded in `feature_rows`
+    (a classical.FeatureRows over the rows of `df`), if given.
+    """
+    bundle = bundle or model_registry.active()
+    df.attrs['model_versions'] = bundle.describe()
+    if set(PREDICTION_COLUMNS) <= set(df.columns):
+        pending = df[PREDICTION_COLUMNS].isna().any(axis=1)
+        if not pending.any():
+            return df
+        produced = ['cleaned_text'] + PREDICTION_COLUMNS + CONFIDENCE_COLUMNS + ['escalated']
+        subset = df.loc[pending, [c for c in df.columns if c not in produced]].copy()
+        subset_features = FeatureRows(len(subset)) if feature_rows is not None else None
+        subset = run_analysis(subset, trace=trace, with_confidence=with_confidence,
+                              cascade_threshold=cascade_threshold, bundle=bundle, feature_rows=subset_features)
+        if feature_rows is not None:
+            feature_rows.merge(subset_features, np.flatnonzero(pending.to_numpy()))
+        columns = [c for c in produced if c in subset.columns]
+        for column in columns:
+            if column not in df.columns:
+                df[column] = None
+            df[column] = df[column].astype(object)
+        df.loc[pending, columns] = subset[columns].to_numpy()
+        return df
+
+    rows = len(df)
+    with stage(trace, "preprocessing", rows):
+        # Columnar corpora (see ingest.py) carry a precomputed cleaned_text column
+        if 'cleaned_text' not in df.columns:
+            df['cleaned_text'] = df['text'].apply(clean_text)
     
-    # Get predictions
-    df['nb_sentiment'] = df['text'].apply(lambda x: predict_sentiment_nb_svm(x, nb_model))
-    df['svm_sentiment'] = df['text'].apply(lambda x: predict_sentiment_nb_svm(x, svm_model))
-    df['bert_sentiment'] = df['text'].apply(predict_sentiment_bert)
+    cascade_threshold = cascade.resolve_threshold(cascade_threshold)
+    if cascade_threshold is not None:
+        run_cascade_passes(df, cascade_threshold, trace, with_confidence, bundle, feature_rows)
+    elif parallel.PARALLEL_ANALYSIS and rows >= parallel.PARALLEL_MIN_ROWS:
+        run_model_passes_parallel(df, trace, with_confidence, bundle, feature_rows)
+    else:
+        run_classical_pass(df, trace, with_confidence, bundle, feature_rows)
+        assign_bert_results(df, run_bert_pass(df['cleaned_text'], with_confidence, trace, bundle))
     
     return df
 
+def run_classical_pass(df: pd.DataFrame, trace=None, with_confidence=False, bundle=None, feature_rows=None):
+    """Naive Bayes and SVM in this thread; the models share one sparse feature matrix."""
+    classical_pipeline = (bundle or model_registry.active()).models['classical']
+    rows = len(df)
+    with stage(trace, "vectorize", rows):
+        features = classical_pipeline.transform(df['cleaned_text'])
+    if feature_rows is not None:
+        feature_rows.add(np.arange(rows), features)
+    for name, model in classical_pipeline.models.items():
+        with stage(trace, name, rows):
+            df[model.column] = model.predict(features)
+            if with_confidence:
+                df[model.confidence_column] = model.confidence(features)
+
+def run_bert_pass(cleaned_texts, with_confidence=False, trace=None, bundle=None):
+    """BERT labels, and confidences (None unless requested), for cleaned texts."""
+    cleaned_texts = list(cleaned_texts)
+    with stage(trace, "bert", len(cleaned_texts)):
+        labels, confidences = predict_sentiment_bert_batch(cleaned_texts, bundle=bundle)
+    return labels, confidences if with_confidence else None
+
+def assign_bert_results(df: pd.DataFrame, results):
+    labels, confidences = results
+    df['bert_sentiment'] = labels
+    if confidences is not None:
+        df['bert_confidence'] = confidences
+
+def run_cascade_passes(df: pd.DataFrame, threshold, trace=None, with_confidence=False, bundle=None,
+                       feature_rows=None):
+    """Classical models on every post, BERT only on the escalated ones (see cascade.py)."""
+    bundle = bundle or model_registry.active()
+    classical_pipeline = bundle.models['classical']
+    run_classical_pass(df, trace, True, bundle, feature_rows)
+    gate = classical_pipeline.models[cascade.CASCADE_GATE_MODEL]
+    with stage(trace, "cascade_gate", len(df)) as record:
+        if cascade.CASCADE_REQUIRE_AGREEMENT:
+            escalated = cascade.escalation_mask(df[gate.confidence_column], threshold,
+                                                df['nb_sentiment'], df['svm_sentiment'])
+        else:
+            escalated = cascade.escalation_mask(df[gate.confidence_column], threshold)
+        record["escalated"] = int(escalated.sum())
+    labels = df[gate.column].to_numpy(dtype=object)
+    confidences = df[gate.confidence_column].to_numpy(dtype=float)
+    bert_labels, bert_confidences = run_bert_pass(df.loc[escalated, 'cleaned_text'], True, trace, bundle)
+    labels[escalated] = bert_labels
+    confidences[escalated] = bert_confidences
+    df['escalated'] = escalated
+    assign_bert_results(df, (list(labels), list(confidences) if with_confidence else None))
+    if not with_confidence:
+        df.drop(columns=[m.confidence_column for m in classical_pipeline.models.values()], inplace=True)
+
+def run_model_passes_parallel(df: pd.DataFrame, trace=None, with_confidence=False, bundle=None,
+                              feature_rows=None):
+    """
+    Run the classical models in a worker process and BERT on a thread at the
+    same time. Falls back to the in-process classical pass if the pool broke.
+    Features computed in the worker stay there, so `feature_rows` is only
+    filled by the fallback.
+    """
+    bundle = bundle or model_registry.active()
+    spec = model_executors.model_spec(bundle.models['classical'])
+    with stage(trace, "model_passes", len(df)):
+        bert_future = model_executors.submit_bert(run_bert_pass, df['cleaned_text'].tolist(), with_confidence,
+                                                  trace, bundle)
+        try:
+            with stage(trace, "classical", len(df)):
+                classical_columns = model_executors.submit_classical(
+                    spec, df['cleaned_text'].tolist(), with_confidence).result()
+        except BrokenProcessPool:
+            logger.exception("Classical model workers failed; classifying in-process")
+            model_executors.reset_classical()
+            classical_columns = None
+        if classical_columns is None:
+            run_classical_pass(df, trace, with_confidence, bundle, feature_rows)
+        else:
+            for column, values in classical_columns.items():
+                df[column] = values
+        assign_bert_results(df, bert_future.result())
+
 # --- Visualization Functions ---
 def generate_wordcloud(df: pd.DataFrame, sentiment: str):
     if not os.path.exists(PLOTS_DIR):
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+import pandas as pd
+import tweepy
+
+from .twitter_client import (
+    MAX_PAGE_SIZE, MIN_PAGE_SIZE, RATE_LIMIT_INITIAL_BACKOFF, RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_MAX_WAIT, TwitterClient,
+)
+
+logger = logging.getLogger(__name__)
+
+TWITTER_API_URL = os.getenv("TWITTER_API_URL", "https://api.twitter.com")
+SEARCH_ROUTE = "/2/tweets/search/recent"
+
+# Connection pool and timeout settings for the shared HTTP client
+TWITTER_HTTP_TIMEOUT = float(os.getenv("TWITTER_HTTP_TIMEOUT", "10"))
+TWITTER_HTTP_CONNECT_TIMEOUT = float(os.getenv("TWITTER_HTTP_CONNECT_TIMEOUT", "5"))
+TWITTER_HTTP_MAX_CONNECTIONS = int(os.getenv("TWITTER_HTTP_MAX_CONNECTIONS", "20"))
+TWITTER_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("TWITTER_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+
+def http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional `h2` package."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class AsyncTwitterClient:
+    """
+    Non-blocking Twitter recent-search client built on one pooled `httpx.AsyncClient`.
+
+    Connections are kept alive (HTTP/2 when `h2` is installed) and shared by
+    every request in the process. Results go through tweepy's response
+    parsing and `TwitterClient`'s DataFrame conversion, so `search_tweets`
+    and `preprocess_tweets_dataframe` return exactly what the sync client does.
+    """
+
+    def __init__(self, bearer_token: Optional[str] = None, base_url: str = TWITTER_API_URL,
+                 timeout: float = TWITTER_HTTP_TIMEOUT, connect_timeout: float = TWITTER_HTTP_CONNECT_TIMEOUT,
+                 max_connections: int = TWITTER_HTTP_MAX_CONNECTIONS, http2: bool = True,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.bearer_token = bearer_token or os.getenv('TWITTER_BEARER_TOKEN')
+        if not self.bearer_token:
+            raise ValueError("TWITTER_BEARER_TOKEN not found in environment variables")
+
+        # Reuse the sync client's tweet parsing and text preprocessing
+        self._parser = TwitterClient(client=tweepy.Client(bearer_token=self.bearer_token))
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {self.bearer_token}", "User-Agent": "sentiment-analysis-api"},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=TWITTER_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            http2=http2 and http2_available(),
+            transport=transport,
+        )
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def search_tweets(self, query: str, max_results: int = 100, since_id: int = None) -> pd.DataFrame:
+        """Async counterpart of `TwitterClient.search_tweets` (same DataFrame columns)."""
+        chunks = [chunk async for chunk in self.iter_tweet_pages(query, total=max_results, since_id=since_id)
+                  if not chunk.empty]
+        if not chunks:
+            logger.warning(f"No English tweets found for query: {query}")
+            return pd.DataFrame(columns=['id', 'text', 'created_at', 'author_id', 'username'])
+
+        df = pd.concat(chunks, ignore_index=True)
+        logger.info(f"Successfully fetched {len(df)} tweets for query: {query}")
+        return df
+
+    async def iter_tweet_pages(self, query: str, total: int = 100, page_size: int = MAX_PAGE_SIZE,
+                               since_id: int = None) -> AsyncIterator[pd.DataFrame]:
+        """Async counterpart of `TwitterClient.iter_tweet_pages`; prefetches the next page."""
+        total = max(total, MIN_PAGE_SIZE)
+        page_size = min(max(page_size, MIN_PAGE_SIZE), MAX_PAGE_SIZE)
+
+        def request_page(next_token, remaining):
+            return asyncio.ensure_future(
+                self._fetch_page(query, min(page_size, max(remaining, MIN_PAGE_SIZE)), next_token, since_id)
+            )
+
+        fetched = 0
+        pending = request_page(None, total)
+        try:
+            while pending is not None:
+                tweets = await pending
+                pending = None
+
+                remaining = total - fetched
+                page_count = len(tweets.data) if tweets.data else 0
+                fetched += page_count
+                next_token = (tweets.meta or {}).get('next_token')
+                if next_token and page_count and fetched < total:
+                    pending = request_page(next_token, total - fetched)
+
+                yield self._parser._tweets_to_dataframe(tweets).head(remaining)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _fetch_page(self, query: str, max_results: int, next_token: str = None, since_id: int = None):
+        """One recent-search call with the same rate-limit retry policy as the sync client."""
+        params = {
+            'query': query,
+            'max_results': max_results,
+            'tweet.fields': 'created_at,author_id,public_metrics,lang',
+            'expansions': 'author_id',
+            'user.fields': 'username,name',
+        }
+        if next_token:
+            params['next_token'] = next_token
+        if since_id:
+            params['since_id'] = since_id
+
+        backoff = RATE_LIMIT_INITIAL_BACKOFF
+        waited = 0.0
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            try:
+                response = await self.http.get(SEARCH_ROUTE, params=params)
+            except httpx.HTTPError as e:
+                logger.error(f"Error fetching tweets: {str(e)}")
+                raise Exception(f"Failed to fetch tweets from Twitter API: {str(e)}")
+
+            if response.status_code == 429:
+                reset = response.headers.get('x-rate-limit-reset')
+                wait = max(float(reset) - time.time(), 0) + 1 if reset else backoff
+                if attempt == RATE_LIMIT_MAX_RETRIES or waited + wait > RATE_LIMIT_MAX_WAIT:
+                    logger.error("Twitter API rate limit exceeded")
+                    raise Exception("Twitter API rate limit exceeded. Please try again later.")
+                logger.warning(f"Twitter API rate limit hit, retrying in {wait:.1f}s")
+                await asyncio.sleep(wait)
+                waited += wait
+                backoff *= 2
+                continue
+
+            self._raise_for_status(response)
+            return self._parser.client._construct_response(response.json(), data_type=tweepy.Tweet)
+
+    def _raise_for_status(self, response: httpx.Response):
+        """Report API errors with the same messages as `TwitterClient`."""
+        if response.status_code == 401:
+            logger.error("Twitter API unauthorized - check bearer token")
+            raise Exception("Twitter API authentication failed. Please check your bearer token.")
+        if response.status_code == 404:
+            logger.error("Twitter API endpoint not found")
+            raise Exception("Twitter API endpoint not found.")
+        if not 200 <= response.status_code < 300:
+            logger.error(f"Error fetching tweets: HTTP {response.status_code}")
+            raise Exception(f"Failed to fetch tweets from Twitter API: {response.status_code} {response.reason_phrase}")
+
+    def preprocess_tweets_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Same preprocessing as `TwitterClient.preprocess_tweets_dataframe`."""
+        return self._parser.preprocess_tweets_dataframe(df)
+
+
+_async_client: Optional[AsyncTwitterClient] = None
+
+
+def get_async_twitter_client() -> AsyncTwitterClient:
+    """
+    Process-wide async client (one connection pool).
+    Honours TWITTER_STUB_URL so it can run against the local API stub.
+    """
+    global _async_client
+    if _async_client is None:
+        stub_url = os.getenv('TWITTER_STUB_URL')
+        if stub_url:
+            _async_client = AsyncTwitterClient(bearer_token="stub-token", base_url=stub_url)
+        else:
+            _async_client = AsyncTwitterClient()
+    return _async_client
+
+
+async def close_async_twitter_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
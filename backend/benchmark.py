@@ -0,0 +1,318 @@
+"""
+Reproducible performance benchmarks for the sentiment pipeline.
+
+Usage:
+    python -m backend.benchmark --sizes 1000 10000 100000 --output bench.json
+    python -m backend.benchmark --sizes 1000 --compare bench.json --tolerance 0.15
+
+Synthetic corpora are generated deterministically from sample_tweets.csv, so two
+runs with the same --seed measure exactly the same inputs. Results are written as
+JSON and can be compared between commits; --compare exits non-zero on regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DATA_PATH = os.path.join(BASE_DIR, "sample_tweets.csv")
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Per-call latency is measured on at most this many rows per case
+LATENCY_SAMPLE = 2000
+# BERT is orders of magnitude slower than everything else; cap its corpus
+BERT_ROW_LIMIT = 1000
+
+
+# --- Synthetic corpora ---
+def load_seed_texts(path: str = SAMPLE_DATA_PATH) -> List[str]:
+    """Load and normalise the seed texts from the sample CSV."""
+    df = pd.read_csv(path)
+    column = 'text' if 'text' in df.columns else 'Text'
+    return [str(text).strip() for text in df[column].dropna()]
+
+
+def make_corpus(seed_texts: List[str], size: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Build a deterministic synthetic corpus of `size` rows. Each row splices two
+    seed texts together so the vocabulary mix varies like real traffic does.
+    """
+    rng = np.random.default_rng(seed + size)
+    first = rng.integers(0, len(seed_texts), size)
+    second = rng.integers(0, len(seed_texts), size)
+    start = pd.Timestamp("2023-01-01")
+    offsets = rng.integers(0, 60 * 24 * 30, size)
+
+    texts = []
+    for a, b in zip(first, second):
+        head = seed_texts[a].split()
+        tail = seed_texts[b].split()
+        texts.append(' '.join(head[:max(1, len(head) // 2 + 1)] + tail[len(tail) // 2:]))
+
+    return pd.DataFrame({
+        'text': texts,
+        'timestamp': start + pd.to_timedelta(offsets, unit='m'),
+    })
+
+
+# --- Measurement helpers ---
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux only, best effort)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the last reset, in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux and bytes on macOS; it cannot be reset
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def percentile_ms(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    return round(float(np.percentile(samples, q)) * 1000, 4)
+
+
+def measure(name: str, rows: int, batch: Callable[[], Any],
+            per_call: Optional[Callable[[Any], Any]] = None,
+            per_call_inputs: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Time one benchmark case.
+
+    `batch` processes the whole corpus once and determines throughput and peak
+    RSS. `per_call` (optional) is timed individually over `per_call_inputs` to
+    produce the latency percentiles.
+    """
+    latencies = []
+    if per_call is not None:
+        for item in per_call_inputs or []:
+            start = time.perf_counter()
+            per_call(item)
+            latencies.append(time.perf_counter() - start)
+
+    reset_peak_rss()
+    start = time.perf_counter()
+    batch()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "case": name,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "throughputRowsPerSec": round(rows / elapsed, 2) if elapsed > 0 else None,
+        "p50Ms": percentile_ms(latencies, 50),
+        "p99Ms": percentile_ms(latencies, 99),
+        "peakRssMb": round(peak_rss_mb(), 1),
+    }
+    print(f"  {name:<28} rows={rows:<7} {result['seconds']:>9.3f}s "
+          f"{result['throughputRowsPerSec'] or 0:>12.1f} rows/s p50={result['p50Ms']} p99={result['p99Ms']}")
+    return result
+
+
+# --- Benchmark cases ---
+def run_benchmarks(sizes: List[int], seed: int = 42, skip_bert: bool = False,
+                   bert_limit: int = BERT_ROW_LIMIT) -> List[Dict[str, Any]]:
+    # Imported lazily: loading the models dominates start-up time
+    os.environ.setdefault('TWITTER_BEARER_TOKEN', 'benchmark')
+    from . import analysis, chart_generator, pdf_generator
+    from .routes import build_analysis_response
+    from .similarity import SimilarityIndex
+    from .twitter_client import TwitterClient
+
+    twitter_client = TwitterClient()
+    classical_pipeline = analysis.model_registry.active().models['classical']
+    classical_models = classical_pipeline.models
+    nb_model, svm_model = classical_models['naive_bayes'].estimator, classical_models['svm'].estimator
+    seed_texts = load_seed_texts()
+    results = []
+
+    for size in sizes:
+        print(f"Corpus: {size} rows")
+        corpus = make_corpus(seed_texts, size, seed)
+        texts = corpus['text'].tolist()
+        sample = texts[:LATENCY_SAMPLE]
+
+        results.append(measure(
+            "clean_text", size,
+            lambda: [analysis.clean_text(t) for t in texts],
+            analysis.clean_text, sample
+        ))
+        results.append(measure(
+            "clean_tweet_text", size,
+            lambda: [twitter_client.clean_tweet_text(t) for t in texts],
+            twitter_client.clean_tweet_text, sample
+        ))
+        results.append(measure(
+            "naive_bayes", size,
+            lambda: [analysis.predict_sentiment_nb_svm(t, nb_model) for t in texts],
+            lambda t: analysis.predict_sentiment_nb_svm(t, nb_model), sample
+        ))
+        results.append(measure(
+            "svm", size,
+            lambda: [analysis.predict_sentiment_nb_svm(t, svm_model) for t in texts],
+            lambda t: analysis.predict_sentiment_nb_svm(t, svm_model), sample
+        ))
+        # Shared-CSR path used by run_classical_pass: one vectorization for all classical models
+        # (compare with naive_bayes + svm, which clean and vectorize every post once per model)
+        def classify_classical(batch):
+            return classical_pipeline.predict(classical_pipeline.transform([analysis.clean_text(t) for t in batch]))
+
+        results.append(measure(
+            "classical_shared", size,
+            lambda: classify_classical(texts),
+            lambda t: classify_classical([t]), sample
+        ))
+
+        # Similar-post search: index build once, then per-query latency
+        posts = [{'cleaned_text': analysis.clean_text(t)} for t in texts]
+        similarity_index = {}
+        results.append(measure(
+            "similarity_build", size,
+            lambda: similarity_index.setdefault("index", SimilarityIndex.build(posts, classical_pipeline.transform))
+        ))
+        queries = [post['cleaned_text'] for post in posts[:LATENCY_SAMPLE // 10]]
+        results.append(measure(
+            "similarity_query", len(queries),
+            lambda: [similarity_index["index"].similar_to_text(q) for q in queries],
+            similarity_index["index"].similar_to_text, queries
+        ))
+
+        bert_texts = texts[:bert_limit]
+        if not skip_bert:
+            results.append(measure(
+                "bert", len(bert_texts),
+                lambda: [analysis.predict_sentiment_bert(t) for t in bert_texts],
+                analysis.predict_sentiment_bert, bert_texts[:min(len(bert_texts), 200)]
+            ))
+            # Batched path used by run_analysis: length-sorted, dynamically padded, token-id cache
+            cleaned_bert_texts = [analysis.clean_text(t) for t in bert_texts]
+            analysis.model_registry.active().models['bert_encoder'].cache.clear()
+            results.append(measure(
+                "bert_batched", len(bert_texts),
+                lambda: analysis.predict_sentiment_bert_batch(cleaned_bert_texts, use_store=False)
+            ))
+
+        # End-to-end run_analysis on the (BERT-capped) corpus
+        analysed = {}
+        e2e = corpus.head(bert_limit).copy()
+        results.append(measure(
+            "run_analysis", len(e2e),
+            lambda: analysed.setdefault("df", analysis.run_analysis(e2e))
+        ))
+
+        response = build_analysis_response(analysed["df"], "benchmark", "benchmark").dict()
+        results.append(measure(
+            "chart_generation", len(e2e),
+            lambda: [
+                chart_generator.create_sentiment_distribution_chart(response["sentimentDistribution"]),
+                chart_generator.create_model_accuracy_chart(response["modelComparison"]),
+                chart_generator.create_sentiment_by_model_chart(response["sentimentCounts"]),
+                chart_generator.create_time_series_chart(response["timeSeriesData"]),
+            ]
+        ))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, "benchmark.pdf")
+            results.append(measure(
+                "pdf_generation", len(e2e),
+                lambda: pdf_generator.create_analysis_pdf_report(response, pdf_path)
+            ))
+
+    return results
+
+
+# --- Reporting ---
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                    tolerance: float) -> List[str]:
+    """Return a description of every case that got slower than `tolerance` allows."""
+    baseline_by_key = {(r["case"], r["rows"]): r for r in baseline}
+    regressions = []
+    for result in current:
+        previous = baseline_by_key.get((result["case"], result["rows"]))
+        if not previous or not previous.get("seconds"):
+            continue
+        change = (result["seconds"] - previous["seconds"]) / previous["seconds"]
+        if change > tolerance:
+            regressions.append(
+                f"{result['case']} ({result['rows']} rows): "
+                f"{previous['seconds']:.3f}s -> {result['seconds']:.3f}s (+{change:.0%})"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment analysis pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes to run")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for corpus generation")
+    parser.add_argument("--skip-bert", action="store_true", help="Skip the standalone BERT case")
+    parser.add_argument("--bert-limit", type=int, default=BERT_ROW_LIMIT,
+                        help="Maximum rows for BERT and end-to-end cases")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed slowdown before a case counts as a regression (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, seed=args.seed, skip_bert=args.skip_bert, bert_limit=args.bert_limit)
+    report = {
+        "createdAt": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline["results"], args.tolerance)
+        if regressions:
+            print("Performance regressions detected:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Token-id caching and length-aware batching for BERT inference.
+
+Cleaned texts are encoded with the (Rust) fast tokenizer in one batch call
+per group of cache misses; the resulting id sequences are kept in a bounded
+LRU cache, so repeated posts (retweets, monitors re-reading a feed, cascade
+re-runs) are not tokenized again. Batches are formed from texts of similar
+length and padded only to their longest member instead of `max_length`,
+which removes most of the padding work on short posts.
+
+This module does not import torch; `pad_batch` returns numpy arrays.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BERT_MAX_LENGTH = 128
+BERT_BATCH_SIZE = int(os.getenv("BERT_BATCH_SIZE", "32"))
+BERT_TOKEN_CACHE_SIZE = int(os.getenv("BERT_TOKEN_CACHE_SIZE", "50000"))
+
+
+class TokenCache:
+    """Bounded, thread-safe LRU cache of cleaned text -> token ids."""
+
+    def __init__(self, maxsize: int = BERT_TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[Tuple[int, ...]]:
+        with self._lock:
+            ids = self._entries.get(text)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return ids
+
+    def put(self, text: str, ids: Sequence[int]):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[text] = tuple(ids)
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class BatchEncoder:
+    """Encodes texts to unpadded token ids through a tokenizer and a `TokenCache`."""
+
+    def __init__(self, tokenizer, cache: Optional[TokenCache] = None, max_length: int = BERT_MAX_LENGTH):
+        self.tokenizer = tokenizer
+        self.cache = TokenCache() if cache is None else cache
+        self.max_length = max_length
+        # Fast tokenizers are not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    @property
+    def pad_id(self) -> int:
+        return self.tokenizer.pad_token_id or 0
+
+    def encode(self, texts: Iterable[str]) -> List[Tuple[int, ...]]:
+        texts = list(texts)
+        encoded: List[Optional[Tuple[int, ...]]] = [self.cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, ids in zip(texts, encoded) if ids is None))
+        if missing:
+            with self._lock:
+                input_ids = self.tokenizer(missing, truncation=True, max_length=self.max_length,
+                                           padding=False)['input_ids']
+            fresh = {text: tuple(ids) for text, ids in zip(missing, input_ids)}
+            for text, ids in fresh.items():
+                self.cache.put(text, ids)
+            encoded = [ids if ids is not None else fresh[text] for text, ids in zip(texts, encoded)]
+        return encoded
+
+
+def length_sorted_batches(lengths: Sequence[int], batch_size: int = BERT_BATCH_SIZE) -> List[np.ndarray]:
+    """Positions grouped into batches of similar length (results must be scattered back by position)."""
+    order = np.argsort(np.asarray(lengths), kind='stable')
+    return [order[i:i + batch_size] for i in range(0, len(order), max(1, batch_size))]
+
+
+def pad_batch(sequences: Sequence[Sequence[int]], pad_id: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """(input_ids, attention_mask) padded to the longest sequence in the batch."""
+    width = max((len(ids) for ids in sequences), default=0)
+    input_ids = np.full((len(sequences), width), pad_id, dtype=np.int64)
+    attention_mask = np.zeros((len(sequences), width), dtype=np.int64)
+    for i, ids in enumerate(sequences):
+        input_ids[i, :len(ids)] = ids
+        attention_mask[i, :len(ids)] = 1
+    return input_ids, attention_mask
@@ -0,0 +1,139 @@
+"""
+Confidence-gated cascade: classify every post with the cheap TF-IDF models
+and escalate only the uncertain ones to BERT.
+
+A post is escalated when the gating model's confidence (SVM by default, see
+`ClassicalModel.confidence`) is below the threshold, or when Naive Bayes and
+SVM disagree (CASCADE_REQUIRE_AGREEMENT). Other posts keep the gating
+model's label as their final (`bert_sentiment`) label. Raising the threshold
+escalates more posts: higher cost, accuracy closer to BERT.
+
+Enable it with CASCADE_MODE=true (threshold CASCADE_THRESHOLD) or per request
+with `cascadeThreshold`. Choose a threshold on labelled data with
+
+    python -m backend.cascade evaluate sample_tweets.csv --label-column sentiment
+
+which reports accuracy and the escalated fraction per threshold next to the
+reference numbers in results/evaluation_results.json.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+CASCADE_MODE = os.getenv("CASCADE_MODE", "false").lower() in ("1", "true", "yes")
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.6"))
+CASCADE_GATE_MODEL = os.getenv("CASCADE_GATE_MODEL", "svm")
+CASCADE_REQUIRE_AGREEMENT = os.getenv("CASCADE_REQUIRE_AGREEMENT", "true").lower() in ("1", "true", "yes")
+
+EVALUATION_RESULTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'results', 'evaluation_results.json')
+DEFAULT_THRESHOLDS = (0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def resolve_threshold(threshold: Optional[float]) -> Optional[float]:
+    """The cascade threshold to use for a call: explicit, else the server default when CASCADE_MODE is on."""
+    if threshold is not None:
+        return float(threshold)
+    return CASCADE_THRESHOLD if CASCADE_MODE else None
+
+
+def escalation_mask(confidence: Iterable[float], threshold: float,
+                    nb_labels: Optional[Iterable[str]] = None,
+                    svm_labels: Optional[Iterable[str]] = None) -> np.ndarray:
+    """True for posts that need BERT: low gating confidence or (when labels are given) NB/SVM disagreement."""
+    escalate = np.asarray(confidence, dtype=float) < threshold
+    if nb_labels is not None and svm_labels is not None:
+        escalate |= np.asarray(list(nb_labels), dtype=object) != np.asarray(list(svm_labels), dtype=object)
+    return escalate
+
+
+def score(y_true: List[str], y_pred: List[str]) -> Dict[str, float]:
+    """Weighted metrics in the format of results/evaluation_results.json."""
+    return {
+        "Accuracy": accuracy_score(y_true, y_pred),
+        "Precision": precision_score(y_true, y_pred, average='weighted', zero_division=0),
+        "Recall": recall_score(y_true, y_pred, average='weighted', zero_division=0),
+        "F1-Score": f1_score(y_true, y_pred, average='weighted', zero_division=0),
+    }
+
+
+def evaluate_thresholds(labels, gate_labels, gate_confidence, bert_labels, thresholds: Iterable[float],
+                        nb_labels=None, svm_labels=None) -> List[Dict[str, float]]:
+    """
+    Cascade metrics per threshold, from predictions of every model on every post
+    (each threshold is simulated without re-running the models).
+    """
+    labels = list(labels)
+    gate_labels = np.asarray(list(gate_labels), dtype=object)
+    bert_labels = np.asarray(list(bert_labels), dtype=object)
+    rows = []
+    for threshold in thresholds:
+        escalate = escalation_mask(gate_confidence, threshold, nb_labels, svm_labels)
+        final = np.where(escalate, bert_labels, gate_labels)
+        rows.append({"threshold": threshold, "escalatedFraction": float(escalate.mean()) if len(escalate) else 0.0,
+                     **score(labels, list(final))})
+    return rows
+
+
+def load_reference_results(path: str = EVALUATION_RESULTS_PATH) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the cascade's accuracy/cost trade-off on labelled posts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    evaluate = subparsers.add_parser("evaluate", help="Evaluate thresholds on a labelled CSV")
+    evaluate.add_argument("data", help="CSV with text and label columns")
+    evaluate.add_argument("--label-column", default="sentiment")
+    evaluate.add_argument("--thresholds", type=float, nargs="+", default=list(DEFAULT_THRESHOLDS))
+    evaluate.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from . import analysis
+    from .corpus import CorpusIndex
+
+    df = CorpusIndex.normalize_columns(pd.read_csv(args.data))
+    df = df.dropna(subset=[args.label_column]).reset_index(drop=True)
+    labels = df[args.label_column].str.lower().tolist()
+    # Every model on every post once; thresholds are then simulated
+    bundle = analysis.model_registry.active()
+    df = analysis.run_analysis(df.drop(columns=[args.label_column]), with_confidence=True, cascade_threshold=2.0,
+                               bundle=bundle)
+    gate = bundle.models['classical'].models[CASCADE_GATE_MODEL]
+    agreement = (df['nb_sentiment'], df['svm_sentiment']) if CASCADE_REQUIRE_AGREEMENT else (None, None)
+
+    results = {
+        "modelVersion": bundle.version,
+        "reference": load_reference_results(),
+        "measured": {
+            "Naive Bayes": score(labels, df['nb_sentiment'].tolist()),
+            "SVM": score(labels, df['svm_sentiment'].tolist()),
+            "BERT": score(labels, df['bert_sentiment'].tolist()),
+        },
+        "cascade": evaluate_thresholds(labels, df[gate.column], df[gate.confidence_column], df['bert_sentiment'],
+                                       args.thresholds, *agreement),
+    }
+
+    reference_bert = results["reference"].get("BERT", {}).get("Accuracy")
+    print(f"{len(labels)} labelled posts; BERT accuracy {results['measured']['BERT']['Accuracy']:.3f} here"
+          + (f", {reference_bert:.3f} in evaluation_results.json" if reference_bert is not None else ""))
+    print(f"{'threshold':>9}  {'escalated':>9}  {'accuracy':>8}  {'f1':>6}")
+    for row in results["cascade"]:
+        print(f"{row['threshold']:>9.2f}  {row['escalatedFraction']:>9.1%}  {row['Accuracy']:>8.3f}  {row['F1-Score']:>6.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Classical (sparse, linear) sentiment models sharing one feature matrix.
+
+Texts are vectorized once per batch and the CSR matrix is passed to every
+registered model. Features come from the fitted TF-IDF vectorizer, or with
+CLASSICAL_FEATURES=hashing from a stateless `HashingVectorizer` (no
+vocabulary to load or keep in sync); hashing-feature models are trained with
+
+    python -m backend.classical train-hashing sample_tweets.csv --label-column sentiment
+
+This module does not import torch, so it is cheap to load in worker processes.
+"""
+import argparse
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+CLASSICAL_FEATURES = os.getenv("CLASSICAL_FEATURES", "tfidf").lower()
+HASHING_N_FEATURES = 2 ** 18
+# Memory-map model arrays read-only, so worker processes share one copy through the page cache
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() in ("1", "true", "yes")
+
+MODEL_FILES = {
+    "tfidf": {
+        "vectorizer": "tfidf_vectorizer.pkl",
+        "naive_bayes": "naive_bayes_model.pkl",
+        "svm": "svm_model.pkl",
+    },
+    "hashing": {
+        "naive_bayes": "naive_bayes_hashing_model.pkl",
+        "svm": "svm_hashing_model.pkl",
+    },
+}
+# Output column per built-in model
+MODEL_COLUMNS = {"naive_bayes": "nb_sentiment", "svm": "svm_sentiment"}
+
+
+def make_hashing_vectorizer() -> HashingVectorizer:
+    # Non-negative features so MultinomialNB can use them
+    return HashingVectorizer(n_features=HASHING_N_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm='l2')
+
+
+class ClassicalModel:
+    """A fitted scikit-learn classifier applied to a precomputed feature matrix."""
+
+    def __init__(self, name: str, estimator, column: str):
+        self.name = name
+        self.estimator = estimator
+        self.column = column
+
+    @property
+    def confidence_column(self) -> str:
+        return self.column.replace('_sentiment', '_confidence')
+
+    def predict(self, features: sparse.csr_matrix) -> np.ndarray:
+        if features.shape[0] == 0:
+            return np.array([], dtype=object)
+        return self.estimator.predict(features)
+
+    def confidence(self, features: sparse.csr_matrix) -> np.ndarray:
+        """Probability of the predicted class (softmax over decision values for margin classifiers)."""
+        if features.shape[0] == 0:
+            return np.array([], dtype=float)
+        if hasattr(self.estimator, 'predict_proba'):
+            return self.estimator.predict_proba(features).max(axis=1)
+        scores = np.asarray(self.estimator.decision_function(features), dtype=float)
+        if scores.ndim == 1:
+            return 1.0 / (1.0 + np.exp(-np.abs(scores)))
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return (scores / scores.sum(axis=1, keepdims=True)).max(axis=1)
+
+
+class ClassicalPipeline:
+    """One feature extractor shared by any number of classical models."""
+
+    def __init__(self, vectorizer, features: str = "tfidf", paths: Optional[Dict[str, str]] = None):
+        self.vectorizer = vectorizer
+        self.features = features
+        self.paths = paths or {}
+        self.models: Dict[str, ClassicalModel] = {}
+
+    def register(self, name: str, estimator, column: Optional[str] = None) -> ClassicalModel:
+        """Add a model; its predictions go to `column` (default `<name>_sentiment`)."""
+        model = ClassicalModel(name, estimator, column or MODEL_COLUMNS.get(name, f"{name}_sentiment"))
+        self.models[name] = model
+        return model
+
+    def transform(self, cleaned_texts: Iterable[str]) -> sparse.csr_matrix:
+        cleaned_texts = list(cleaned_texts)
+        if not cleaned_texts:
+            # TF-IDF refuses empty input; an empty matrix of the right width keeps callers branch-free
+            return sparse.csr_matrix((0, self.n_features))
+        return sparse.csr_matrix(self.vectorizer.transform(cleaned_texts))
+
+    @property
+    def n_features(self) -> int:
+        if hasattr(self.vectorizer, 'vocabulary_'):
+            return len(self.vectorizer.vocabulary_)
+        return self.vectorizer.n_features
+
+    def predict(self, features: sparse.csr_matrix) -> Dict[str, np.ndarray]:
+        """Predictions of every model, keyed by output column."""
+        return {model.column: model.predict(features) for model in self.models.values()}
+
+    def classify(self, cleaned_texts: Iterable[str], with_confidence: bool = False) -> Dict[str, np.ndarray]:
+        """Vectorize once and return every model's predictions (and confidences), keyed by column."""
+        features = self.transform(cleaned_texts)
+        columns = self.predict(features)
+        if with_confidence:
+            for model in self.models.values():
+                columns[model.confidence_column] = model.confidence(features)
+        return columns
+
+
+class FeatureRows:
+    """
+    The feature rows computed while classifying `n_rows` posts, kept by row
+    position so later steps (topic extraction) reuse them instead of
+    vectorizing the posts again. Rows no pass vectorized (stored predictions,
+    classical models run in a worker process) are vectorized on demand.
+    """
+
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+        self._blocks: List[sparse.csr_matrix] = []
+        self._index = np.full(n_rows, -1, dtype=np.int64)  # row of each post in the stacked blocks, -1 if none
+        self._size = 0
+
+    def add(self, positions: np.ndarray, features: sparse.csr_matrix):
+        """Record the feature rows of the posts at `positions`."""
+        self._blocks.append(sparse.csr_matrix(features))
+        self._index[np.asarray(positions, dtype=np.int64)] = np.arange(self._size, self._size + features.shape[0])
+        self._size += features.shape[0]
+
+    def _stacked(self) -> sparse.csr_matrix:
+        if len(self._blocks) > 1:
+            self._blocks = [sparse.vstack(self._blocks, format='csr')]
+        return self._blocks[0]
+
+    def take(self, positions: np.ndarray) -> "FeatureRows":
+        """The rows of the posts at `positions`, in that order, without vectorizing them again."""
+        taken = FeatureRows(len(positions))
+        rows = self._index[np.asarray(positions, dtype=np.int64)]
+        covered = np.flatnonzero(rows >= 0)
+        if len(covered):
+            taken.add(covered, self._stacked()[rows[covered]])
+        return taken
+
+    def merge(self, other: "FeatureRows", positions: np.ndarray):
+        """Add the rows collected for a subset of the posts, whose row i is post `positions[i]` here."""
+        covered = np.flatnonzero(other._index >= 0)
+        if len(covered):
+            self.add(np.asarray(positions)[covered], other._stacked()[other._index[covered]])
+
+    def fill(self, pipeline: "ClassicalPipeline", cleaned_texts: Sequence[str]):
+        """Vectorize the posts (`cleaned_texts`) no pass computed rows for."""
+        missing = np.flatnonzero(self._index < 0)
+        if len(missing):
+            self.add(missing, pipeline.transform(np.asarray(cleaned_texts, dtype=object)[missing]))
+
+    def matrix(self, pipeline: "ClassicalPipeline", cleaned_texts: Sequence[str]) -> sparse.csr_matrix:
+        """Feature rows of all posts (`cleaned_texts`), vectorizing only those no pass computed."""
+        self.fill(pipeline, cleaned_texts)
+        if not self.n_rows:
+            return pipeline.transform([])
+        return self._stacked()[self._index]
+
+
+def load_classical_pipeline(models_dir: str = MODELS_DIR, features: str = CLASSICAL_FEATURES,
+                            mmap: bool = MODEL_MMAP) -> ClassicalPipeline:
+    """Load the vectorizer and models from the standard file names in `models_dir`."""
+    if features not in MODEL_FILES:
+        raise ValueError(f"CLASSICAL_FEATURES must be one of {sorted(MODEL_FILES)}")
+    paths = {name: os.path.join(models_dir, filename) for name, filename in MODEL_FILES[features].items()}
+    return load_classical_models(paths, features, mmap)
+
+
+def load_classical_models(paths: Dict[str, str], features: str = CLASSICAL_FEATURES,
+                          mmap: bool = MODEL_MMAP) -> ClassicalPipeline:
+    """
+    Load the vectorizer and models from explicit paths (other entries, e.g.
+    'bert', are ignored). With `mmap`, numpy arrays inside the pickles
+    (support vectors, log-probabilities, idf) are memory-mapped read-only;
+    this needs uncompressed pickles (joblib.dump without `compress`).
+    """
+    paths = {name: path for name, path in paths.items() if name in MODEL_FILES[features]}
+    mmap_mode = 'r' if mmap else None
+    if features == "hashing":
+        vectorizer = make_hashing_vectorizer()
+    else:
+        vectorizer = joblib.load(paths["vectorizer"], mmap_mode=mmap_mode)
+    pipeline = ClassicalPipeline(vectorizer, features=features, paths=paths)
+    for name in MODEL_COLUMNS:
+        pipeline.register(name, joblib.load(paths[name], mmap_mode=mmap_mode))
+    return pipeline
+
+
+def train_hashing_models(cleaned_texts: Iterable[str], labels: Iterable[str]) -> ClassicalPipeline:
+    """Fit Naive Bayes and a linear SVM on hashed features."""
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.svm import LinearSVC
+
+    pipeline = ClassicalPipeline(make_hashing_vectorizer(), features="hashing")
+    features = pipeline.transform(cleaned_texts)
+    labels = list(labels)
+    pipeline.register("naive_bayes", MultinomialNB().fit(features, labels))
+    pipeline.register("svm", LinearSVC().fit(features, labels))
+    return pipeline
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train the hashing-feature Naive Bayes and SVM models.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train = subparsers.add_parser("train-hashing", help="Train on a labelled CSV")
+    train.add_argument("data", help="CSV with text and label columns")
+    train.add_argument("--label-column", default="sentiment")
+    train.add_argument("--models-dir", default=MODELS_DIR)
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from .corpus import CorpusIndex
+    from .preprocessing import clean_text
+
+    df = CorpusIndex.normalize_columns(pd.read_csv(args.data))
+    df = df.dropna(subset=[args.label_column])
+    pipeline = train_hashing_models(df['text'].map(clean_text), df[args.label_column].str.lower())
+    os.makedirs(args.models_dir, exist_ok=True)
+    for name, filename in MODEL_FILES["hashing"].items():
+        path = os.path.join(args.models_dir, filename)
+        joblib.dump(pipeline.models[name].estimator, path)
+        print(f"Saved {name} to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
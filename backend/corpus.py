@@ -0,0 +1,292 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+# Columns the analysis path needs; other corpus columns are not loaded
+ANALYSIS_COLUMNS = ("text", "cleaned_text", "timestamp")
+TOKEN_INDEX_SUFFIX = ".tokens.arrow"
+
+# token list, offsets into `rows` (len(tokens) + 1), concatenated sorted row ids
+Postings = Tuple[List[str], np.ndarray, np.ndarray]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens used for both indexing and querying."""
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace, for literal phrase matching."""
+    return ' '.join(str(text).lower().split())
+
+
+def columnar_format(path: str) -> Optional[str]:
+    """'arrow' or 'parquet' for columnar corpus files (see ingest.py), else None."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".arrow", ".feather"):
+        return "arrow"
+    if extension == ".parquet":
+        return "parquet"
+    return None
+
+
+def write_token_index(path: str, postings: Postings):
+    """Store postings next to a columnar corpus as an Arrow IPC file (memory-mappable)."""
+    import pyarrow as pa
+
+    tokens, offsets, rows = postings
+    table = pa.table({
+        "token": pa.array(tokens, type=pa.string()),
+        "rows": pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), pa.array(rows, type=pa.int32())),
+    })
+    with pa.OSFile(path + TOKEN_INDEX_SUFFIX, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_token_index(path: str) -> Optional[Postings]:
+    """Memory-map the postings written by `write_token_index`, if present."""
+    import pyarrow as pa
+
+    index_path = path + TOKEN_INDEX_SUFFIX
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+        return None
+    table = pa.ipc.open_file(pa.memory_map(index_path)).read_all()
+    postings = table.column("rows").combine_chunks()
+    return (
+        table.column("token").to_pylist(),
+        postings.offsets.to_numpy(),
+        postings.values.to_numpy(),
+    )
+
+
+def take_rows(table, rows: np.ndarray, columns: Optional[List[str]] = None):
+    """Rows of an Arrow table, taken batch by batch (ChunkedArray.take would concatenate the column)."""
+    import pyarrow as pa
+
+    table = table.select(columns) if columns else table
+    batches = table.to_batches()
+    bounds = np.cumsum([0] + [batch.num_rows for batch in batches])
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) and np.any(np.diff(rows) < 0):
+        order = np.argsort(rows, kind='stable')
+        return take_rows(table, rows[order]).take(pa.array(np.argsort(order)))
+    batch_of_row = np.searchsorted(bounds, rows, side='right') - 1
+    taken = []
+    for i in np.unique(batch_of_row):
+        local = rows[batch_of_row == i] - bounds[i]
+        taken.append(batches[i].take(pa.array(local)))
+    if not taken:
+        return table.schema.empty_table()
+    return pa.Table.from_batches(taken, schema=table.schema)
+
+
+class CorpusSnapshot:
+    """
+    One loaded version of a corpus file with its token index. It is never
+    modified, so rows found by `search` always refer to the same `frame`.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, table=None, postings: Optional[Postings] = None):
+        self.df = df if df is not None else pd.DataFrame(columns=['text'])
+        self.table = table  # pyarrow.Table for columnar files
+        tokens, self.offsets, self.rows = postings or ([], np.zeros(1, dtype=np.int32), np.array([], dtype=np.int32))
+        self.vocabulary: Dict[str, int] = {token: i for i, token in enumerate(tokens)}
+
+    def __len__(self):
+        return self.table.num_rows if self.table is not None else len(self.df)
+
+    def postings(self, token: str) -> Optional[np.ndarray]:
+        i = self.vocabulary.get(token)
+        if i is None:
+            return None
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def texts(self, rows: np.ndarray) -> List[str]:
+        if self.table is not None:
+            return take_rows(self.table, rows, ["text"]).column("text").to_pylist()
+        return self.df['text'].to_numpy()[rows].tolist()
+
+    def search(self, query: str) -> np.ndarray:
+        """Row ids matching a keyword or phrase query (empty array if none)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return np.array([], dtype=np.int32)
+
+        lists = []
+        for token in set(tokens):
+            rows = self.postings(token)
+            if rows is None:
+                return np.array([], dtype=np.int32)
+            lists.append(rows)
+        lists.sort(key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+            if not len(rows):
+                return rows
+
+        phrase = normalize_text(query)
+        if phrase != tokens[0]:
+            rows = np.array([row for row, text in zip(rows, self.texts(rows)) if phrase in normalize_text(text)],
+                            dtype=np.int32)
+        return rows
+
+    def frame(self, rows: Optional[np.ndarray] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """A private copy of the given rows (or of the whole corpus), optionally of the given columns only."""
+        if self.table is not None:
+            table = self.table
+            if columns is not None:
+                table = table.select([c for c in table.column_names if c in columns])
+            table = table if rows is None else take_rows(table, rows)
+            return table.to_pandas()
+        df = self.df if columns is None else self.df[[c for c in self.df.columns if c in columns]]
+        if rows is None:
+            return df.copy()
+        return df.iloc[rows].reset_index(drop=True)
+
+
+class CorpusIndex:
+    """
+    A local tweet file loaded once, with an inverted index from normalized
+    tokens to row ids.
+
+    Keyword queries are answered by intersecting posting lists. Queries with
+    several words or punctuation additionally require the literal (case- and
+    whitespace-insensitive) phrase in the text, checked only on the
+    candidate rows. Query text is never interpreted as a regex.
+    The file is reloaded when its modification time or size changes: the new
+    rows and index are built into a fresh CorpusSnapshot and published with a
+    single assignment, so a reader holding `snapshot()` never sees a mix of
+    both versions.
+
+    CSV files are parsed into memory. Columnar files written by `ingest.py`
+    are memory-mapped (Arrow IPC) and reuse the stored token index, so only
+    the rows a query selects are ever converted to pandas.
+    """
+
+    def __init__(self, path: str, columns: Optional[Iterable[str]] = None):
+        self.path = path
+        self.columns = tuple(columns) if columns else None
+        self.format = columnar_format(path) or "csv"
+        self._snapshot = CorpusSnapshot()
+        self._signature = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """Reload the file if it changed since the last load. Returns True if reloaded."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            if self.format == "csv":
+                df = self._read_csv(self.path, self.columns)
+                snapshot = CorpusSnapshot(df=df, postings=self.build_postings(df['text']))
+            else:
+                table = self._read_columnar(self.path, self.format, self.columns)
+                postings = read_token_index(self.path)
+                if postings is None:
+                    postings = self.build_postings(table.column("text").to_pandas())
+                snapshot = CorpusSnapshot(table=table, postings=postings)
+            self._snapshot = snapshot
+            self._signature = signature
+            self.loads += 1
+        logger.info(f"Indexed {len(snapshot)} rows and {len(snapshot.vocabulary)} tokens from {self.path}")
+        return True
+
+    def snapshot(self) -> CorpusSnapshot:
+        """The current version of the corpus (reloaded first if the file changed)."""
+        self.refresh()
+        return self._snapshot
+
+    @staticmethod
+    def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Lowercase column names, drop index columns and strip padded strings."""
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        df = df.loc[:, ~df.columns.str.startswith('unnamed')].copy()
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].str.strip()
+        df['text'] = df['text'].fillna('').astype(str)
+        return df.reset_index(drop=True)
+
+    @classmethod
+    def _read_csv(cls, path: str, columns: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+        usecols = (lambda c: str(c).strip().lower() in columns) if columns else None
+        return cls.normalize_columns(pd.read_csv(path, usecols=usecols))
+
+    @staticmethod
+    def _read_columnar(path: str, fmt: str, columns: Optional[Tuple[str, ...]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if fmt == "parquet":
+            available = pq.read_schema(path).names
+            selected = [c for c in available if c in columns] if columns else None
+            return pq.read_table(path, columns=selected, memory_map=True)
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if columns:
+            table = table.select([c for c in table.column_names if c in columns])
+        return table
+
+    @staticmethod
+    def build_postings(texts: pd.Series) -> Postings:
+        """Sorted unique row ids per token, built with vectorized pandas/numpy ops."""
+        tokens = texts.str.lower().str.findall(TOKEN_RE).explode().dropna()
+        if tokens.empty:
+            return [], np.zeros(1, dtype=np.int32), np.array([], dtype=np.int32)
+        codes, uniques = pd.factorize(tokens.to_numpy())
+        # One sort over (token code, row id) pairs gives every posting list sorted and deduplicated
+        keys = np.unique(codes.astype(np.int64) * len(texts) + tokens.index.to_numpy())
+        token_codes, rows = np.divmod(keys, len(texts))
+        starts = np.r_[0, np.flatnonzero(np.diff(token_codes)) + 1]
+        offsets = np.r_[starts, len(rows)].astype(np.int32)
+        return list(uniques[token_codes[starts]]), offsets, rows.astype(np.int32)
+
+    def search(self, query: str) -> np.ndarray:
+        """Row ids matching a keyword or phrase query in the current version (see CorpusSnapshot.search)."""
+        return self.snapshot().search(query)
+
+    def frame(self, rows: Optional[np.ndarray] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Rows of the current version. Use one `snapshot()` to pair rows from `search` with a frame."""
+        return self.snapshot().frame(rows, columns)
+
+
+def union_rows(row_sets: Iterable[np.ndarray]) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Sorted union of several row id arrays, and the positions of each array's rows in it."""
+    row_sets = [np.asarray(rows, dtype=np.int64) for rows in row_sets]
+    if not row_sets:
+        return np.array([], dtype=np.int64), []
+    union = np.unique(np.concatenate(row_sets))
+    return union, [np.searchsorted(union, rows) for rows in row_sets]
+
+
+_corpora: Dict[Tuple[str, Optional[Tuple[str, ...]]], CorpusIndex] = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(path: str, columns: Optional[Iterable[str]] = None) -> CorpusIndex:
+    """Process-wide index for a corpus file, loaded on first use."""
+    key = (os.path.realpath(path), tuple(columns) if columns else None)
+    with _corpora_lock:
+        corpus = _corpora.get(key)
+        if corpus is None:
+            corpus = _corpora[key] = CorpusIndex(key[0], columns)
+    corpus.refresh()
+    return corpus
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -17,3 +17,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def ensure_columns(engine, table_name, columns):
+    """
+    Add columns that were introduced after a table was first created
+    (create_all only creates missing tables). `columns` maps name -> SQL type.
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns(table_name)}
+    with engine.begin() as connection:
+        for name, sql_type in columns.items():
+            if name not in existing:
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {sql_type}"))
@@ -0,0 +1,295 @@
+"""
+Persistent store of pooled BERT embeddings and linear heads that classify from them.
+
+With EMBEDDING_STORE=true every BERT pass keeps the pooled encoder output
+(the vector BERT's own classifier reads) for each cleaned text, in a
+float16 array file memory-mapped by all processes plus an index of text ids:
+
+    EMBEDDING_STORE_DIR/<bert fingerprint>/embeddings.f16   rows x hidden size
+    EMBEDDING_STORE_DIR/<bert fingerprint>/ids.u64          one text id per row
+
+Texts that are already stored skip the transformer: BERT's classifier is
+applied to the stored vector, a matrix multiply. Other heads (e.g. a
+logistic regression trained on new labels) work the same way, so
+re-labelling historical posts does not re-encode them:
+
+    python -m backend.embedding_store train-head labelled.csv --label-column sentiment --output models/heads/sentiment.joblib
+    python -m backend.embedding_store relabel dump.csv --head models/heads/sentiment.joblib --output relabelled.csv
+    python -m backend.embedding_store stats
+
+Both files are append-only; a writer holds a file lock, so several worker
+processes can share one store. This module does not import torch.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+EMBEDDING_STORE = os.getenv("EMBEDDING_STORE", "false").lower() in ("1", "true", "yes")
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR",
+                                os.path.join(os.path.dirname(__file__), '..', 'embeddings'))
+
+EMBEDDINGS_NAME = "embeddings.f16"
+IDS_NAME = "ids.u64"
+META_NAME = "meta.json"
+EMBEDDING_DTYPE = np.float16
+
+
+def text_id(text: str) -> int:
+    """64-bit id of a cleaned text."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped float16 embeddings addressed by cleaned text."""
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                stored_dim = json.load(f)["dim"]
+            if stored_dim != dim:
+                raise ValueError(f"Embedding store {directory} holds {stored_dim}-d vectors, not {dim}-d")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim, "dtype": np.dtype(EMBEDDING_DTYPE).name}, f)
+        self._embeddings_path = os.path.join(directory, EMBEDDINGS_NAME)
+        self._ids_path = os.path.join(directory, IDS_NAME)
+        self._lock = threading.Lock()
+        # Text ids in ascending order and the row of each, searched with np.searchsorted:
+        # 16 bytes per stored text, instead of a dict entry per text in every process
+        self._sorted_ids = np.empty(0, dtype=np.uint64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        self._count = 0
+        self._matrix = np.empty((0, dim), dtype=EMBEDDING_DTYPE)
+        with self._lock:
+            self._refresh()
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dim * np.dtype(EMBEDDING_DTYPE).itemsize
+
+    def __len__(self):
+        return self._count
+
+    def _file_rows(self) -> int:
+        # Embeddings are written before ids, so a row exists once its id does
+        try:
+            ids = os.path.getsize(self._ids_path) // 8
+            embeddings = os.path.getsize(self._embeddings_path) // self.row_bytes
+        except FileNotFoundError:
+            return 0
+        return min(ids, embeddings)
+
+    def _refresh(self):
+        """Pick up rows appended since the last call (by this or another process)."""
+        count = self._file_rows()
+        if count <= self._count:
+            return
+        new_ids = np.fromfile(self._ids_path, dtype=np.uint64, count=count - self._count, offset=self._count * 8)
+        order = np.argsort(new_ids, kind='stable')
+        # Merge after equal ids already indexed, so the first row of a text is the one found
+        positions = np.searchsorted(self._sorted_ids, new_ids[order], side='right')
+        self._sorted_ids = np.insert(self._sorted_ids, positions, new_ids[order])
+        self._sorted_rows = np.insert(self._sorted_rows, positions, order + self._count)
+        self._matrix = np.memmap(self._embeddings_path, dtype=EMBEDDING_DTYPE, mode="r", shape=(count, self.dim))
+        self._count = count
+
+    def _find(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each text id, -1 where it is not stored."""
+        if not len(self._sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[positions] == ids, self._sorted_rows[positions], -1)
+
+    def lookup(self, texts: Iterable[str]) -> np.ndarray:
+        """Row of each text in the store, -1 where it is not stored."""
+        ids = np.array([text_id(text) for text in texts], dtype=np.uint64)
+        with self._lock:
+            rows = self._find(ids)
+            if (rows < 0).any() and self._file_rows() > self._count:
+                self._refresh()
+                rows = self._find(ids)
+        return rows
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """Stored embeddings of `rows` as float32."""
+        with self._lock:
+            matrix = self._matrix
+        return np.asarray(matrix[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    def matrix(self) -> np.ndarray:
+        """Read-only view of every stored embedding (float16, memory-mapped)."""
+        with self._lock:
+            return self._matrix
+
+    def add(self, texts: Sequence[str], embeddings: np.ndarray) -> int:
+        """Append the embeddings of texts that are not stored yet; returns the number of new rows."""
+        embeddings = np.asarray(embeddings)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of shape (n, {self.dim}), got {embeddings.shape}")
+        with self._lock, open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            ids = np.array([text_id(text) for text in texts], dtype=np.uint64)
+            fresh: Dict[int, int] = {}
+            for position, (id_, row) in enumerate(zip(ids.tolist(), self._find(ids).tolist())):
+                if row < 0:
+                    fresh.setdefault(id_, position)
+            if not fresh:
+                return 0
+            positions = list(fresh.values())
+            with open(self._embeddings_path, "ab") as f:
+                # Drop rows left without an id by an interrupted write
+                f.truncate(self._count * self.row_bytes)
+                f.write(np.ascontiguousarray(embeddings[positions], dtype=EMBEDDING_DTYPE).tobytes())
+            with open(self._ids_path, "ab") as f:
+                f.truncate(self._count * 8)
+                f.write(np.array(list(fresh), dtype=np.uint64).tobytes())
+            self._refresh()
+            return len(positions)
+
+    def stats(self) -> Dict[str, object]:
+        return {"directory": self.directory, "rows": self._count, "dim": self.dim,
+                "megabytes": round(self._count * self.row_bytes / (1024 * 1024), 2)}
+
+
+@dataclass
+class EmbeddingHead:
+    """A linear classifier over pooled embeddings: softmax(E @ weight.T + bias)."""
+    classes: List[str]
+    weight: np.ndarray  # (n_classes, dim)
+    bias: np.ndarray    # (n_classes,)
+    name: str = "head"
+
+    def scores(self, embeddings: np.ndarray) -> np.ndarray:
+        return np.asarray(embeddings, dtype=np.float32) @ self.weight.T + self.bias
+
+    def predict_with_confidence(self, embeddings: np.ndarray) -> Tuple[List[str], List[float]]:
+        if len(embeddings) == 0:
+            return [], []
+        scores = self.scores(embeddings)
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [self.classes[i] for i in best], probabilities[np.arange(len(best)), best].tolist()
+
+    def predict(self, embeddings: np.ndarray) -> List[str]:
+        return self.predict_with_confidence(embeddings)[0]
+
+    @classmethod
+    def from_logistic_regression(cls, model, name: str = "head") -> "EmbeddingHead":
+        coef = np.asarray(model.coef_, dtype=np.float32)
+        intercept = np.asarray(model.intercept_, dtype=np.float32)
+        if coef.shape[0] == 1:
+            # Binary: sigmoid(w.x + b) equals softmax over [0, w.x + b]
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([np.zeros(1, dtype=np.float32), intercept])
+        return cls(classes=[str(c) for c in model.classes_], weight=coef, bias=intercept, name=name)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str) -> "EmbeddingHead":
+        return joblib.load(path)
+
+
+def train_head(embeddings: np.ndarray, labels: Sequence[str], name: str = "head",
+               C: float = 1.0, max_iter: int = 1000) -> EmbeddingHead:
+    """Fit a logistic-regression head on pooled embeddings."""
+    from sklearn.linear_model import LogisticRegression
+
+    model = LogisticRegression(C=C, max_iter=max_iter)
+    model.fit(np.asarray(embeddings, dtype=np.float32), list(labels))
+    return EmbeddingHead.from_logistic_regression(model, name=name)
+
+
+# --- Command line ---
+def _embed_corpus(path: str) -> Tuple["object", np.ndarray, int]:
+    """Cleaned corpus and its embeddings, encoding only the texts not stored yet."""
+    import pandas as pd
+    from . import analysis
+    from .corpus import CorpusIndex
+
+    df = CorpusIndex.normalize_columns(pd.read_csv(path))
+    df = df.dropna(subset=['text']).reset_index(drop=True)
+    df['cleaned_text'] = df['text'].apply(analysis.clean_text)
+    bundle = analysis.model_registry.active()
+    store = bundle.models['embedding_store']
+    stored = int((store.lookup(df['cleaned_text']) >= 0).sum()) if store is not None else 0
+    return df, analysis.embed_texts(df['cleaned_text'].tolist(), bundle=bundle), stored
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train and apply classification heads on stored BERT embeddings.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train = subparsers.add_parser("train-head", help="Fit a logistic-regression head on labelled posts")
+    train.add_argument("data", help="CSV with text and label columns")
+    train.add_argument("--label-column", default="sentiment")
+    train.add_argument("--output", required=True, help="Where to save the head (joblib)")
+    train.add_argument("--C", type=float, default=1.0)
+    train.add_argument("--test-size", type=float, default=0.2, help="Held-out fraction for the reported accuracy")
+    relabel = subparsers.add_parser("relabel", help="Classify posts with a head")
+    relabel.add_argument("data", help="CSV with a text column")
+    relabel.add_argument("--head", required=True)
+    relabel.add_argument("--output", required=True, help="CSV with the label and confidence per post")
+    subparsers.add_parser("stats", help="Size of the store for the active BERT model")
+    args = parser.parse_args(argv)
+
+    if not EMBEDDING_STORE:
+        print("Note: EMBEDDING_STORE is off, embeddings are computed but not kept")
+
+    if args.command == "stats":
+        from . import analysis
+        store = analysis.model_registry.active().models['embedding_store']
+        print(json.dumps(store.stats() if store is not None else None, indent=2))
+        return 0
+
+    df, embeddings, stored = _embed_corpus(args.data)
+    print(f"{len(df)} posts, {stored} embeddings read from the store, {len(df) - stored} encoded")
+
+    if args.command == "train-head":
+        from sklearn.model_selection import train_test_split
+
+        labelled = df[args.label_column].notna().to_numpy()
+        labels = df.loc[labelled, args.label_column].astype(str).str.lower().to_numpy()
+        train_x, test_x, train_y, test_y = train_test_split(embeddings[labelled], labels,
+                                                            test_size=args.test_size, random_state=42)
+        head = train_head(train_x, train_y, name=os.path.splitext(os.path.basename(args.output))[0], C=args.C)
+        if len(test_y):
+            accuracy = float(np.mean(np.asarray(head.predict(test_x)) == test_y))
+            print(f"Held-out accuracy: {accuracy:.3f} on {len(test_y)} posts")
+        head = train_head(embeddings[labelled], labels, name=head.name, C=args.C)
+        head.save(args.output)
+        print(f"Saved head {head.name} ({', '.join(head.classes)}) to {args.output}")
+    else:
+        head = EmbeddingHead.load(args.head)
+        labels, confidences = head.predict_with_confidence(embeddings)
+        df[f"{head.name}_label"] = labels
+        df[f"{head.name}_confidence"] = confidences
+        df.drop(columns=['cleaned_text']).to_csv(args.output, index=False)
+        print(f"Wrote {len(df)} labels to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from .async_twitter_client import AsyncTwitterClient, get_async_twitter_client
+from .twitter_client import MAX_PAGE_SIZE, TwitterClient, get_twitter_client
+
+logger = logging.getLogger(__name__)
+
+# App-auth limit for GET /2/tweets/search/recent is 450 requests per 15 minutes
+TWITTER_REQUESTS_PER_WINDOW = int(os.getenv("TWITTER_REQUESTS_PER_WINDOW", "450"))
+TWITTER_WINDOW_SECONDS = float(os.getenv("TWITTER_WINDOW_SECONDS", "900"))
+TWITTER_FETCH_CONCURRENCY = int(os.getenv("TWITTER_FETCH_CONCURRENCY", "2"))
+# Longest a request may queue for rate-limit budget before giving up
+TWITTER_MAX_QUEUE_WAIT = float(os.getenv("TWITTER_MAX_QUEUE_WAIT", "30"))
+# Use the httpx-based async client instead of tweepy on a worker thread
+TWITTER_ASYNC_CLIENT = os.getenv("TWITTER_ASYNC_CLIENT", "true").lower() in ("1", "true", "yes")
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a fetch cannot get rate-limit budget within the allowed wait."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Twitter API rate limit exceeded. Please try again in {math.ceil(retry_after)} seconds.")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return ' '.join(query.lower().split())
+
+
+class RateLimitWindow:
+    """Client-side view of the Twitter rate-limit window."""
+
+    def __init__(self, limit: int = TWITTER_REQUESTS_PER_WINDOW, window_seconds: float = TWITTER_WINDOW_SECONDS):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.remaining = limit
+        self.reset_at = time.monotonic() + window_seconds
+
+    def _roll(self):
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window_seconds
+
+    def try_acquire(self, calls: int) -> float:
+        """Take budget for `calls` requests. Returns 0 on success, else seconds until reset."""
+        self._roll()
+        calls = min(calls, self.limit)
+        if self.remaining >= calls:
+            self.remaining -= calls
+            return 0.0
+        return self.seconds_until_reset()
+
+    def seconds_until_reset(self) -> float:
+        return max(self.reset_at - time.monotonic(), 0.01)
+
+    def exhaust(self, retry_after: Optional[float] = None):
+        """The API reported a rate limit: spend the rest of the window."""
+        self._roll()
+        self.remaining = 0
+        if retry_after is not None:
+            self.reset_at = time.monotonic() + retry_after
+
+
+class FairQueue:
+    """Round-robin queue: each key (user) gets one turn before any key gets a second."""
+
+    def __init__(self):
+        self._queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._items = asyncio.Semaphore(0)
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def put(self, key: Hashable, item: Any):
+        self._queues.setdefault(key, deque()).append(item)
+        self._items.release()
+
+    async def get(self) -> Any:
+        await self._items.acquire()
+        key, queue = self._queues.popitem(last=False)
+        item = queue.popleft()
+        if queue:
+            # Still has work queued: go to the back of the line
+            self._queues[key] = queue
+        return item
+
+
+class FetchScheduler:
+    """
+    Process-wide scheduler for live Twitter searches.
+
+    * one pooled `TwitterClient` (and HTTP session) shared by all requests
+    * identical in-flight queries are coalesced into a single API call
+    * distinct queries are queued round-robin per user and run with bounded concurrency
+    * requests wait for rate-limit budget instead of burning failed calls
+
+    With an `async_client_factory` the API calls run on the event loop through
+    the pooled async client; otherwise the sync client runs on worker threads.
+    """
+
+    def __init__(self, client_factory: Callable[[], TwitterClient] = get_twitter_client,
+                 async_client_factory: Optional[Callable[[], AsyncTwitterClient]] = None,
+                 max_concurrency: int = TWITTER_FETCH_CONCURRENCY,
+                 window: Optional[RateLimitWindow] = None,
+                 max_wait: float = TWITTER_MAX_QUEUE_WAIT):
+        self.client_factory = client_factory
+        self.async_client_factory = async_client_factory
+        self.max_concurrency = max_concurrency
+        self.window = window or RateLimitWindow()
+        self.max_wait = max_wait
+        self._client: Optional[TwitterClient] = None
+        self._async_client: Optional[AsyncTwitterClient] = None
+        self._loop = None
+        self._queue: Optional[FairQueue] = None
+        self._workers = []
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.api_fetches = 0
+        self.rate_limited = 0
+
+    @property
+    def client(self) -> TwitterClient:
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncTwitterClient:
+        if self._async_client is None:
+            self._async_client = self.async_client_factory()
+        return self._async_client
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First use (or a new event loop, e.g. in tests): set up loop-bound state
+        self._loop = loop
+        self._queue = FairQueue()
+        self._inflight = {}
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def fetch(self, query: str, max_results: int = MAX_PAGE_SIZE, user_key: Hashable = None,
+                    since_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fetch and preprocess tweets for a query.
+        Returns a private copy of the DataFrame, so callers may modify it.
+        """
+        self._ensure_started()
+        self.requests += 1
+        key = (normalize_query(query), max_results, since_id)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = self._loop.create_future()
+            self._inflight[key] = future
+            self._queue.put(user_key, (key, query, max_results, since_id, future))
+
+        df = await asyncio.shield(future)
+        return df.copy()
+
+    async def _worker(self):
+        while True:
+            key, query, max_results, since_id, future = await self._queue.get()
+            try:
+                await self._wait_for_budget(math.ceil(max_results / MAX_PAGE_SIZE))
+                self.api_fetches += 1
+                if self.async_client_factory is not None:
+                    df = await self._collect_async(query, max_results, since_id)
+                else:
+                    df = await asyncio.to_thread(self._collect, query, max_results, since_id)
+                future.set_result(df)
+            except Exception as e:
+                if "rate limit" in str(e).lower() and not isinstance(e, RateLimitExceeded):
+                    # The API itself refused: report it like a budget refusal (a 429 with Retry-After)
+                    self.window.exhaust()
+                    self.rate_limited += 1
+                    e = RateLimitExceeded(self.window.seconds_until_reset())
+                future.set_exception(e)
+            finally:
+                self._inflight.pop(key, None)
+                # Avoid "exception was never retrieved" warnings when nobody awaited
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    async def _wait_for_budget(self, calls: int):
+        waited = 0.0
+        while True:
+            wait = self.window.try_acquire(calls)
+            if wait == 0:
+                return
+            if waited + wait > self.max_wait:
+                self.rate_limited += 1
+                raise RateLimitExceeded(wait)
+            logger.info(f"Twitter fetch queued for {wait:.1f}s waiting for rate-limit budget")
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def _collect(self, query: str, max_results: int, since_id: Optional[int]) -> pd.DataFrame:
+        """Runs on a worker thread: fetch all pages and preprocess them as they arrive."""
+        chunks = [
+            self.client.preprocess_tweets_dataframe(chunk)
+            for chunk in self.client.iter_tweet_pages(query, total=max_results, since_id=since_id)
+            if not chunk.empty
+        ]
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    async def _collect_async(self, query: str, max_results: int, since_id: Optional[int]) -> pd.DataFrame:
+        """Fetch pages on the event loop; preprocessing (CPU-bound) runs on a thread."""
+        chunks = []
+        async for chunk in self.async_client.iter_tweet_pages(query, total=max_results, since_id=since_id):
+            if not chunk.empty:
+                chunks.append(await asyncio.to_thread(self.async_client.preprocess_tweets_dataframe, chunk))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "apiFetches": self.api_fetches,
+            "rateLimited": self.rate_limited,
+            "queued": len(self._queue) if self._queue else 0,
+            "inFlight": len(self._inflight),
+            "windowRemaining": self.window.remaining,
+        }
+
+    def render_metrics(self) -> str:
+        """Prometheus exposition of the scheduler counters."""
+        lines = []
+        for name, value in [
+            ("twitter_fetch_requests_total", self.requests),
+            ("twitter_fetch_coalesced_total", self.coalesced),
+            ("twitter_fetch_api_fetches_total", self.api_fetches),
+            ("twitter_fetch_rate_limited_total", self.rate_limited),
+        ]:
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        lines += ["# TYPE twitter_rate_limit_remaining gauge", f"twitter_rate_limit_remaining {self.window.remaining}"]
+        return "\n".join(lines) + "\n"
+
+
+_scheduler: Optional[FetchScheduler] = None
+
+
+def use_async_client() -> bool:
+    """The async client needs an HTTP endpoint, so the in-process API stub keeps tweepy."""
+    if not TWITTER_ASYNC_CLIENT:
+        return False
+    in_process_stub = os.getenv('TWITTER_API_STUB', '').lower() in ('1', 'true', 'yes')
+    return not in_process_stub or bool(os.getenv('TWITTER_STUB_URL'))
+
+
+def get_fetch_scheduler() -> FetchScheduler:
+    """Process-wide scheduler instance."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FetchScheduler(
+            async_client_factory=get_async_twitter_client if use_async_client() else None
+        )
+    return _scheduler
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for running several API workers that share model memory.
+
+    MODEL_MMAP=true gunicorn -c backend/gunicorn.conf.py backend.main:app
+
+The app (and with it BERT and the classical models) is imported once in the
+master before the workers are forked, and `when_ready` imports the PDF
+generator (which builds its own sentiment pipeline at import, and is
+otherwise imported on the first PDF request), so the weights are shared
+copy-on-write. `gc.freeze()` moves everything loaded so far out of
+the garbage collector's reach; otherwise the first collection in each worker
+writes to every object header and un-shares those pages. With MODEL_MMAP the
+model files are also memory-mapped, which keeps them shared even across
+restarts of individual workers. Check the result with
+`python -m backend.memcheck --master <pid>`.
+
+Streaming monitors and upload jobs are kept per process; they need
+WEB_CONCURRENCY=1 (see README, Multiple Workers).
+"""
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    # Runs in the master after the app was preloaded and before any worker is forked
+    from backend import pdf_generator  # noqa: F401 - loads the PDF sentiment pipeline before forking
+
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Split the cores between workers (and their classical model processes, see parallel.py)
+    import torch
+    from backend import parallel
+
+    cores = max(1, (os.cpu_count() or 1) // workers)
+    if parallel.PARALLEL_ANALYSIS:
+        cores = parallel.torch_thread_budget(cpu_count=cores)
+    torch.set_num_threads(cores)
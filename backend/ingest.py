@@ -0,0 +1,106 @@
+"""
+Convert a CSV tweet corpus into a columnar file for fast, memory-mapped loading.
+
+    python -m backend.ingest sample_tweets.csv corpus.arrow
+    python -m backend.ingest dump.csv dump.parquet --chunksize 200000
+
+The output keeps typed columns: parsed timestamps, numeric counts and
+dictionary-encoded low-cardinality strings (platform, country, ...). Text is
+stripped and `cleaned_text` is precomputed, so the analysis path skips that
+step. The token index used for query filtering is written next to the output
+(`<output>.tokens.arrow`). Point CORPUS_PATH at the output to use it.
+
+`.arrow`/`.feather` (Arrow IPC, uncompressed) is memory-mapped without
+copying; `.parquet` is smaller on disk but is decoded on load.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from .corpus import CorpusIndex, columnar_format, write_token_index
+
+# Strings with at most this share of distinct values are dictionary-encoded
+DICTIONARY_MAX_RATIO = 0.5
+FREE_TEXT_COLUMNS = ("text", "cleaned_text")
+
+
+def normalize_chunk(df: pd.DataFrame, cleaner: Optional[Callable[[str], str]]) -> pd.DataFrame:
+    """Same column normalization as the CSV corpus loader, plus typed timestamps and cleaned text."""
+    df = CorpusIndex.normalize_columns(df)
+    if 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    if cleaner is not None:
+        df['cleaned_text'] = df['text'].map(cleaner)
+    return df
+
+
+def ingest_csv(input_path: str, output_path: str, chunksize: int = 100_000,
+               cleaner: Optional[Callable[[str], str]] = None) -> dict:
+    """
+    Convert `input_path` to Arrow IPC or Parquet (chosen by the output extension).
+    `cleaner` defaults to the classifiers' `clean_text`.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    fmt = columnar_format(output_path)
+    if fmt is None:
+        raise ValueError("Output must end in .arrow, .feather or .parquet")
+    if cleaner is None:
+        from .preprocessing import clean_text
+        cleaner = clean_text
+
+    start = time.perf_counter()
+    tables: List[pa.Table] = []
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        tables.append(pa.Table.from_pandas(normalize_chunk(chunk, cleaner), preserve_index=False))
+    if not tables:
+        raise ValueError(f"No rows in {input_path}")
+    # Chunks may infer different types (e.g. int vs float once NaNs appear)
+    table = pa.concat_tables(tables, promote_options="permissive")
+
+    for i, name in enumerate(table.column_names):
+        column = table.column(i)
+        if name in FREE_TEXT_COLUMNS or not pa.types.is_string(column.type):
+            continue
+        distinct = pc.count_distinct(column).as_py()
+        if distinct <= max(len(table) * DICTIONARY_MAX_RATIO, 1):
+            table = table.set_column(i, name, pc.dictionary_encode(column))
+    table = table.unify_dictionaries()
+
+    if fmt == "parquet":
+        pq.write_table(table, output_path)
+    else:
+        with pa.OSFile(output_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    write_token_index(output_path, CorpusIndex.build_postings(table.column("text").to_pandas()))
+
+    return {
+        "rows": len(table),
+        "columns": {field.name: str(field.type) for field in table.schema},
+        "bytes": os.path.getsize(output_path),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert a CSV tweet corpus to Arrow IPC or Parquet.")
+    parser.add_argument("input", help="CSV file with a text column")
+    parser.add_argument("output", help="Output path ending in .arrow, .feather or .parquet")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="CSV rows parsed per chunk")
+    args = parser.parse_args(argv)
+
+    summary = ingest_csv(args.input, args.output, chunksize=args.chunksize)
+    print(f"Wrote {summary['rows']} rows ({summary['bytes']} bytes) to {args.output} in {summary['seconds']}s")
+    for name, dtype in summary["columns"].items():
+        print(f"  {name}: {dtype}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Load driver for the API.
+
+Runs N concurrent users, each of which registers, logs in and then repeatedly
+analyzes a query, fetches the stored analysis and downloads its PDF. Reports
+throughput and latency percentiles per step.
+
+Start the API against the local Twitter stand-in first, e.g.
+    TWITTER_API_STUB=1 TWITTER_STUB_LATENCY=0.2 uvicorn backend.main:app --workers 4
+then
+    python -m backend.loadtest --users 20 --iterations 5 --live --output load.json
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+STEPS = ["register", "login", "analyze", "fetch", "pdf"]
+DEFAULT_QUERIES = ["traffic", "weekend", "workout", "park", "coffee"]
+
+
+class LoadStats:
+    """Thread-safe collection of per-step latencies and status codes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, Dict[str, int]] = {step: {} for step in STEPS}
+
+    def record(self, step: str, seconds: float, status: Any):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if not (isinstance(status, int) and status < 400):
+                key = str(status)
+                self.errors[step][key] = self.errors[step].get(key, 0) + 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        steps = {}
+        total = 0
+        for step in STEPS:
+            samples = self.latencies[step]
+            total += len(samples)
+            if not samples:
+                continue
+            steps[step] = {
+                "requests": len(samples),
+                "errors": self.errors[step],
+                "throughputPerSec": round(len(samples) / wall_seconds, 2),
+                "p50Ms": round(float(np.percentile(samples, 50)) * 1000, 1),
+                "p95Ms": round(float(np.percentile(samples, 95)) * 1000, 1),
+                "p99Ms": round(float(np.percentile(samples, 99)) * 1000, 1),
+                "maxMs": round(max(samples) * 1000, 1),
+            }
+        return {
+            "wallSeconds": round(wall_seconds, 3),
+            "requests": total,
+            "throughputPerSec": round(total / wall_seconds, 2) if wall_seconds else None,
+            "steps": steps,
+        }
+
+
+def call(stats: LoadStats, step: str, request: Request, timeout: float) -> Optional[bytes]:
+    """Send one request and record its latency; returns the body on success."""
+    start = time.perf_counter()
+    status: Any = None
+    body = None
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except HTTPError as e:
+        status = e.code
+    except (URLError, OSError) as e:
+        status = type(e).__name__
+    stats.record(step, time.perf_counter() - start, status)
+    return body if isinstance(status, int) and status < 400 else None
+
+
+def json_request(url: str, payload: Dict[str, Any], token: Optional[str] = None) -> Request:
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return Request(url, data=json.dumps(payload).encode(), headers=headers, method="POST")
+
+
+def run_user(user_index: int, args, stats: LoadStats):
+    """One simulated user: register, log in, then analyze/fetch/pdf in a loop."""
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = "load-test-password"
+    base = args.base_url.rstrip("/")
+
+    call(stats, "register", json_request(f"{base}/auth/register", {
+        "email": email, "password": password, "name": f"Load User {user_index}"
+    }), args.timeout)
+
+    body = call(stats, "login", Request(
+        f"{base}/auth/login",
+        data=urlencode({"username": email, "password": password}).encode(),
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        method="POST",
+    ), args.timeout)
+    if body is None:
+        return
+    token = json.loads(body)["access_token"]
+    auth = {"Authorization": f"Bearer {token}"}
+
+    for iteration in range(args.iterations):
+        query = args.queries[(user_index + iteration) % len(args.queries)]
+        body = call(stats, "analyze", json_request(f"{base}/api/analyze_query/", {
+            "query": query, "useLiveData": args.live
+        }, token), args.timeout)
+        if body is None:
+            continue
+        analysis_id = json.loads(body)["id"]
+
+        call(stats, "fetch", Request(f"{base}/api/analyses/{analysis_id}", headers=auth), args.timeout)
+        if not args.skip_pdf:
+            call(stats, "pdf", Request(f"{base}/api/analyses/{analysis_id}/pdf", headers=auth), args.timeout)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run concurrent users against the analysis API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent users")
+    parser.add_argument("--iterations", type=int, default=3, help="Analyses per user")
+    parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES)
+    parser.add_argument("--live", action="store_true", help="Send useLiveData=true (use with the Twitter stub)")
+    parser.add_argument("--skip-pdf", action="store_true", help="Do not download PDF reports")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write the summary as JSON to this path")
+    args = parser.parse_args(argv)
+
+    stats = LoadStats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        for future in [executor.submit(run_user, i, args, stats) for i in range(args.users)]:
+            future.result()
+    summary = stats.summary(time.perf_counter() - start)
+    summary.update({"users": args.users, "iterations": args.iterations, "live": args.live})
+
+    print(f"{args.users} users, {summary['requests']} requests in {summary['wallSeconds']}s "
+          f"({summary['throughputPerSec']} req/s)")
+    for step, data in summary["steps"].items():
+        print(f"  {step:<9} n={data['requests']:<5} p50={data['p50Ms']}ms p95={data['p95Ms']}ms "
+              f"p99={data['p99Ms']}ms errors={data['errors'] or 0}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,17 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from . import models, auth, routes
-from .database import engine
+from fastapi.responses import PlainTextResponse
+from . import models, auth, routes, request_logger, tracing, streaming, parallel, analysis
+from .async_twitter_client import close_async_twitter_client
+from .fetch_scheduler import get_fetch_scheduler
+from .result_cache import result_cache
+from .tweet_cache import tweet_cache
+from .database import engine, ensure_columns
 
 # Create the database tables
 models.Base.metadata.create_all(bind=engine)
+ensure_columns(engine, "analyses", {"model_versions": "TEXT", "result_id": "INTEGER"})
 
 app = FastAPI(
     title="Social Media Sentiment Analysis API",
@@ -27,6 +34,67 @@ app.add_middleware(
     allow_headers=["*"],            # allow all headers
 )
 
+# Record every API call into the request log buffer (flushed in the background)
+app.middleware("http")(request_logger.log_requests_middleware)
+
+@app.on_event("startup")
+async def start_request_log_writer():
+    app.state.request_log_task = asyncio.create_task(request_logger.flush_request_logs_periodically())
+
+@app.on_event("shutdown")
+async def stop_request_log_writer():
+    task = getattr(app.state, "request_log_task", None)
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+@app.on_event("startup")
+async def start_streaming_monitors():
+    await asyncio.to_thread(streaming.streaming_manager.load)
+    app.state.streaming_task = asyncio.create_task(streaming.streaming_manager.run())
+
+@app.on_event("shutdown")
+async def stop_streaming_monitors():
+    task = getattr(app.state, "streaming_task", None)
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+@app.on_event("startup")
+async def start_model_workers():
+    if parallel.PARALLEL_ANALYSIS:
+        spec = analysis.model_executors.model_spec(analysis.model_registry.active().models['classical'])
+        await asyncio.to_thread(analysis.model_executors.warm_up, spec)
+
+@app.on_event("shutdown")
+async def stop_model_workers():
+    analysis.model_executors.shutdown()
+
+@app.on_event("startup")
+async def start_model_registry_watch():
+    # Picks up `python -m backend.model_registry activate <version>` without a restart
+    app.state.model_registry_task = asyncio.create_task(analysis.model_registry.watch())
+
+@app.on_event("shutdown")
+async def stop_model_registry_watch():
+    task = getattr(app.state, "model_registry_task", None)
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+@app.on_event("shutdown")
+async def close_twitter_connections():
+    await close_async_twitter_client()
+
 # Include the authentication router
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 
@@ -36,3 +104,10 @@ app.include_router(routes.router, prefix="/api", tags=["Analysis"])
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the Sentiment Analysis API. Visit /docs for documentation."}
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Root"])
+async def metrics():
+    """Prometheus metrics for the analysis pipeline, the Twitter fetch scheduler, the query cache and the result cache."""
+    body = (tracing.render_metrics() + get_fetch_scheduler().render_metrics() + tweet_cache.render_metrics()
+            + result_cache.render_metrics())
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
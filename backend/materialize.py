@@ -0,0 +1,185 @@
+"""
+Precompute cleaned text, predictions and confidences for a static corpus.
+
+    python -m backend.materialize sample_tweets.csv
+    python -m backend.materialize dump.arrow --batch-size 1024
+
+Runs the full `run_analysis` pipeline once over the corpus and stores the
+results next to it in `<corpus>.predictions-<key>.arrow`, where `<key>` is
+derived from the model file fingerprints, so predictions are never reused
+with different models. Re-running only classifies rows that were appended
+or whose text changed (pass `--full` to recompute everything).
+
+File-mode queries then look up the stored rows instead of classifying them.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import analysis
+from .corpus import CorpusIndex, take_rows
+
+MATERIALIZED_COLUMNS = ['cleaned_text'] + analysis.PREDICTION_COLUMNS + analysis.CONFIDENCE_COLUMNS
+
+
+def version_key(versions: Dict[str, Optional[str]]) -> str:
+    return hashlib.sha256(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def predictions_path(corpus_path: str, versions: Optional[Dict[str, Optional[str]]] = None) -> str:
+    versions = analysis.get_model_versions() if versions is None else versions
+    return f"{corpus_path}.predictions-{version_key(versions)}.arrow"
+
+
+def text_hashes(texts: pd.Series) -> np.ndarray:
+    """Per-row content hash used to detect appended or edited rows."""
+    return pd.util.hash_pandas_object(texts.reset_index(drop=True).astype(str), index=False).to_numpy()
+
+
+def read_predictions(path: str):
+    import pyarrow as pa
+
+    if not os.path.exists(path):
+        return None
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def write_predictions(path: str, df: pd.DataFrame, versions: Dict[str, Optional[str]]):
+    """Write atomically, so readers never see a partial file."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({"model_versions": json.dumps(versions)})
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def materialize(corpus_path: str, batch_size: int = 512, full: bool = False) -> dict:
+    """Classify the rows of a corpus that have no stored predictions for the current models."""
+    start = time.perf_counter()
+    # One bundle for the whole run, even if a new model version is activated meanwhile
+    bundle = analysis.model_registry.active()
+    versions = bundle.versions
+    output_path = predictions_path(corpus_path, versions)
+
+    corpus = CorpusIndex(corpus_path, columns=("text", "cleaned_text"))
+    texts = corpus.frame()
+    hashes = text_hashes(texts['text'])
+
+    stored = None if full else read_predictions(output_path)
+    reusable = np.zeros(len(texts), dtype=bool)
+    result = pd.DataFrame({'row_hash': hashes})
+    for column in MATERIALIZED_COLUMNS:
+        result[column] = pd.Series([None] * len(texts), dtype=object)
+
+    if stored is not None and stored.num_rows:
+        previous = stored.to_pandas()
+        n = min(len(previous), len(texts))
+        reusable[:n] = previous['row_hash'].to_numpy()[:n] == hashes[:n]
+        for column in MATERIALIZED_COLUMNS:
+            values = result[column].to_numpy()
+            values[:n][reusable[:n]] = previous[column].to_numpy()[:n][reusable[:n]]
+            result[column] = values
+
+    pending = np.flatnonzero(~reusable)
+    for offset in range(0, len(pending), batch_size):
+        rows = pending[offset:offset + batch_size]
+        batch = texts.iloc[rows].reset_index(drop=True)
+        batch = analysis.run_analysis(batch, with_confidence=True, bundle=bundle)
+        for column in MATERIALIZED_COLUMNS:
+            values = result[column].to_numpy()
+            values[rows] = batch[column].to_numpy()
+            result[column] = values
+        print(f"Classified {min(offset + batch_size, len(pending))}/{len(pending)} rows", flush=True)
+
+    for column in analysis.CONFIDENCE_COLUMNS:
+        result[column] = result[column].astype(float)
+    write_predictions(output_path, result, versions)
+
+    return {
+        "rows": len(texts),
+        "reused": int(reusable.sum()),
+        "classified": len(pending),
+        "output": output_path,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+class PredictionStore:
+    """Memory-mapped stored predictions for one corpus file, reloaded when the file is rewritten."""
+
+    def __init__(self):
+        self._tables: Dict[str, Tuple[Tuple[int, int], object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, corpus_path: str, versions: Optional[Dict[str, Optional[str]]] = None):
+        """Stored predictions of the models `versions` (the active ones if None)."""
+        path = predictions_path(corpus_path, versions)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._tables.get(path)
+            if cached is None or cached[0] != signature:
+                cached = self._tables[path] = (signature, read_predictions(path))
+        return cached[1]
+
+
+prediction_store = PredictionStore()
+
+
+def attach_predictions(df: pd.DataFrame, corpus_path: str, rows: Optional[np.ndarray] = None,
+                       store: PredictionStore = None, versions: Optional[Dict[str, Optional[str]]] = None) -> int:
+    """
+    Copy stored predictions onto `df`, the corpus rows `rows` (all rows if None).
+    Rows whose text no longer matches keep empty predictions, so `run_analysis`
+    classifies just those. Returns the number of rows served from the store.
+    Pass the `versions` of the bundle the analysis runs with, so a model swap
+    meanwhile cannot attach predictions of other models.
+    """
+    store = prediction_store if store is None else store
+    table = store.get(corpus_path, versions)
+    if table is None or df.empty:
+        return 0
+
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    in_range = np.flatnonzero(rows < table.num_rows)
+    stored = take_rows(table, rows[in_range]).to_pandas()
+    valid = stored['row_hash'].to_numpy() == text_hashes(df['text'].iloc[in_range])
+    hits = in_range[valid]
+
+    for column in MATERIALIZED_COLUMNS:
+        if column == 'cleaned_text' and column in df.columns:
+            continue
+        values = np.full(len(df), None, dtype=object)
+        values[hits] = stored[column].to_numpy()[valid]
+        df[column] = values
+    return len(hits)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Store predictions for every row of a corpus file.")
+    parser.add_argument("corpus", help="Corpus file (.csv, .arrow or .parquet)")
+    parser.add_argument("--batch-size", type=int, default=512, help="Rows classified per run_analysis call")
+    parser.add_argument("--full", action="store_true", help="Recompute every row instead of only new/changed ones")
+    args = parser.parse_args(argv)
+
+    summary = materialize(args.corpus, batch_size=args.batch_size, full=args.full)
+    print(f"{summary['rows']} rows: {summary['reused']} reused, {summary['classified']} classified "
+          f"in {summary['seconds']}s -> {summary['output']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
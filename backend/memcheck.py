@@ -0,0 +1,132 @@
+"""
+Report shared vs private memory of the API worker processes (Linux only).
+
+    python -m backend.memcheck --master <gunicorn master pid>
+    python -m backend.memcheck --pids 1234 1235 --available-mb 16000
+
+Reads /proc/<pid>/smaps_rollup. `Shared_*` pages are mapped by several
+processes (preloaded models after fork, memory-mapped model files); `Private_*`
+pages (USS) are what every additional worker costs. PSS splits shared pages
+evenly between the processes mapping them, so the sum of PSS is the real
+footprint. The estimate of how many workers fit on a node is
+(available - shared) / mean private.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty", "Swap")
+
+
+def parse_smaps_rollup(text: str) -> Dict[str, int]:
+    """Field -> kB for the fields in SMAPS_FIELDS."""
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(":")
+        if name in SMAPS_FIELDS:
+            values[name] = int(rest.split()[0])
+    return values
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Shared/private/PSS kB of one process."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        values = parse_smaps_rollup(f.read())
+    return {
+        "pid": pid,
+        "rssKb": values.get("Rss", 0),
+        "pssKb": values.get("Pss", 0),
+        "sharedKb": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+        "privateKb": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+        "swapKb": values.get("Swap", 0),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process (e.g. the workers of a gunicorn master)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the ppid is the second field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def available_kb() -> Optional[int]:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def summarize(processes: List[Dict[str, int]], available: Optional[int] = None) -> Dict[str, object]:
+    """Totals over the workers and the number of workers that fit in `available` kB."""
+    summary = {
+        "workers": len(processes),
+        "totalRssKb": sum(p["rssKb"] for p in processes),
+        "totalPssKb": sum(p["pssKb"] for p in processes),
+        "sharedKb": max((p["sharedKb"] for p in processes), default=0),
+        "meanPrivateKb": round(sum(p["privateKb"] for p in processes) / len(processes)) if processes else 0,
+        "processes": processes,
+    }
+    if available is not None and summary["meanPrivateKb"]:
+        summary["availableKb"] = available
+        summary["workersThatFit"] = max(0, int((available - summary["sharedKb"]) // summary["meanPrivateKb"]))
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Shared vs private memory of API worker processes.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--master", type=int, help="Master pid; its children are the workers")
+    target.add_argument("--pids", type=int, nargs="+", help="Worker pids")
+    parser.add_argument("--available-mb", type=float,
+                        help="Memory budget for the workers-that-fit estimate (default: MemAvailable "
+                             "plus the current workers' private memory)")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    pids = child_pids(args.master) if args.master else args.pids
+    if not pids:
+        print("No worker processes found", file=sys.stderr)
+        return 1
+    processes = [process_memory(pid) for pid in pids]
+    if args.available_mb is not None:
+        available = int(args.available_mb * 1024)
+    else:
+        # Memory the current workers would give back, plus what is free now
+        available = available_kb()
+        if available is not None:
+            available += sum(p["privateKb"] for p in processes) + max(p["sharedKb"] for p in processes)
+    summary = summarize(processes, available)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(f"{'pid':>8}  {'rss MB':>8}  {'pss MB':>8}  {'shared MB':>9}  {'private MB':>10}")
+    for p in processes:
+        print(f"{p['pid']:>8}  {p['rssKb'] / 1024:>8.1f}  {p['pssKb'] / 1024:>8.1f}  "
+              f"{p['sharedKb'] / 1024:>9.1f}  {p['privateKb'] / 1024:>10.1f}")
+    print(f"{summary['workers']} workers: {summary['totalPssKb'] / 1024:.1f} MB total PSS "
+          f"(RSS would suggest {summary['totalRssKb'] / 1024:.1f} MB), "
+          f"{summary['meanPrivateKb'] / 1024:.1f} MB private per worker")
+    if "workersThatFit" in summary:
+        print(f"About {summary['workersThatFit']} workers fit in {summary['availableKb'] / 1024:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
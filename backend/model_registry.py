@@ -0,0 +1,285 @@
+"""
+Versioned model artifacts with background loading and an atomic swap.
+
+A release is a directory `MODEL_REGISTRY_DIR/<version>/` holding the model
+files and a `manifest.json`:
+
+    {"version": "2026-10-19", "features": "tfidf", "createdAt": "...",
+     "files": {"vectorizer": "tfidf_vectorizer.pkl", "naive_bayes": "naive_bayes_model.pkl",
+               "svm": "svm_model.pkl", "bert": "bert_model.pth"}}
+
+The file `MODEL_REGISTRY_DIR/ACTIVE` names the version to serve. Every
+process polls it (`watch`), loads a new version on a background thread while
+the current bundle keeps serving, and then swaps the reference in one
+assignment. Analyses take the active bundle once at the start, so a swap
+never mixes versions within one analysis. Without a registry the flat files
+in `models/` are served as the `legacy` version. Under gunicorn each worker
+loads a new version on its own, so it is shared between workers only with
+MODEL_MMAP=true.
+
+    python -m backend.model_registry publish 2026-10-19 --from models/ --activate
+    python -m backend.model_registry activate 2026-10-12   # roll back
+    python -m backend.model_registry list
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .classical import MODEL_FILES
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(MODELS_DIR, "registry"))
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+MANIFEST_NAME = "manifest.json"
+ACTIVE_NAME = "ACTIVE"
+LEGACY_VERSION = "legacy"
+
+# File names in the flat models/ directory, per CLASSICAL_FEATURES
+LEGACY_FILES = {features: {**files, "bert": "bert_model.pth"} for features, files in MODEL_FILES.items()}
+
+
+@dataclass
+class ModelManifest:
+    version: str
+    directory: str
+    features: str = "tfidf"
+    files: Dict[str, str] = field(default_factory=dict)
+    created_at: Optional[str] = None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, self.files[name])
+
+    def paths(self) -> Dict[str, str]:
+        return {name: self.path(name) for name in self.files}
+
+    @classmethod
+    def read(cls, directory: str) -> "ModelManifest":
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            data = json.load(f)
+        return cls(version=data["version"], directory=directory, features=data.get("features", "tfidf"),
+                   files=data["files"], created_at=data.get("createdAt"))
+
+    @classmethod
+    def legacy(cls, models_dir: str = MODELS_DIR, features: str = "tfidf") -> "ModelManifest":
+        """The flat `models/` directory used before the registry existed."""
+        return cls(version=LEGACY_VERSION, directory=models_dir, features=features, files=dict(LEGACY_FILES[features]))
+
+    def write(self):
+        data = {"version": self.version, "features": self.features, "files": self.files,
+                "createdAt": self.created_at}
+        with open(os.path.join(self.directory, MANIFEST_NAME), "w") as f:
+            json.dump(data, f, indent=2)
+
+
+@dataclass
+class ModelBundle:
+    """Everything loaded for one model version; replaced as a whole on reload."""
+    manifest: ModelManifest
+    models: Dict[str, Any]
+    versions: Dict[str, Optional[str]]  # fingerprints, used in cache keys
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def version(self) -> str:
+        return self.manifest.version
+
+    def describe(self) -> Dict[str, Optional[str]]:
+        """Release name and fingerprints, as recorded on each stored analysis."""
+        return {**self.versions, "release": self.version}
+
+
+class ModelRegistry:
+    """
+    Serves the active `ModelBundle` of a registry directory. `loader` turns a
+    manifest into a bundle (see analysis.load_model_bundle).
+    """
+
+    def __init__(self, root: str, loader: Callable[[ModelManifest], ModelBundle],
+                 legacy: Optional[ModelManifest] = None):
+        self.root = root
+        self.loader = loader
+        self.legacy = legacy or ModelManifest.legacy()
+        self._active: Optional[ModelBundle] = None
+        self._lock = threading.Lock()
+        self._loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._failed: Optional[tuple] = None  # (version, ACTIVE mtime) of the last failed load
+        self.swaps = 0
+
+    # --- Registry contents ---
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.endswith(".tmp") and os.path.exists(os.path.join(self.root, name, MANIFEST_NAME)))
+
+    def _pointer_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.root, ACTIVE_NAME)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def active_version(self) -> Optional[str]:
+        """The version named in ACTIVE (None when there is no registry)."""
+        try:
+            with open(os.path.join(self.root, ACTIVE_NAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version: Optional[str]) -> ModelManifest:
+        if version is None or version == LEGACY_VERSION:
+            return self.legacy
+        return ModelManifest.read(os.path.join(self.root, version))
+
+    # --- Serving ---
+    def active(self) -> ModelBundle:
+        """The bundle to use for one analysis; loads the active version on first use."""
+        bundle = self._active
+        if bundle is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self.loader(self.manifest(self.active_version()))
+                bundle = self._active
+        return bundle
+
+    def swap(self, bundle: ModelBundle) -> ModelBundle:
+        """Make `bundle` the active one; returns the previous bundle."""
+        with self._lock:
+            previous, self._active = self._active, bundle
+            self.swaps += 1
+        logger.info(f"Serving model version {bundle.version}")
+        return previous
+
+    def load_in_background(self, version: Optional[str]) -> Optional[threading.Thread]:
+        """Load `version` on a thread and swap it in when ready; the current bundle keeps serving."""
+        label = version or LEGACY_VERSION
+        pointer_mtime = self._pointer_mtime()
+        with self._lock:
+            if self._loading is not None:
+                return None
+            self._loading = label
+
+        def load():
+            try:
+                self.swap(self.loader(self.manifest(version)))
+                self.last_error = self._failed = None
+            except Exception as e:
+                # Not retried until ACTIVE is written again
+                self.last_error = f"{label}: {e}"
+                self._failed = (label, pointer_mtime)
+                logger.error(f"Loading model version {label} failed, still serving the previous one: {e}")
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        thread = threading.Thread(target=load, name="model-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def check(self) -> Optional[threading.Thread]:
+        """Start loading the version named in ACTIVE if it is not the one being served."""
+        wanted = self.active_version() or LEGACY_VERSION
+        current = self._active.version if self._active is not None else None
+        if wanted == current or wanted == self._loading or self._failed == (wanted, self._pointer_mtime()):
+            return None
+        return self.load_in_background(None if wanted == LEGACY_VERSION else wanted)
+
+    async def watch(self, interval: float = MODEL_RELOAD_INTERVAL):
+        """Background loop picking up `activate` from any process."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                logger.error(f"Model registry check failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        bundle = self._active
+        return {
+            "active": bundle.version if bundle else None,
+            "requested": self.active_version() or LEGACY_VERSION,
+            "loading": self._loading,
+            "loadedAt": datetime.fromtimestamp(bundle.loaded_at).isoformat() if bundle else None,
+            "fingerprints": bundle.versions if bundle else None,
+            "available": self.versions(),
+            "lastError": self.last_error,
+        }
+
+    # --- Publishing ---
+    def publish(self, version: str, source_dir: str, features: str = "tfidf",
+                files: Optional[Dict[str, str]] = None) -> ModelManifest:
+        """Copy model files into a new version directory (written atomically)."""
+        if version == LEGACY_VERSION or os.sep in version or version.startswith("."):
+            raise ValueError(f"Invalid version name: {version}")
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError(f"Version {version} already exists")
+        files = files or LEGACY_FILES[features]
+        staging = target + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for filename in files.values():
+            shutil.copy2(os.path.join(source_dir, filename), os.path.join(staging, filename))
+        manifest = ModelManifest(version=version, directory=staging, features=features, files=dict(files),
+                                 created_at=datetime.now().isoformat())
+        manifest.write()
+        os.replace(staging, target)
+        manifest.directory = target
+        return manifest
+
+    def activate(self, version: str):
+        """Point ACTIVE at `version`; serving processes switch on their next check."""
+        if version != LEGACY_VERSION:
+            self.manifest(version)  # must exist
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, ACTIVE_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_NAME))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Publish and activate model versions.")
+    parser.add_argument("--registry", default=MODEL_REGISTRY_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    publish = subparsers.add_parser("publish", help="Copy model files into a new version")
+    publish.add_argument("version")
+    publish.add_argument("--from", dest="source", default=MODELS_DIR, help="Directory with the model files")
+    publish.add_argument("--features", default="tfidf", choices=sorted(LEGACY_FILES))
+    publish.add_argument("--activate", action="store_true")
+    activate = subparsers.add_parser("activate", help="Serve a published version")
+    activate.add_argument("version")
+    subparsers.add_parser("list", help="List published versions")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry, loader=None)
+    if args.command == "publish":
+        manifest = registry.publish(args.version, args.source, features=args.features)
+        print(f"Published {manifest.version} to {manifest.directory}")
+        if args.activate:
+            registry.activate(args.version)
+            print(f"Activated {args.version}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Activated {args.version}; serving processes switch within {MODEL_RELOAD_INTERVAL:g}s")
+    else:
+        active = registry.active_version() or LEGACY_VERSION
+        for version in registry.versions() or [LEGACY_VERSION]:
+            print(("* " if version == active else "  ") + version)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text, Boolean, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -17,6 +17,7 @@ class User(Base):
     logs = relationship("Log", back_populates="user")
     reports = relationship("Report", back_populates="owner")
     analyses = relationship("Analysis", back_populates="user")
+    monitors = relationship("MonitoredQuery", back_populates="user")
 
 class Log(Base):
     __tablename__ = "logs"
@@ -48,8 +49,52 @@ class Analysis(Base):
     id = Column(Integer, primary_key=True, index=True)
     analysis_id = Column(String, unique=True, index=True, nullable=False)  # UUID from response
     query = Column(String, nullable=False)
-    response_data = Column(Text, nullable=False)  # JSON string of the full response
+    response_data = Column(Text, nullable=False)  # JSON string of the full response ("" when result_id is set)
+    model_versions = Column(Text, nullable=True)  # JSON: registry version and model fingerprints used
+    result_id = Column(Integer, ForeignKey("analysis_results.id"), nullable=True, index=True)  # shared cached result
     created_at = Column(DateTime, server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     user = relationship("User", back_populates="analyses")
+
+
+class AnalysisResult(Base):
+    __tablename__ = "analysis_results"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, index=True, nullable=False)  # hash of query, data file, model versions and options
+    response_data = Column(Text, nullable=False)  # JSON string of the full response
+    model_versions = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+
+
+class MonitoredQuery(Base):
+    __tablename__ = "monitored_queries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(String, nullable=False)
+    source = Column(String, nullable=False, default="live")  # "live" (Twitter) or "replay" (local file)
+    source_path = Column(String, nullable=True)  # CSV/JSONL file for replay sources
+    interval_seconds = Column(Float, nullable=False, default=60)
+    since_id = Column(String, nullable=True)  # newest tweet id seen by a live source
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, server_default=func.now())
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    user = relationship("User", back_populates="monitors")
+    windows = relationship("SentimentWindow", back_populates="monitor", cascade="all, delete-orphan")
+
+
+class SentimentWindow(Base):
+    __tablename__ = "sentiment_windows"
+    __table_args__ = (UniqueConstraint("monitor_id", "granularity", "bucket_start"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    monitor_id = Column(Integer, ForeignKey("monitored_queries.id"), nullable=False, index=True)
+    granularity = Column(String, nullable=False)  # "minute" or "hour"
+    bucket_start = Column(DateTime, nullable=False)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+
+    monitor = relationship("MonitoredQuery", back_populates="windows")
@@ -0,0 +1,130 @@
+"""
+Concurrent execution of the independent model passes in `run_analysis`.
+
+With PARALLEL_ANALYSIS=true the classical models (Naive Bayes, SVM) run in a
+process pool whose workers import only classical.py, while BERT runs on a
+thread (torch releases the GIL during inference). Cores are budgeted between
+them: each of the CLASSICAL_WORKERS processes is limited to one BLAS/OpenMP
+thread and torch gets the remaining cores (`torch_thread_budget`), so the two
+passes do not oversubscribe the host and the latency of a batch approaches
+that of the slower pass instead of the sum.
+
+This module only imports the standard library, so spawned workers do not
+pay for torch.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_ANALYSIS = os.getenv("PARALLEL_ANALYSIS", "false").lower() in ("1", "true", "yes")
+CLASSICAL_WORKERS = max(1, int(os.getenv("CLASSICAL_WORKERS", "1")))
+# Below this many rows, shipping texts to a worker process costs more than it saves
+PARALLEL_MIN_ROWS = int(os.getenv("PARALLEL_MIN_ROWS", "32"))
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def torch_thread_budget(classical_workers: int = CLASSICAL_WORKERS, cpu_count: Optional[int] = None) -> int:
+    """Intra-op threads left for torch once every classical worker has its core."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count - classical_workers)
+
+
+# --- Worker process side ---
+# Pipelines loaded in this worker, keyed by model spec (see ModelExecutors.submit_classical)
+_worker_pipelines: Dict[tuple, object] = {}
+WORKER_PIPELINES_KEPT = 2
+
+
+def _init_classical_worker():
+    # Runs before numpy/scipy are imported in the worker, so the thread limits apply
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = "1"
+
+
+def _worker_pipeline(spec: tuple):
+    pipeline = _worker_pipelines.get(spec)
+    if pipeline is None:
+        from .classical import load_classical_models
+        features, paths = spec
+        pipeline = _worker_pipelines[spec] = load_classical_models(dict(paths), features)
+        # Keep the previous version around for analyses that started before a model swap
+        while len(_worker_pipelines) > WORKER_PIPELINES_KEPT:
+            del _worker_pipelines[next(iter(_worker_pipelines))]
+    return pipeline
+
+
+def _classify_classical(spec: tuple, cleaned_texts: List[str], with_confidence: bool) -> Dict[str, list]:
+    return _worker_pipeline(spec).classify(cleaned_texts, with_confidence=with_confidence)
+
+
+# --- Parent process side ---
+class ModelExecutors:
+    """
+    A process pool for the classical models and a thread pool for BERT,
+    both created on first use. The process pool is recreated if a worker dies.
+    """
+
+    def __init__(self, classical_workers: int = CLASSICAL_WORKERS):
+        self.classical_workers = classical_workers
+        self._classical: Optional[ProcessPoolExecutor] = None
+        self._bert: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _classical_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._classical is None:
+                # spawn: workers start clean instead of inheriting a copy of the BERT weights
+                self._classical = ProcessPoolExecutor(
+                    max_workers=self.classical_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_classical_worker,
+                )
+            return self._classical
+
+    def _bert_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._bert is None:
+                self._bert = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bert")
+            return self._bert
+
+    @staticmethod
+    def model_spec(pipeline) -> tuple:
+        """Picklable description of a ClassicalPipeline from which workers load (and cache) their copy."""
+        return pipeline.features, tuple(sorted(pipeline.paths.items()))
+
+    def submit_classical(self, spec: tuple, cleaned_texts: List[str], with_confidence: bool = False) -> Future:
+        """Classify with the models described by `spec` in a worker process; resolves to {column: values}."""
+        return self._classical_pool().submit(_classify_classical, spec, list(cleaned_texts), with_confidence)
+
+    def submit_bert(self, fn: Callable, *args) -> Future:
+        return self._bert_pool().submit(fn, *args)
+
+    def reset_classical(self):
+        """Drop a broken process pool; the next submit starts fresh workers."""
+        with self._lock:
+            pool, self._classical = self._classical, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self, spec: tuple):
+        """Start the workers and load the models of `spec` ahead of the first analysis."""
+        pool = self._classical_pool()
+        futures = [pool.submit(_classify_classical, spec, [], False) for _ in range(self.classical_workers)]
+        for future in futures:
+            future.result()
+        logger.info(f"Started {self.classical_workers} classical model worker(s)")
+
+    def shutdown(self):
+        with self._lock:
+            classical, self._classical = self._classical, None
+            bert, self._bert = self._bert, None
+        if classical is not None:
+            classical.shutdown(wait=False, cancel_futures=True)
+        if bert is not None:
+            bert.shutdown(wait=False)
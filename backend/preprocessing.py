@@ -0,0 +1,36 @@
+import re
+from functools import lru_cache
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+# Ensure NLTK data is available
+nltk.download('stopwords')
+nltk.download('wordnet')
+
+URL_RE = re.compile(r'http\S+')
+NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+
+
+@lru_cache(maxsize=1)
+def get_stop_words() -> frozenset:
+    return frozenset(stopwords.words('english'))
+
+
+@lru_cache(maxsize=1)
+def get_lemmatizer() -> WordNetLemmatizer:
+    return WordNetLemmatizer()
+
+
+# --- Text Preprocessing ---
+def clean_text(text):
+    """Text normalization shared by the classifiers (and precomputed at corpus ingest)."""
+    lemmatizer = get_lemmatizer()
+    stop_words = get_stop_words()
+    text = URL_RE.sub('', text)  # Remove URLs
+    text = NON_ALPHA_RE.sub('', text)  # Remove non-alphabetic characters
+    text = text.lower()  # Convert to lowercase
+    words = text.split()
+    words = [lemmatizer.lemmatize(word) for word in words if word not in stop_words]
+    return ' '.join(words)
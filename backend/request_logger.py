@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from jose import JWTError, jwt
+
+from . import models, utils
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Tunables for the request log writer
+REQUEST_LOG_CAPACITY = int(os.getenv("REQUEST_LOG_CAPACITY", "10000"))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("REQUEST_LOG_FLUSH_INTERVAL", "2.0"))
+REQUEST_LOG_BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH_SIZE", "500"))
+
+
+class RequestLogBuffer:
+    """
+    Bounded in-memory buffer of request log entries.
+
+    `record` never blocks and never touches the database: when the buffer is
+    full the entry is dropped and counted instead. A background task drains
+    the buffer and writes it to the `logs` table in batched inserts; the
+    bearer tokens are only decoded there, off the request path.
+    """
+
+    def __init__(self, capacity: int = REQUEST_LOG_CAPACITY, batch_size: int = REQUEST_LOG_BATCH_SIZE):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def record(self, method: str, path: str, status_code: int, authorization: Optional[str] = None) -> bool:
+        """Queue a log entry. Returns False if the entry was dropped."""
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                self.dropped += 1
+                return False
+            self._buffer.append({
+                "method": method,
+                "path": path,
+                "status_code": status_code,
+                "authorization": authorization,
+            })
+            self.recorded += 1
+            return True
+
+    def drain(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Remove and return up to `limit` queued entries (oldest first)."""
+        limit = limit or self.batch_size
+        with self._lock:
+            count = min(limit, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        """Insert a batch of entries into the `logs` table in one transaction."""
+        if not batch:
+            return 0
+
+        db = SessionLocal()
+        try:
+            # Decode each distinct token once, then resolve subjects to user ids with a single query
+            subjects = {header: get_token_subject(header) for header in {entry["authorization"] for entry in batch}}
+            emails = {email for email in subjects.values() if email}
+            user_ids = {}
+            if emails:
+                rows = db.query(models.User.id, models.User.email).filter(models.User.email.in_(emails)).all()
+                user_ids = {email: user_id for user_id, email in rows}
+
+            db.bulk_insert_mappings(models.Log, [
+                {
+                    "method": entry["method"],
+                    "path": entry["path"],
+                    "status_code": entry["status_code"],
+                    "user_id": user_ids.get(subjects[entry["authorization"]]),
+                }
+                for entry in batch
+            ])
+            db.commit()
+            self.written += len(batch)
+            return len(batch)
+        except Exception as e:
+            db.rollback()
+            self.write_errors += 1
+            logger.error(f"Failed to write {len(batch)} request log entries: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def flush(self) -> int:
+        """Synchronously write everything currently queued."""
+        total = 0
+        while True:
+            batch = self.drain()
+            if not batch:
+                return total
+            total += self.write_batch(batch)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._buffer),
+            "capacity": self.capacity,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "writeErrors": self.write_errors,
+        }
+
+
+request_log_buffer = RequestLogBuffer()
+
+
+def get_token_subject(authorization: Optional[str]) -> Optional[str]:
+    """Extract the user email from a bearer token without hitting the database."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], utils.SECRET_KEY, algorithms=[utils.ALGORITHM])
+        return payload.get("sub")
+    except JWTError:
+        return None
+
+
+async def log_requests_middleware(request, call_next):
+    """HTTP middleware that queues one log entry per API call."""
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Prefer the route template so per-endpoint counts aggregate properly
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or request.url.path
+        request_log_buffer.record(
+            method=request.method,
+            path=path,
+            status_code=status_code,
+            authorization=request.headers.get("authorization"),
+        )
+
+
+async def flush_request_logs_periodically(buffer: RequestLogBuffer = request_log_buffer,
+                                          interval: float = REQUEST_LOG_FLUSH_INTERVAL):
+    """Background task: drain the buffer into the database every `interval` seconds."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            while len(buffer):
+                batch = buffer.drain()
+                await asyncio.to_thread(buffer.write_batch, batch)
+    except asyncio.CancelledError:
+        # Write whatever is left before shutting down
+        await asyncio.to_thread(buffer.flush)
+        raise
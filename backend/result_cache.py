@@ -0,0 +1,182 @@
+"""
+Whole-analysis result cache for file-mode queries.
+
+A file-mode analysis is fully determined by the normalized query, the corpus
+file (path, modification time and size), the model versions and the options
+that change the result (cascade threshold, topic settings). The response of
+the first such analysis is stored once in `analysis_results`, keyed by a hash
+of those; every analysis of the same key, by any user, is then an `analyses`
+row that only references it (`result_id`, empty `response_data`). A hit costs
+one indexed lookup and the stored JSON is returned as it is, with only its
+`id` and `query` replaced, so it is served in milliseconds however large the
+result.
+
+Concurrent identical requests are single-flighted in-process: one runs the
+pipeline and the others wait for its result. Results older than
+ANALYSIS_CACHE_TTL are recomputed, and are deleted once no analysis
+references them.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .fetch_scheduler import normalize_query
+
+ANALYSIS_CACHE = os.getenv("ANALYSIS_CACHE", "true").lower() in ("1", "true", "yes")
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+
+_decoder = json.JSONDecoder()
+
+
+@dataclass
+class CachedResult:
+    id: int
+    key: str
+    response_json: str
+    model_versions: Optional[Dict[str, Any]]
+
+
+def source_fingerprint(path: str) -> Dict[str, Any]:
+    """Identity of a data file's contents: real path, modification time and size."""
+    stat = os.stat(path)
+    return {"path": os.path.realpath(path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def cache_key(query: str, source: Dict[str, Any], model_versions: Dict[str, Any],
+              options: Optional[Dict[str, Any]] = None) -> str:
+    """Hash of everything a file-mode analysis result depends on."""
+    payload = json.dumps([normalize_query(query), source, model_versions, options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def with_analysis_id(response_json: str, analysis_id: str, query: Optional[str] = None) -> str:
+    """
+    A stored response with its `id` (and `query`) replaced. They are its first
+    fields, so the rest of the JSON is copied without being parsed.
+    """
+    try:
+        prefix, marker = '{"id": ', ', "query": '
+        if not response_json.startswith(prefix):
+            raise ValueError("id is not the first field")
+        _, end = _decoder.raw_decode(response_json, len(prefix))
+        head = prefix + json.dumps(analysis_id)
+        if query is not None:
+            if not response_json.startswith(marker, end):
+                raise ValueError("query is not the second field")
+            _, end = _decoder.raw_decode(response_json, end + len(marker))
+            head += marker + json.dumps(query)
+        return head + response_json[end:]
+    except ValueError:
+        response = json.loads(response_json)
+        response["id"] = analysis_id
+        if query is not None:
+            response["query"] = query
+        return json.dumps(response)
+
+
+class AnalysisResultCache:
+    """Result store in the database plus in-process single-flight of identical analyses."""
+
+    def __init__(self, ttl: float = ANALYSIS_CACHE_TTL):
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def lookup(self, db: Session, key: str) -> Optional[CachedResult]:
+        """The newest unexpired result for a key, if any."""
+        row = db.query(models.AnalysisResult).filter(
+            models.AnalysisResult.cache_key == key,
+            models.AnalysisResult.created_at >= self._cutoff()
+        ).order_by(models.AnalysisResult.id.desc()).first()
+        if row is None:
+            return None
+        self.hits += 1
+        return CachedResult(row.id, key, row.response_data, json.loads(row.model_versions) if row.model_versions else None)
+
+    def store(self, db: Session, key: str, response_json: str,
+              model_versions: Optional[Dict[str, Any]] = None) -> CachedResult:
+        """Store a computed result and drop expired results nothing references any more."""
+        row = models.AnalysisResult(
+            cache_key=key,
+            response_data=response_json,
+            model_versions=json.dumps(model_versions) if model_versions else None
+        )
+        db.add(row)
+        referenced = db.query(models.Analysis.result_id).filter(models.Analysis.result_id.isnot(None))
+        db.query(models.AnalysisResult).filter(
+            models.AnalysisResult.created_at < self._cutoff(),
+            models.AnalysisResult.id.notin_(referenced)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return CachedResult(row.id, key, response_json, model_versions)
+
+    def load(self, db: Session, result_id: int, analysis_id: str, query: Optional[str] = None) -> str:
+        """Response JSON of a referenced result, as the analysis `analysis_id` (of `query`)."""
+        response_json = db.query(models.AnalysisResult.response_data).filter(
+            models.AnalysisResult.id == result_id
+        ).scalar()
+        if response_json is None:
+            raise LookupError(f"Cached result {result_id} no longer exists")
+        return with_analysis_id(response_json, analysis_id, query)
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[CachedResult]]) -> CachedResult:
+        """
+        Await `compute()` for a missed key; callers arriving while it runs
+        share its result (or exception) instead of computing it again. If the
+        caller computing it is cancelled, the others are not: one of them
+        computes it instead.
+        """
+        joined = False
+        while key in self._inflight:
+            if not joined:
+                self.coalesced += 1
+                joined = True
+            result = await asyncio.shield(self._inflight[key])
+            if result is not None:
+                return result
+            # None: the computing caller was cancelled (its entry is already removed)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved so an unawaited failure is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def render_metrics(self) -> str:
+        """Prometheus exposition of the cache counters."""
+        lines = []
+        for name, value in [
+            ("analysis_cache_hits_total", self.hits),
+            ("analysis_cache_misses_total", self.misses),
+            ("analysis_cache_coalesced_total", self.coalesced),
+        ]:
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+result_cache = AnalysisResultCache()
@@ -1,30 +1,51 @@
 import os
+import math
+import time
 import uuid
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+import asyncio
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 import pandas as pd
 from pydantic import BaseModel
 import numpy as np
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from sklearn.metrics import confusion_matrix, accuracy_score, precision_score, recall_score, f1_score
 
-from . import auth, schemas, database, models, analysis
-from .twitter_client import get_twitter_client
+from . import auth, schemas, database, models, analysis, cascade, request_logger, sampling, similarity, topics, tracing, streaming, uploads
+from .aggregation import SentimentAggregator
+from .classical import FeatureRows
+from .corpus import ANALYSIS_COLUMNS, get_corpus, union_rows
+from .fetch_scheduler import RateLimitExceeded, normalize_query
+from .materialize import attach_predictions
+from .result_cache import ANALYSIS_CACHE, cache_key, result_cache, source_fingerprint, with_analysis_id
+from .tweet_cache import fetch_live_tweets
 
 router = APIRouter()
 
 # Define base directory relative to this file's location
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
+PROFILES_DIR = os.path.join(RESULTS_DIR, "profiles")
+UPLOADS_DIR = os.path.join(RESULTS_DIR, "uploads")
+
+# Local tweet corpus used in file mode (and as the live-mode fallback): CSV, or .arrow/.parquet from ingest.py
+CORPUS_PATH = os.getenv("CORPUS_PATH", os.path.join(BASE_DIR, "sample_tweets.csv"))
+# Also loaded: the columns approximate analyses are stratified by
+CORPUS_COLUMNS = tuple(dict.fromkeys(ANALYSIS_COLUMNS + sampling.STRATA_COLUMNS))
+
+# Upper bound on tweets collected for a single live analysis
+MAX_LIVE_RESULTS = int(os.getenv("TWITTER_MAX_RESULTS", "1000"))
+
+# Upper bound on queries in one batch analysis
+ANALYZE_BATCH_MAX_QUERIES = int(os.getenv("ANALYZE_BATCH_MAX_QUERIES", "100"))
 
 # Ensure results directory exists
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-# File upload endpoint removed - not needed for social media analysis
-
 @router.get("/reports/", response_model=List[schemas.Report])
 def list_user_reports(
     db: Session = Depends(database.get_db),
@@ -64,6 +85,13 @@ def download_report(
 class AnalyzeQueryRequest(BaseModel):
     query: str
     useLiveData: bool = False
+    maxResults: int = 100  # live mode only; more than 100 follows pagination
+    incrementalRefresh: bool = False  # live mode only; fetch just the tweets newer than the cached ones
+    profile: bool = False  # capture a profile (requires ENABLE_REQUEST_PROFILING on the server)
+    cascadeThreshold: Optional[float] = None  # only posts below this classical confidence go to BERT (default: CASCADE_MODE)
+    approximate: bool = False  # file mode only; classify a stratified sample and estimate the distribution
+    sampleSize: Optional[int] = None  # approximate mode sample size (default: APPROXIMATE_SAMPLE_SIZE)
+    refine: bool = False  # approximate mode; replace the stored result with the exact one in the background
 
 class SentimentData(BaseModel):
     sentiment: str
@@ -91,313 +119,769 @@ class AnalysisResponse(BaseModel):
     modelMetrics: Dict[str, ModelMetrics]
     insights: Dict[str, Any]
     rawData: List[Dict[str, Any]]  # processed tweet data
+    timings: Optional[Dict[str, Any]] = None  # per-stage pipeline durations
+    modelVersions: Optional[Dict[str, Any]] = None  # model release and fingerprints used
 
-def extract_words_for_sentiment(df: pd.DataFrame, sentiment: str) -> List[str]:
-    """Extract and return words for a specific sentiment"""
-    try:
-        text = ' '.join(df[df['bert_sentiment'] == sentiment]['cleaned_text'])
-        if not text.strip():
-            return []
-        
-        # Simple word extraction (client can generate word cloud)
-        words = text.split()
-        # Remove duplicates while preserving order
-        unique_words = list(dict.fromkeys(words))
-        return unique_words[:100]  # Limit to top 100 words
-    except Exception as e:
-        print(f"Error extracting words for {sentiment}: {e}")
-        return []
+class AnalyzeBatchRequest(BaseModel):
+    queries: List[str]  # file mode; each gets its own stored analysis
+    cascadeThreshold: Optional[float] = None
 
-@router.post("/analyze_query/", response_model=AnalysisResponse)
-async def analyze_query(
-    request: AnalyzeQueryRequest,
-    db: Session = Depends(database.get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
-):
+class BatchAnalysisResponse(BaseModel):
+    analyses: List[AnalysisResponse]  # in the order of the queries
+    cachedAnalyses: int  # distinct queries answered from the result cache
+    uniquePosts: int  # posts classified for the batch (each once)
+    matchedPosts: int  # posts of the computed analyses, counted per query
+    timings: Optional[Dict[str, Any]] = None
+
+async def load_query_data(request: AnalyzeQueryRequest, trace: tracing.PipelineTrace = None, user_key=None,
+                          versions: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
     """
-    Analyze social media sentiment based on a query.
-    Returns comprehensive chart data and metrics matching the analysis.ipynb notebook.
-    Supports both live Twitter data and existing file data based on useLiveData parameter.
+    Load the posts to analyze for a query.
+    Live mode fetches from Twitter (falling back to the corpus file on API errors,
+    but a 429 with Retry-After when the rate-limit budget is exhausted),
+    file mode looks the query up in the indexed corpus file (CORPUS_PATH).
+    With `approximate`, file mode loads only a stratified sample of the matching
+    rows, described by `df.attrs["sample"]` (a sampling.StratifiedSample).
+    `user_key` identifies the caller for fair queueing of live fetches, and
+    `versions` the models whose stored predictions are attached (see materialize.py).
     """
-    try:
-        # Load data based on useLiveData parameter
-        if request.useLiveData:
-            # Fetch live data from Twitter
-            if not request.query.strip():
-                raise HTTPException(status_code=400, detail="Query is required for live Twitter data")
+    if request.useLiveData:
+        # Fetch live data from Twitter
+        if not request.query.strip():
+            raise HTTPException(status_code=400, detail="Query is required for live Twitter data")
+        
+        try:
+            max_results = min(max(request.maxResults, 10), MAX_LIVE_RESULTS)
             
-            try:
-                twitter_client = get_twitter_client()
-                df = twitter_client.search_tweets(request.query, max_results=100)
-                
-                if df.empty:
-                    raise HTTPException(status_code=404, detail=f"No tweets found for query: '{request.query}'")
-                
-                # Preprocess the tweets
-                df = twitter_client.preprocess_tweets_dataframe(df)
-                
-            except Exception as e:
-                # If Twitter API fails, fall back to loading data from existing file
-                print(f"Twitter API error: {e}. Falling back to existing data file.")
-                sample_data_path = os.path.join(BASE_DIR, "sample_tweets.csv")
-                
-                if os.path.exists(sample_data_path):
-                    df = pd.read_csv(sample_data_path)
-                    print(f"Loaded {len(df)} tweets from sample_tweets.csv as fallback")
-                else:
-                    # Only create hardcoded sample data if no file exists at all
-                    df = pd.DataFrame({
-                        'text': [
-                            f"Sample tweet about {request.query} - I love this!",
-                            f"Not impressed with {request.query} at all",
-                            f"{request.query} is okay, nothing special",
-                            f"Absolutely fantastic {request.query}! Highly recommend",
-                            f"Not good {request.query}, very disappointed"
-                        ]
-                    })
-                    print("No sample_tweets.csv found, using hardcoded fallback data")
-        else:
-            # Load data from existing file
-            sample_data_path = os.path.join(BASE_DIR, "sample_tweets.csv")
+            # Served from the query cache when possible; otherwise the shared scheduler
+            # pools the client, coalesces identical queries and paces calls to the rate limit
+            with tracing.stage(trace, "twitter_fetch") as record:
+                df = await fetch_live_tweets(request.query, max_results, user_key=user_key,
+                                             incremental=request.incrementalRefresh)
+                record["rows"] = len(df)
             
-            if os.path.exists(sample_data_path):
-                df = pd.read_csv(sample_data_path)
+            if df.empty:
+                raise HTTPException(status_code=404, detail=f"No tweets found for query: '{request.query}'")
+            
+        except RateLimitExceeded as e:
+            # Out of rate-limit budget: tell the client when to retry rather than passing off the corpus as live data
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+        except Exception as e:
+            # If Twitter API fails, fall back to loading data from existing file
+            print(f"Twitter API error: {e}. Falling back to existing data file.")
+            if os.path.exists(CORPUS_PATH):
+                with tracing.stage(trace, "file_load") as record:
+                    df = (await asyncio.to_thread(get_corpus, CORPUS_PATH, CORPUS_COLUMNS)).frame()
+                    record["rows"] = len(df)
+                print(f"Loaded {len(df)} tweets from {os.path.basename(CORPUS_PATH)} as fallback")
             else:
-                # Create sample data if file doesn't exist
+                # Only create hardcoded sample data if no file exists at all
                 df = pd.DataFrame({
                     'text': [
-                        "I love this product! It's amazing!",
-                        "This is terrible, worst experience ever",
-                        "It's okay, nothing special",
-                        "Absolutely fantastic! Highly recommend",
-                        "Not good at all, very disappointed",
-                        "Pretty decent, could be better",
-                        "Outstanding quality and service!",
-                        "Waste of money, don't buy this",
-                        "Average product, meets expectations",
-                        "Excellent! Will buy again!",
-                        "Great service and fast delivery",
-                        "Poor quality, not worth the price",
-                        "Neutral experience, nothing special",
-                        "Amazing product, exceeded expectations!",
-                        "Disappointed with the purchase"
+                        f"Sample tweet about {request.query} - I love this!",
+                        f"Not impressed with {request.query} at all",
+                        f"{request.query} is okay, nothing special",
+                        f"Absolutely fantastic {request.query}! Highly recommend",
+                        f"Not good {request.query}, very disappointed"
                     ]
                 })
-            
-            # Filter data based on query if provided
-            if request.query.strip():
-                df_filtered = df[df['text'].str.contains(request.query, case=False, na=False)]
-                if df_filtered.empty:
-                    df_filtered = df
-            else:
-                df_filtered = df
-        
-        # Use filtered data for file-based analysis, or all data for live analysis
-        df_filtered = df_filtered if not request.useLiveData else df
-        
-        # Run sentiment analysis
-        df_results = analysis.run_analysis(df_filtered)
-        
-        # Get sentiment counts for each model
-        nb_counts = df_results['nb_sentiment'].value_counts()
-        svm_counts = df_results['svm_sentiment'].value_counts()
-        bert_counts = df_results['bert_sentiment'].value_counts()
-        
-        sentiments = ['negative', 'neutral', 'positive']
-        total_tweets = len(df_results)
-        
-        # 1. Sentiment Distribution Data
-        sentiment_distribution = []
+                print("No sample_tweets.csv found, using hardcoded fallback data")
+        return df
+
+    # Load data from the indexed corpus file (read once, reloaded when it changes)
+    if os.path.exists(CORPUS_PATH):
+        with tracing.stage(trace, "file_load") as record:
+            # Loading/reindexing a large file is slow, so keep it off the event loop.
+            # One snapshot, so the rows searched and the rows loaded come from the same version
+            corpus = (await asyncio.to_thread(get_corpus, CORPUS_PATH, CORPUS_COLUMNS)).snapshot()
+            record["rows"] = len(corpus)
+        rows = None
+        if request.query.strip():
+            with tracing.stage(trace, "query_filter", len(corpus)):
+                rows = corpus.search(request.query)
+            if not len(rows):
+                rows = None
+        sample = None
+        if request.approximate:
+            population = rows if rows is not None else np.arange(len(corpus))
+            sample_size = request.sampleSize or sampling.APPROXIMATE_SAMPLE_SIZE
+            if len(population) > sample_size:
+                with tracing.stage(trace, "sampling", len(population)) as record:
+                    strata = await asyncio.to_thread(corpus.frame, population, sampling.STRATA_COLUMNS)
+                    sample = await asyncio.to_thread(sampling.stratified_sample, strata, sample_size)
+                    rows = population[sample.positions]
+                    record["strata"] = len(sample.population)
+        df = corpus.frame(rows)
+        # Reuse predictions stored by materialize.py; only rows without them get classified
+        with tracing.stage(trace, "materialized_lookup") as record:
+            record["rows"] = await asyncio.to_thread(attach_predictions, df, CORPUS_PATH, rows, versions=versions)
+        if sample is not None:
+            # Read back by compute_analysis to turn the sample's counts into estimates
+            df.attrs["sample"] = sample
+        return df
+    else:
+        # Create sample data if file doesn't exist
+        df = pd.DataFrame({
+            'text': [
+                "I love this product! It's amazing!",
+                "This is terrible, worst experience ever",
+                "It's okay, nothing special",
+                "Absolutely fantastic! Highly recommend",
+                "Not good at all, very disappointed",
+                "Pretty decent, could be better",
+                "Outstanding quality and service!",
+                "Waste of money, don't buy this",
+                "Average product, meets expectations",
+                "Excellent! Will buy again!",
+                "Great service and fast delivery",
+                "Poor quality, not worth the price",
+                "Neutral experience, nothing special",
+                "Amazing product, exceeded expectations!",
+                "Disappointed with the purchase"
+            ]
+        })
+    
+    # Filter data based on query if provided
+    if request.query.strip():
+        with tracing.stage(trace, "query_filter", len(df)):
+            df_filtered = df[df['text'].str.contains(request.query, case=False, na=False, regex=False)]
+        if df_filtered.empty:
+            df_filtered = df
+    else:
+        df_filtered = df
+    return df_filtered
+
+def build_analysis_response(df_results: pd.DataFrame, query: str, analysis_id: str, bundle=None,
+                            feature_rows: Optional[FeatureRows] = None) -> AnalysisResponse:
+    """
+    Build the chart data, metrics and insights for analyzed posts.
+    `feature_rows` are the classical features run_analysis computed for them, reused for topics.
+    """
+    aggregator = SentimentAggregator(topics=topics.for_bundle(bundle or analysis.model_registry.active()))
+    aggregator.add(df_results, feature_rows)
+    return build_aggregate_response(aggregator, query, analysis_id)
+
+def build_aggregate_response(aggregator: SentimentAggregator, query: str, analysis_id: str) -> AnalysisResponse:
+    """Build the analysis response from aggregated predictions (see aggregation.py)."""
+    # Get sentiment counts for each model
+    nb_counts = aggregator.counts('nb_sentiment')
+    svm_counts = aggregator.counts('svm_sentiment')
+    bert_counts = aggregator.counts('bert_sentiment')
+    
+    sentiments = ['negative', 'neutral', 'positive']
+    total_tweets = aggregator.total
+    
+    # 1. Sentiment Distribution Data
+    sentiment_distribution = []
+    for sentiment in sentiments:
+        count = int(bert_counts.get(sentiment, 0))
+        percentage = round((count / total_tweets * 100) if total_tweets > 0 else 0, 2)
+        sentiment_distribution.append(SentimentData(
+            sentiment=sentiment,
+            count=count,
+            percentage=percentage
+        ))
+    
+    # 2. Model Performance Comparison Data
+    # Calculate accuracy for each model (using BERT as ground truth)
+    # Metrics are weighted by the number of posts per (NB, SVM, BERT) label combination;
+    # in cascade mode only escalated posts are compared (see SentimentAggregator.label_pairs)
+    nb_true, nb_pred, nb_weights = aggregator.label_pairs('nb_sentiment')
+    svm_true, svm_pred, svm_weights = aggregator.label_pairs('svm_sentiment')
+    compared_posts = int(nb_weights.sum())
+    models_data = {
+        "Naive Bayes": (nb_true, nb_pred, nb_weights),
+        "SVM": (svm_true, svm_pred, svm_weights)
+    } if compared_posts else {}
+    
+    # Left out when no post has a BERT label to compare with (a cascade that escalated nothing)
+    model_comparison = {
+        model_name: round(accuracy_score(y_true, y_pred, sample_weight=weights), 3)
+        for model_name, (y_true, y_pred, weights) in models_data.items()
+    }
+    if models_data:
+        model_comparison["BERT"] = 1.0  # BERT compared to itself
+    
+    # 3. Sentiment Count Comparison Data
+    sentiment_counts = {}
+    for model_name, counts in [("Naive Bayes", nb_counts), ("SVM", svm_counts), ("BERT", bert_counts)]:
+        model_sentiments = []
         for sentiment in sentiments:
-            count = int(bert_counts.get(sentiment, 0))
+            count = int(counts.get(sentiment, 0))
             percentage = round((count / total_tweets * 100) if total_tweets > 0 else 0, 2)
-            sentiment_distribution.append(SentimentData(
+            model_sentiments.append(SentimentData(
                 sentiment=sentiment,
                 count=count,
                 percentage=percentage
             ))
+        sentiment_counts[model_name] = model_sentiments
+    
+    # 4. Word Cloud Data for each sentiment
+    wordcloud_data = {}
+    for sentiment in ['positive', 'negative', 'neutral']:
+        if bert_counts.get(sentiment, 0):
+            words = aggregator.words_for_sentiment(sentiment)
+            if words:
+                wordcloud_data[sentiment] = words
+    
+    # 5. Confusion Matrices Data for each model
+    confusion_matrices = {}
+    class_labels = sorted(label for label, count in bert_counts.items() if count)
+    
+    for model_name, (y_true, y_pred, weights) in models_data.items():
+        cm = confusion_matrix(y_true, y_pred, labels=class_labels, sample_weight=weights)
+        confusion_matrices[model_name] = cm.astype(int).tolist()
+    
+    # 6. Time Series Data (simulated with realistic data)
+    time_series_data = []
+    if aggregator.has_timestamp:
+        # Use real timestamp data if available
+        for date in sorted(aggregator.daily):
+            daily_counts = aggregator.daily[date]
+            time_series_data.append({
+                "date": str(date),
+                "positive": int(daily_counts.get('positive', 0)),
+                "negative": int(daily_counts.get('negative', 0)),
+                "neutral": int(daily_counts.get('neutral', 0))
+            })
+    else:
+        # Generate simulated time series data with realistic dates
+        start_date = datetime.now() - timedelta(days=6)
         
-        # 2. Model Performance Comparison Data
-        # Calculate accuracy for each model (using BERT as ground truth)
-        nb_accuracy = accuracy_score(df_results['bert_sentiment'], df_results['nb_sentiment'])
-        svm_accuracy = accuracy_score(df_results['bert_sentiment'], df_results['svm_sentiment'])
-        bert_accuracy = 1.0  # BERT compared to itself
-        
-        model_comparison = {
-            "Naive Bayes": round(nb_accuracy, 3),
-            "SVM": round(svm_accuracy, 3),
-            "BERT": round(bert_accuracy, 3)
-        }
-        
-        # 3. Sentiment Count Comparison Data
-        sentiment_counts = {}
-        for model_name, counts in [("Naive Bayes", nb_counts), ("SVM", svm_counts), ("BERT", bert_counts)]:
-            model_sentiments = []
-            for sentiment in sentiments:
-                count = int(counts.get(sentiment, 0))
-                percentage = round((count / total_tweets * 100) if total_tweets > 0 else 0, 2)
-                model_sentiments.append(SentimentData(
-                    sentiment=sentiment,
-                    count=count,
-                    percentage=percentage
-                ))
-            sentiment_counts[model_name] = model_sentiments
-        
-        # 4. Word Cloud Data for each sentiment
-        wordcloud_data = {}
-        for sentiment in ['positive', 'negative', 'neutral']:
-            if sentiment in bert_counts.index:
-                words = extract_words_for_sentiment(df_results, sentiment)
-                if words:
-                    wordcloud_data[sentiment] = words
-        
-        # 5. Confusion Matrices Data for each model
-        confusion_matrices = {}
-        class_labels = sorted(df_results['bert_sentiment'].unique())
-        
-        models_data = {
-            "Naive Bayes": df_results['nb_sentiment'],
-            "SVM": df_results['svm_sentiment']
+        for i in range(7):
+            current_date = start_date + timedelta(days=i)
+            base_positive = int(bert_counts.get('positive', 0) / 7)
+            base_negative = int(bert_counts.get('negative', 0) / 7)
+            base_neutral = int(bert_counts.get('neutral', 0) / 7)
+            
+            time_series_data.append({
+                "date": current_date.strftime("%Y-%m-%d"),
+                "positive": max(0, base_positive + np.random.randint(-2, 3)),
+                "negative": max(0, base_negative + np.random.randint(-2, 3)),
+                "neutral": max(0, base_neutral + np.random.randint(-2, 3))
+            })
+    
+    # Calculate comprehensive metrics
+    positive_pct = (bert_counts.get('positive', 0) / total_tweets * 100) if total_tweets > 0 else 0
+    negative_pct = (bert_counts.get('negative', 0) / total_tweets * 100) if total_tweets > 0 else 0
+    neutral_pct = (bert_counts.get('neutral', 0) / total_tweets * 100) if total_tweets > 0 else 0
+    
+    metrics = {
+        "totalTweets": total_tweets,
+        "positivePercentage": round(positive_pct, 2),
+        "negativePercentage": round(negative_pct, 2),
+        "neutralPercentage": round(neutral_pct, 2),
+        "overallSentiment": "positive" if positive_pct > negative_pct else "negative" if negative_pct > positive_pct else "neutral",
+        "confidenceScore": round(max(positive_pct, negative_pct, neutral_pct), 2)
+    }
+    if aggregator.escalated is not None:
+        # Cascade mode: BERT labels only exist for escalated posts, the rest carry the classical label,
+        # so model agreement is measured on the escalated posts only
+        metrics["cascade"] = {
+            "escalatedPosts": aggregator.escalated,
+            "escalatedFraction": round(aggregator.escalated / total_tweets, 4) if total_tweets > 0 else 0.0,
+            "comparedPosts": compared_posts,
         }
-        
-        for model_name, predictions in models_data.items():
-            cm = confusion_matrix(df_results['bert_sentiment'], predictions, labels=class_labels)
-            confusion_matrices[model_name] = cm.tolist()
-        
-        # 6. Time Series Data (simulated with realistic data)
-        time_series_data = []
-        if 'timestamp' in df_results.columns:
-            # Use real timestamp data if available
-            df_results['date'] = pd.to_datetime(df_results['timestamp']).dt.date
-            time_sentiment = df_results.groupby(['date', 'bert_sentiment']).size().unstack(fill_value=0)
+    
+    # Calculate model metrics
+    model_metrics = {}
+    for model_name, (y_true, y_pred, weights) in models_data.items():
+        if model_name != "BERT":
+            # Calculate metrics
+            acc = accuracy_score(y_true, y_pred, sample_weight=weights)
+            prec = precision_score(y_true, y_pred, average='weighted', zero_division=0, sample_weight=weights)
+            rec = recall_score(y_true, y_pred, average='weighted', zero_division=0, sample_weight=weights)
+            f1 = f1_score(y_true, y_pred, average='weighted', zero_division=0, sample_weight=weights)
+            cm = confusion_matrix(y_true, y_pred, labels=class_labels, sample_weight=weights)
             
-            for date in time_sentiment.index:
-                time_series_data.append({
-                    "date": str(date),
-                    "positive": int(time_sentiment.loc[date].get('positive', 0)),
-                    "negative": int(time_sentiment.loc[date].get('negative', 0)),
-                    "neutral": int(time_sentiment.loc[date].get('neutral', 0))
-                })
+            model_metrics[model_name] = ModelMetrics(
+                accuracy=round(acc, 4),
+                precision=round(prec, 4),
+                recall=round(rec, 4),
+                f1_score=round(f1, 4),
+                confusion_matrix=cm.astype(int).tolist()
+            )
+    
+    # Generate insights (matching notebook style)
+    insights = {
+        "sentimentBalance": {
+            "positive": round(positive_pct, 1),
+            "negative": round(negative_pct, 1),
+            "neutral": round(neutral_pct, 1)
+        },
+        "modelBehavior": "The models show good performance in identifying positive and negative sentiments, with some challenges in neutral classification."
+    }
+    if model_metrics:
+        best_model = max(model_metrics.keys(), key=lambda k: model_metrics[k].accuracy)
+        insights["bestModel"] = {
+            "name": best_model,
+            "accuracy": round(model_metrics[best_model].accuracy, 3)
+        }
+    if aggregator.topics is not None:
+        # Topics per BERT sentiment, fitted while the posts were aggregated
+        insights["topics"] = aggregator.topics.summary()
+        insights["modelBehavior"] = topics.describe_topics(insights["topics"]) or insights["modelBehavior"]
+    
+    return AnalysisResponse(
+        id=analysis_id,
+        query=query,
+        createdAt=datetime.now().isoformat(),
+        sentimentDistribution=sentiment_distribution,
+        modelComparison=model_comparison,
+        sentimentCounts=sentiment_counts,
+        timeSeriesData=time_series_data,
+        wordCloudData=wordcloud_data,
+        confusionMatrices=confusion_matrices,
+        metrics=metrics,
+        modelMetrics=model_metrics,
+        insights=insights,
+        rawData=aggregator.raw_data
+    )
+
+def save_analysis(db: Session, analysis_id: str, query: str, response_json: str, user_id: int,
+                  model_versions: Optional[Dict[str, Any]] = None, result_id: Optional[int] = None):
+    """
+    Persist an analysis response; failures are logged and do not fail the request.
+    With `result_id` the analysis references a cached result instead of holding a copy.
+    """
+    try:
+        db_analysis = models.Analysis(
+            analysis_id=analysis_id,
+            query=query,
+            response_data="" if result_id is not None else response_json,
+            model_versions=json.dumps(model_versions) if model_versions else None,
+            result_id=result_id,
+            user_id=user_id
+        )
+        db.add(db_analysis)
+        db.commit()
+        db.refresh(db_analysis)
+    except Exception as e:
+        print(f"Error saving analysis to database: {e}")
+        # Continue without failing the request
+
+def stored_response_json(db: Session, db_analysis: models.Analysis) -> str:
+    """The response JSON of a stored analysis, following its reference to a cached result."""
+    if db_analysis.result_id is None:
+        return db_analysis.response_data
+    try:
+        return result_cache.load(db, db_analysis.result_id, db_analysis.analysis_id, db_analysis.query)
+    except LookupError:
+        return ""
+
+def result_cache_key(request: AnalyzeQueryRequest, bundle) -> Optional[str]:
+    """
+    Result cache key of a file-mode analysis, or None when it has to run
+    (ANALYSIS_CACHE off, live data, profiling, or no corpus file).
+    """
+    if not ANALYSIS_CACHE or request.useLiveData or request.profile or not os.path.exists(CORPUS_PATH):
+        return None
+    options = {
+        "cascadeThreshold": cascade.resolve_threshold(request.cascadeThreshold),
+        "topics": topics.TOPICS_PER_SENTIMENT if topics.TOPIC_EXTRACTION else 0,
+        "sampleSize": (request.sampleSize or sampling.APPROXIMATE_SAMPLE_SIZE) if request.approximate else None,
+    }
+    return cache_key(request.query, source_fingerprint(CORPUS_PATH), bundle.describe(), options)
+
+def exact_request(request: AnalyzeQueryRequest) -> AnalyzeQueryRequest:
+    """The same analysis without approximate mode."""
+    return request.copy(update={"approximate": False, "sampleSize": None, "refine": False})
+
+def apply_sample_estimates(response: AnalysisResponse, df_results: pd.DataFrame, sample: sampling.StratifiedSample):
+    """
+    Approximate mode: replace the sample's counts with estimates for all matching
+    posts, with bootstrap confidence intervals in `metrics.approximate`.
+    Model agreement (modelComparison, confusion matrices) is measured on the sample.
+    """
+    estimates = {}
+    for model_name, column in [("Naive Bayes", "nb_sentiment"), ("SVM", "svm_sentiment"), ("BERT", "bert_sentiment")]:
+        # Intervals only for the final (BERT) labels
+        n_boot = sampling.APPROXIMATE_BOOTSTRAP if column == "bert_sentiment" else 0
+        estimates[model_name] = sampling.estimate_distribution(df_results[column], sample, n_boot=n_boot)
+        response.sentimentCounts[model_name] = [
+            SentimentData(sentiment=sentiment, count=estimate["count"], percentage=round(estimate["share"] * 100, 2))
+            for sentiment, estimate in estimates[model_name].items()
+        ]
+    response.sentimentDistribution = response.sentimentCounts["BERT"]
+    if 'timestamp' in df_results.columns:
+        response.timeSeriesData = sampling.estimate_daily(df_results['timestamp'], df_results['bert_sentiment'],
+                                                          sample.weights())
+    
+    percentages = {s.sentiment: s.percentage for s in response.sentimentDistribution}
+    positive_pct, negative_pct = percentages["positive"], percentages["negative"]
+    response.metrics.update({
+        "totalTweets": sample.population_size,
+        "positivePercentage": positive_pct,
+        "negativePercentage": negative_pct,
+        "neutralPercentage": percentages["neutral"],
+        "overallSentiment": "positive" if positive_pct > negative_pct else "negative" if negative_pct > positive_pct else "neutral",
+        "confidenceScore": max(percentages.values()),
+        "approximate": {
+            **sample.describe(),
+            "confidenceLevel": sampling.APPROXIMATE_CONFIDENCE,
+            "bootstrapSamples": sampling.APPROXIMATE_BOOTSTRAP,
+            "distribution": {sentiment: {k: estimate[k] for k in ("share", "low", "high")}
+                             for sentiment, estimate in estimates["BERT"].items()},
+        },
+    })
+    response.insights["sentimentBalance"] = {sentiment: round(percentages[sentiment], 1)
+                                             for sentiment in ("positive", "negative", "neutral")}
+
+async def compute_analysis(request: AnalyzeQueryRequest, analysis_id: str, trace: tracing.PipelineTrace,
+                           user_key, bundle) -> AnalysisResponse:
+    """Load, classify and summarize the posts of a query with the models of `bundle`."""
+    # Load data based on useLiveData parameter
+    df_filtered = await load_query_data(request, trace, user_key=user_key, versions=bundle.versions)
+    sample = df_filtered.attrs.pop("sample", None)
+    
+    # Run sentiment analysis, keeping the classical features for topic extraction
+    feature_rows = FeatureRows(len(df_filtered))
+    df_results = await asyncio.to_thread(analysis.run_analysis, df_filtered, trace,
+                                         cascade_threshold=request.cascadeThreshold, bundle=bundle,
+                                         feature_rows=feature_rows)
+    
+    with tracing.stage(trace, "metrics", len(df_results)):
+        response = build_analysis_response(df_results, request.query, analysis_id, bundle, feature_rows)
+        response.modelVersions = df_results.attrs.get("model_versions")
+        if sample is not None:
+            apply_sample_estimates(response, df_results, sample)
+    return response
+
+async def compute_cached_analysis(db: Session, key: str, request: AnalyzeQueryRequest, analysis_id: str,
+                                  trace: tracing.PipelineTrace, user_key, bundle, exact_key: Optional[str] = None):
+    """
+    Compute and store the result for a missed cache key. Returns the stored result and,
+    unless a concurrent identical request computed it, the response.
+    An approximate result whose sample covered every post is stored under `exact_key`.
+    """
+    computed = {}
+    
+    async def compute():
+        response = computed["response"] = await compute_analysis(request, analysis_id, trace, user_key, bundle)
+        with tracing.stage(trace, "serialization", len(response.rawData)):
+            response_json = json.dumps(response.dict())
+        store_key = key if exact_key is None or "approximate" in response.metrics else exact_key
+        with tracing.stage(trace, "db_write"):
+            return await asyncio.to_thread(result_cache.store, db, store_key, response_json, response.modelVersions)
+    
+    # Identical requests arriving meanwhile wait for this one's result
+    cached = await result_cache.run(key, compute)
+    return cached, computed.get("response")
+
+def replace_analysis_result(db: Session, analysis_id: str, response_json: str = "", result_id: Optional[int] = None):
+    """Point a stored analysis at a new response (its own copy, or a cached result)."""
+    db.query(models.Analysis).filter(models.Analysis.analysis_id == analysis_id).update(
+        {"response_data": "" if result_id is not None else response_json, "result_id": result_id},
+        synchronize_session=False
+    )
+    db.commit()
+
+async def refine_analysis(request: AnalyzeQueryRequest, analysis_id: str, user_id: int, bundle):
+    """Background follow-up of an approximate analysis: classify every post and replace its stored result."""
+    exact = exact_request(request)
+    trace = tracing.PipelineTrace()
+    db = database.SessionLocal()
+    try:
+        key = result_cache_key(exact, bundle)
+        if key is None:
+            response = await compute_analysis(exact, analysis_id, trace, user_id, bundle)
+            await asyncio.to_thread(replace_analysis_result, db, analysis_id, json.dumps(response.dict()))
         else:
-            # Generate simulated time series data with realistic dates
-            from datetime import datetime, timedelta
-            start_date = datetime.now() - timedelta(days=6)
-            
-            for i in range(7):
-                current_date = start_date + timedelta(days=i)
-                base_positive = int(bert_counts.get('positive', 0) / 7)
-                base_negative = int(bert_counts.get('negative', 0) / 7)
-                base_neutral = int(bert_counts.get('neutral', 0) / 7)
+            cached = await asyncio.to_thread(result_cache.lookup, db, key)
+            if cached is None:
+                cached, _ = await compute_cached_analysis(db, key, exact, analysis_id, trace, user_id, bundle)
+            await asyncio.to_thread(replace_analysis_result, db, analysis_id, result_id=cached.id)
+        similarity.forget(analysis_id)
+    except Exception as e:
+        print(f"Refining analysis {analysis_id} failed: {e}")
+    finally:
+        db.close()
+
+# Running refinements, referenced so they are not garbage collected
+refinement_tasks = set()
+
+def schedule_refinement(request: AnalyzeQueryRequest, analysis_id: str, user_id: int, bundle):
+    task = asyncio.create_task(refine_analysis(request, analysis_id, user_id, bundle))
+    refinement_tasks.add(task)
+    task.add_done_callback(refinement_tasks.discard)
+
+@router.post("/analyze_query/", response_model=AnalysisResponse)
+async def analyze_query(
+    request: AnalyzeQueryRequest,
+    http_response: Response,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Analyze social media sentiment based on a query.
+    Returns comprehensive chart data and metrics matching the analysis.ipynb notebook.
+    Supports both live Twitter data and existing file data based on useLiveData parameter.
+    Per-stage timings are returned in the `timings` field and the Server-Timing header.
+    File-mode results are cached per query, data file, model versions and options:
+    a repeated analysis is answered from the stored result (X-Analysis-Cache: hit).
+    With `approximate`, file mode classifies a stratified sample and estimates the
+    distribution (`metrics.approximate`); `refine` then stores the exact result under
+    the same id in the background (X-Analysis-Refine: scheduled).
+    """
+    if request.sampleSize is not None and request.sampleSize < 1:
+        raise HTTPException(status_code=400, detail="sampleSize must be positive")
+    
+    # Generate unique ID for this analysis
+    analysis_id = str(uuid.uuid4())
+    trace = tracing.PipelineTrace()
+    # One bundle for the whole request, so the cache key matches the models used
+    bundle = analysis.model_registry.active()
+    
+    try:
+        key = result_cache_key(request, bundle)
+        with tracing.profile_request(request.profile, os.path.join(PROFILES_DIR, analysis_id)) as profile:
+            if key is None:
+                response = await compute_analysis(request, analysis_id, trace, current_user.id, bundle)
                 
-                time_series_data.append({
-                    "date": current_date.strftime("%Y-%m-%d"),
-                    "positive": max(0, base_positive + np.random.randint(-2, 3)),
-                    "negative": max(0, base_negative + np.random.randint(-2, 3)),
-                    "neutral": max(0, base_neutral + np.random.randint(-2, 3))
-                })
-        
-        # Calculate comprehensive metrics
-        positive_pct = (bert_counts.get('positive', 0) / total_tweets * 100) if total_tweets > 0 else 0
-        negative_pct = (bert_counts.get('negative', 0) / total_tweets * 100) if total_tweets > 0 else 0
-        neutral_pct = (bert_counts.get('neutral', 0) / total_tweets * 100) if total_tweets > 0 else 0
-        
-        metrics = {
-            "totalTweets": total_tweets,
-            "positivePercentage": round(positive_pct, 2),
-            "negativePercentage": round(negative_pct, 2),
-            "neutralPercentage": round(neutral_pct, 2),
-            "overallSentiment": "positive" if positive_pct > negative_pct else "negative" if negative_pct > positive_pct else "neutral",
-            "confidenceScore": round(max(positive_pct, negative_pct, neutral_pct), 2)
-        }
-        
-        # Calculate model metrics
-        model_metrics = {}
-        for model_name, predictions in models_data.items():
-            if model_name != "BERT":
-                y_true = df_results['bert_sentiment']
-                y_pred = predictions
+                with tracing.stage(trace, "serialization", len(response.rawData)):
+                    response_json = json.dumps(response.dict())
                 
-                # Calculate metrics
-                acc = accuracy_score(y_true, y_pred)
-                prec = precision_score(y_true, y_pred, average='weighted', zero_division=0)
-                rec = recall_score(y_true, y_pred, average='weighted', zero_division=0)
-                f1 = f1_score(y_true, y_pred, average='weighted', zero_division=0)
-                cm = confusion_matrix(y_true, y_pred, labels=class_labels)
+                # Save analysis to database
+                with tracing.stage(trace, "db_write"):
+                    save_analysis(db, analysis_id, request.query, response_json, current_user.id,
+                                  response.modelVersions)
                 
-                model_metrics[model_name] = ModelMetrics(
-                    accuracy=round(acc, 4),
-                    precision=round(prec, 4),
-                    recall=round(rec, 4),
-                    f1_score=round(f1, 4),
-                    confusion_matrix=cm.tolist()
-                )
-        
-        # Generate insights (matching notebook style)
-        best_model = max(model_metrics.keys(), key=lambda k: model_metrics[k].accuracy)
-        best_accuracy = model_metrics[best_model].accuracy
+                if request.refine and "approximate" in response.metrics:
+                    schedule_refinement(request, analysis_id, current_user.id, bundle)
+                    http_response.headers["X-Analysis-Refine"] = "scheduled"
+            else:
+                # A stored exact result also answers an approximate request
+                exact_key = result_cache_key(exact_request(request), bundle) if request.approximate else key
+                with tracing.stage(trace, "result_cache") as record:
+                    cached = await asyncio.to_thread(result_cache.lookup, db, exact_key)
+                    if cached is None and key != exact_key:
+                        cached = await asyncio.to_thread(result_cache.lookup, db, key)
+                    record["hit"] = cached is not None
+                
+                response = None
+                if cached is None:
+                    cached, response = await compute_cached_analysis(db, key, request, analysis_id, trace,
+                                                                     current_user.id, bundle, exact_key)
+                
+                # This user's analysis only references the shared result
+                with tracing.stage(trace, "db_reference"):
+                    await asyncio.to_thread(save_analysis, db, analysis_id, request.query, "", current_user.id,
+                                            cached.model_versions, cached.id)
+                
+                headers = {"X-Analysis-Cache": "miss" if response is not None else
+                           "hit" if record["hit"] else "coalesced"}
+                if request.refine and cached.key != exact_key:
+                    schedule_refinement(request, analysis_id, current_user.id, bundle)
+                    headers["X-Analysis-Refine"] = "scheduled"
+                
+                if response is None:
+                    # Answered by the cache (or a concurrent identical request): the stored
+                    # JSON is returned unparsed, with this analysis' id and query
+                    headers["Server-Timing"] = trace.server_timing_header()
+                    return Response(
+                        content=with_analysis_id(cached.response_json, analysis_id, request.query),
+                        media_type="application/json",
+                        headers=headers
+                    )
+                http_response.headers.update(headers)
         
-        insights = {
-            "sentimentBalance": {
-                "positive": round(positive_pct, 1),
-                "negative": round(negative_pct, 1),
-                "neutral": round(neutral_pct, 1)
-            },
-            "bestModel": {
-                "name": best_model,
-                "accuracy": round(best_accuracy, 3)
-            },
-            "modelBehavior": "The models show good performance in identifying positive and negative sentiments, with some challenges in neutral classification."
-        }
+        response.timings = trace.as_dict()
+        if profile["path"]:
+            response.timings["profile"] = os.path.basename(profile["path"])
+        http_response.headers["Server-Timing"] = trace.server_timing_header()
+        return response
         
-        # Prepare raw data for client-side processing
-        raw_data = []
-        for idx, row in df_results.iterrows():
-            raw_data.append({
-                "text": row.get('text', ''),
-                "cleaned_text": row.get('cleaned_text', ''),
-                "nb_sentiment": row.get('nb_sentiment', ''),
-                "svm_sentiment": row.get('svm_sentiment', ''),
-                "bert_sentiment": row.get('bert_sentiment', '')
-            })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+def corpus_query_rows(corpus, query: str) -> np.ndarray:
+    """Corpus rows a file-mode analysis of `query` covers: its matches, or every row when nothing matches."""
+    rows = corpus.search(query) if query.strip() else np.array([], dtype=np.int32)
+    return rows if len(rows) else np.arange(len(corpus))
+
+@router.post("/analyze_batch/", response_model=BatchAnalysisResponse)
+async def analyze_batch(
+    request: AnalyzeBatchRequest,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Analyze several queries against the corpus file (file mode) at once.
+    Queries answered by the result cache are not recomputed; the posts matching
+    the others are unioned and each unique post is classified once, then every
+    query gets its own analysis built from its posts, as `analyze_query` would.
+    """
+    if not 1 <= len(request.queries) <= ANALYZE_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {ANALYZE_BATCH_MAX_QUERIES} queries")
+    if not os.path.exists(CORPUS_PATH):
+        raise HTTPException(status_code=404, detail="Corpus file not found")
+    
+    trace = tracing.PipelineTrace()
+    bundle = analysis.model_registry.active()
+    analysis_ids = [str(uuid.uuid4()) for _ in request.queries]
+    # Identical queries (up to case and whitespace) are analyzed once
+    distinct: Dict[str, AnalyzeQueryRequest] = {}
+    for query in request.queries:
+        distinct.setdefault(normalize_query(query),
+                            AnalyzeQueryRequest(query=query, cascadeThreshold=request.cascadeThreshold))
+    
+    try:
+        keys = {name: result_cache_key(query_request, bundle) for name, query_request in distinct.items()}
+        results = {}  # normalized query -> (response JSON, result id or None, model versions)
+        with tracing.stage(trace, "result_cache") as record:
+            for name, key in keys.items():
+                cached = await asyncio.to_thread(result_cache.lookup, db, key) if key is not None else None
+                if cached is not None:
+                    results[name] = (cached.response_json, cached.id, cached.model_versions)
+            record["hits"] = len(results)
+        cached_count = len(results)
         
-        # Generate unique ID for this analysis
-        analysis_id = str(uuid.uuid4())
+        missing = [name for name in distinct if name not in results]
+        unique_posts = matched_posts = 0
+        if missing:
+            with tracing.stage(trace, "file_load") as record:
+                corpus = (await asyncio.to_thread(get_corpus, CORPUS_PATH, CORPUS_COLUMNS)).snapshot()
+                record["rows"] = len(corpus)
+            with tracing.stage(trace, "query_filter", len(corpus)):
+                row_sets = [corpus_query_rows(corpus, distinct[name].query) for name in missing]
+                rows, positions = union_rows(row_sets)
+            df = corpus.frame(rows)
+            with tracing.stage(trace, "materialized_lookup") as record:
+                record["rows"] = await asyncio.to_thread(attach_predictions, df, CORPUS_PATH, rows,
+                                                         versions=bundle.versions)
+            
+            # One model pass over the unique posts of all queries; each query gets its slice of the features
+            feature_rows = FeatureRows(len(df))
+            df_results = await asyncio.to_thread(analysis.run_analysis, df, trace,
+                                                 cascade_threshold=request.cascadeThreshold, bundle=bundle,
+                                                 feature_rows=feature_rows)
+            await asyncio.to_thread(topics.fill_feature_rows, bundle, feature_rows, df_results['cleaned_text'])
+            model_versions = df_results.attrs.get("model_versions")
+            unique_posts, matched_posts = len(rows), sum(len(p) for p in positions)
+            
+            first_ids = {}
+            for query, analysis_id in zip(request.queries, analysis_ids):
+                first_ids.setdefault(normalize_query(query), analysis_id)
+            for name, query_positions in zip(missing, positions):
+                with tracing.stage(trace, "metrics", len(query_positions)):
+                    response = await asyncio.to_thread(
+                        build_analysis_response, df_results.iloc[query_positions].reset_index(drop=True),
+                        distinct[name].query, first_ids[name], bundle, feature_rows.take(query_positions)
+                    )
+                    response.modelVersions = model_versions
+                    response_json = json.dumps(response.dict())
+                result_id = None
+                if keys[name] is not None:
+                    with tracing.stage(trace, "db_write"):
+                        stored = await asyncio.to_thread(result_cache.store, db, keys[name], response_json,
+                                                         model_versions)
+                    result_id = stored.id
+                results[name] = (response_json, result_id, model_versions)
         
-        response = AnalysisResponse(
-            id=analysis_id,
-            query=request.query,
-            createdAt=datetime.now().isoformat(),
-            sentimentDistribution=sentiment_distribution,
-            modelComparison=model_comparison,
-            sentimentCounts=sentiment_counts,
-            timeSeriesData=time_series_data,
-            wordCloudData=wordcloud_data,
-            confusionMatrices=confusion_matrices,
-            metrics=metrics,
-            modelMetrics=model_metrics,
-            insights=insights,
-            rawData=raw_data
-        )
+        # One stored analysis per query; cached results are only referenced
+        analyses_json = []
+        with tracing.stage(trace, "db_write"):
+            for query, analysis_id in zip(request.queries, analysis_ids):
+                response_json, result_id, model_versions = results[normalize_query(query)]
+                response_json = with_analysis_id(response_json, analysis_id, query)
+                await asyncio.to_thread(save_analysis, db, analysis_id, query, response_json, current_user.id,
+                                        model_versions, result_id)
+                analyses_json.append(response_json)
         
-        # Save analysis to database
+        # The analyses are already serialized; the batch response is assembled around them
+        summary = {"cachedAnalyses": cached_count, "uniquePosts": unique_posts, "matchedPosts": matched_posts,
+                   "timings": trace.as_dict()}
+        content = '{"analyses": [' + ", ".join(analyses_json) + '], ' + json.dumps(summary)[1:]
+        return Response(content=content, media_type="application/json",
+                        headers={"Server-Timing": trace.server_timing_header()})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+
+async def run_upload_job(job: uploads.UploadJob, query: str):
+    """Background part of an upload analysis: process the file, then store it as an Analysis."""
+    try:
+        aggregator = await asyncio.to_thread(uploads.process_upload, job)
+        analysis_id = str(uuid.uuid4())
+        response = build_aggregate_response(aggregator, query, analysis_id)
+        response.modelVersions = job.model_versions
+        response_json = json.dumps(response.dict())
+        db = database.SessionLocal()
         try:
-            db_analysis = models.Analysis(
-                analysis_id=analysis_id,
-                query=request.query,
-                response_data=json.dumps(response.dict()),
-                user_id=current_user.id
-            )
-            db.add(db_analysis)
-            db.commit()
-            db.refresh(db_analysis)
-        except Exception as e:
-            print(f"Error saving analysis to database: {e}")
-            # Continue without failing the request
-        
-        return response
-        
+            await asyncio.to_thread(save_analysis, db, analysis_id, query, response_json, job.user_id,
+                                    job.model_versions)
+        finally:
+            db.close()
+        job.analysis_id = analysis_id
+        job.status = "completed"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        print(f"Upload analysis {job.job_id} failed: {e}")
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.updated_at = time.time()
+        if os.path.exists(job.path):
+            await asyncio.to_thread(os.remove, job.path)
+
+@router.post("/analyze_upload/", status_code=status.HTTP_202_ACCEPTED)
+async def analyze_upload(
+    file: UploadFile = File(...),
+    query: str = Form(""),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Analyze an uploaded CSV or JSON-lines file (one post per row, with a `text` column).
+    The file is streamed to disk and processed in chunks in the background;
+    poll `GET /api/uploads/{jobId}` for progress and the resulting `analysisId`.
+    """
+    try:
+        job = uploads.upload_jobs.create(current_user.id, file.filename, UPLOADS_DIR)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    max_bytes = int(uploads.UPLOAD_MAX_MB * 1024 * 1024)
+    # Disk I/O runs on worker threads so a large upload does not stall the event loop
+    out = await asyncio.to_thread(open, job.path, "wb")
+    try:
+        while True:
+            chunk = await file.read(uploads.UPLOAD_READ_SIZE)
+            if not chunk:
+                break
+            job.total_bytes += len(chunk)
+            if job.total_bytes > max_bytes:
+                job.status = "failed"
+                job.error = "File too large"
+                break
+            await asyncio.to_thread(out.write, chunk)
+    finally:
+        await asyncio.to_thread(out.close)
+    if job.status == "failed":
+        await asyncio.to_thread(os.remove, job.path)
+        raise HTTPException(status_code=413, detail=f"File exceeds {uploads.UPLOAD_MAX_MB:g} MB")
+
+    job.status = "queued"
+    job.task = asyncio.create_task(run_upload_job(job, query.strip() or job.filename))
+    return job.as_dict()
+
+@router.get("/uploads/{job_id}")
+def get_upload_job(
+    job_id: str,
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Progress of an upload analysis."""
+    job = uploads.upload_jobs.get(job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job.as_dict()
+
+@router.get("/models/")
+def get_model_status(current_user: schemas.User = Depends(auth.get_current_user)):
+    """The model version being served, any reload in progress and the published versions."""
+    return analysis.model_registry.status()
 
 @router.get("/analyses/", response_model=List[schemas.AnalysisSummary])
 def get_user_analyses(
@@ -441,7 +925,7 @@ def get_analysis_by_id(
     
     try:
         # Parse the stored JSON response
-        response_data = json.loads(analysis.response_data)
+        response_data = json.loads(stored_response_json(db, analysis))
         return AnalysisResponse(**response_data)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Invalid analysis data")
@@ -465,9 +949,65 @@ def delete_analysis(
     
     db.delete(analysis)
     db.commit()
+    similarity.forget(analysis_id)
     
     return {"message": "Analysis deleted successfully"}
 
+@router.get("/analyses/{analysis_id}/similar")
+def get_similar_posts(
+    analysis_id: str,
+    post: Optional[str] = None,
+    index: Optional[int] = None,
+    k: int = 10,
+    sentiment: Optional[str] = None,
+    features: str = similarity.SIMILARITY_FEATURES,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Posts of an analysis most similar to `post` (any text) or to the post at
+    position `index` in its rawData, optionally only those with a given BERT
+    `sentiment`. `features` is "tfidf" (default) or "bert".
+    """
+    if (post is None) == (index is None):
+        raise HTTPException(status_code=400, detail="Pass either post or index")
+    if not 1 <= k <= similarity.SIMILARITY_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {similarity.SIMILARITY_MAX_RESULTS}")
+    if features not in similarity.FEATURE_TYPES:
+        raise HTTPException(status_code=400, detail=f"features must be one of {list(similarity.FEATURE_TYPES)}")
+
+    # Only the id is read here; the stored response is parsed only when the index is built
+    row_id = db.query(models.Analysis.id).filter(
+        models.Analysis.analysis_id == analysis_id,
+        models.Analysis.user_id == current_user.id
+    ).scalar()
+    if row_id is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    def load_posts():
+        response_data = stored_response_json(db, db.get(models.Analysis, row_id))
+        return json.loads(response_data).get("rawData", [])
+
+    start = time.perf_counter()
+    search_index = similarity.get_index(analysis_id, load_posts, analysis.model_registry.active(), features)
+    if index is not None:
+        try:
+            matches = search_index.similar_to_post(index, k, sentiment)
+        except IndexError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    else:
+        matches = search_index.similar_to_text(analysis.clean_text(post), k, sentiment)
+
+    return {
+        "analysisId": analysis_id,
+        "features": features,
+        "approximate": search_index.approximate,
+        "indexedPosts": len(search_index),
+        "results": [{"index": position, "score": round(score, 4), **search_index.posts[position]}
+                    for position, score in matches],
+        "durationMs": round((time.perf_counter() - start) * 1000, 2),
+    }
+
 @router.get("/analyses/{analysis_id}/pdf", response_class=FileResponse)
 def download_analysis_pdf(
     analysis_id: str,
@@ -487,7 +1027,7 @@ def download_analysis_pdf(
     
     try:
         # Parse the stored JSON response
-        response_data = json.loads(analysis.response_data)
+        response_data = json.loads(stored_response_json(db, analysis))
         
         # Ensure results directory exists
         os.makedirs(RESULTS_DIR, exist_ok=True)
@@ -544,9 +1084,154 @@ def get_dashboard_data(
     # If there's exactly one analysis, include the full data for auto-display
     if analysis_count == 1:
         try:
-            response_data = json.loads(analyses[0].response_data)
+            response_data = json.loads(stored_response_json(db, analyses[0]))
             dashboard_data["singleAnalysis"] = response_data
         except json.JSONDecodeError:
             pass  # Skip if data is corrupted
     
     return dashboard_data
+
+@router.get("/logs/summary")
+def get_request_log_summary(
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Per-endpoint traffic summary built from the request log.
+    Also reports the state of the in-memory log buffer (queued and dropped entries).
+    """
+    rows = db.query(
+        models.Log.method,
+        models.Log.path,
+        func.count(models.Log.id),
+        func.sum(case((models.Log.status_code >= 400, 1), else_=0)),
+        func.max(models.Log.timestamp)
+    ).group_by(models.Log.method, models.Log.path).order_by(func.count(models.Log.id).desc()).all()
+
+    return {
+        "endpoints": [
+            {
+                "method": method,
+                "path": path,
+                "requests": int(count),
+                "errors": int(errors or 0),
+                "lastSeen": last_seen.isoformat() if last_seen else None
+            }
+            for method, path, count, errors, last_seen in rows
+        ],
+        "buffer": request_logger.request_log_buffer.stats()
+    }
+
+@router.post("/monitors/", response_model=schemas.Monitor)
+def create_monitor(
+    monitor: schemas.MonitorCreate,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Register a query for continuous monitoring.
+    Live monitors poll Twitter every `interval_seconds`; replay monitors read a local CSV/JSONL feed.
+    """
+    if not monitor.query.strip():
+        raise HTTPException(status_code=400, detail="Query is required")
+    if monitor.source not in ("live", "replay"):
+        raise HTTPException(status_code=400, detail="Source must be 'live' or 'replay'")
+    if monitor.source == "replay":
+        try:
+            streaming.resolve_replay_path(monitor.source_path or "")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    db_monitor = models.MonitoredQuery(
+        query=monitor.query,
+        source=monitor.source,
+        source_path=monitor.source_path,
+        interval_seconds=max(monitor.interval_seconds, streaming.STREAM_MIN_INTERVAL),
+        user_id=current_user.id
+    )
+    db.add(db_monitor)
+    db.commit()
+    db.refresh(db_monitor)
+    streaming.streaming_manager.create_monitor(db_monitor)
+    return db_monitor
+
+@router.get("/monitors/", response_model=List[schemas.Monitor])
+def list_monitors(
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """List the current user's monitored queries."""
+    return db.query(models.MonitoredQuery).filter(models.MonitoredQuery.user_id == current_user.id).all()
+
+def get_user_monitor(monitor_id: int, db: Session, user_id: int) -> models.MonitoredQuery:
+    db_monitor = db.query(models.MonitoredQuery).filter(
+        models.MonitoredQuery.id == monitor_id,
+        models.MonitoredQuery.user_id == user_id
+    ).first()
+    if not db_monitor:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+    return db_monitor
+
+@router.delete("/monitors/{monitor_id}")
+def delete_monitor(
+    monitor_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Stop monitoring a query and delete its stored windows."""
+    db_monitor = get_user_monitor(monitor_id, db, current_user.id)
+    streaming.streaming_manager.remove_monitor(monitor_id)
+    db.delete(db_monitor)
+    db.commit()
+    return {"message": "Monitor deleted successfully"}
+
+@router.get("/monitors/{monitor_id}/windows")
+def get_monitor_windows(
+    monitor_id: int,
+    granularity: str = "minute",
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Rolling sentiment counts for a monitor, in the same shape as `timeSeriesData`."""
+    get_user_monitor(monitor_id, db, current_user.id)
+    if granularity not in streaming.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Granularity must be 'minute' or 'hour'")
+    monitor = streaming.streaming_manager.monitors.get(monitor_id)
+    return {
+        "monitorId": monitor_id,
+        "granularity": granularity,
+        "timeSeriesData": monitor.counters.series(granularity) if monitor else []
+    }
+
+@router.get("/monitors/{monitor_id}/stream")
+async def stream_monitor(
+    monitor_id: int,
+    token: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    bearer: Optional[str] = Depends(auth.optional_oauth2_scheme)
+):
+    """
+    Server-Sent Events stream of a monitor's rolling sentiment counters.
+    Browsers' EventSource cannot send headers, so the token may also be passed as `?token=`.
+    """
+    current_user = auth.get_current_user(token=bearer or token or "", db=db)
+    get_user_monitor(monitor_id, db, current_user.id)
+    monitor = streaming.streaming_manager.monitors.get(monitor_id)
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="Monitor is not running")
+
+    async def event_stream():
+        queue = monitor.subscribe()
+        try:
+            yield streaming.format_sse(monitor.snapshot())
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                    yield streaming.format_sse(event)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            monitor.unsubscribe(queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
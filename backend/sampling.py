@@ -0,0 +1,158 @@
+"""
+Stratified sampling and bootstrap estimates for approximate analyses.
+
+An approximate analysis classifies a random sample of the matching posts
+instead of all of them. The sample is stratified by the day of the post,
+platform and country (those the corpus has): every stratum is sampled in
+proportion to its size, so each day and platform is represented and the
+estimates vary less than with a simple random sample. When there are too
+many strata for the sample size, the finest column is dropped (country,
+then platform, then day).
+
+Sentiment shares are estimated with stratum weights (posts in the stratum
+per sampled post), and their confidence intervals come from a stratified
+bootstrap: the label counts of every stratum are resampled multinomially
+APPROXIMATE_BOOTSTRAP times, which needs no pass over the posts.
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+APPROXIMATE_SAMPLE_SIZE = int(os.getenv("APPROXIMATE_SAMPLE_SIZE", "5000"))
+APPROXIMATE_BOOTSTRAP = int(os.getenv("APPROXIMATE_BOOTSTRAP", "1000"))
+APPROXIMATE_CONFIDENCE = 0.95
+# Corpus columns the strata are built from: day of the timestamp, platform, country
+STRATA_COLUMNS = ("timestamp", "platform", "country")
+# Coarser strata are used when the finest ones would get fewer sampled posts each on average
+MIN_STRATUM_SAMPLES = 10
+SENTIMENTS = ('negative', 'neutral', 'positive')
+
+
+@dataclass
+class StratifiedSample:
+    positions: np.ndarray  # sampled positions in the population, ascending
+    strata: np.ndarray  # stratum of each sampled post
+    population: np.ndarray  # posts per stratum
+    columns: Tuple[str, ...]  # what the strata are defined by
+
+    @property
+    def population_size(self) -> int:
+        return int(self.population.sum())
+
+    @property
+    def sampled(self) -> np.ndarray:
+        """Sampled posts per stratum."""
+        return np.bincount(self.strata, minlength=len(self.population))
+
+    def weights(self) -> np.ndarray:
+        """Posts represented by each sampled post."""
+        return (self.population / np.maximum(self.sampled, 1))[self.strata]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "population": self.population_size,
+            "sampleSize": len(self.positions),
+            "strata": len(self.population),
+            "stratifiedBy": list(self.columns),
+        }
+
+
+def stratum_keys(frame: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Stratification columns present in `frame`, coarsest first."""
+    keys = {}
+    if 'timestamp' in frame.columns:
+        keys['day'] = pd.to_datetime(frame['timestamp'], errors='coerce').dt.floor('D')
+    for column in ('platform', 'country'):
+        if column in frame.columns:
+            keys[column] = frame[column]
+    return keys
+
+
+def allocate(population: np.ndarray, sample_size: int) -> np.ndarray:
+    """Posts to sample per stratum: proportional to its size (largest remainders), at least one, at most all."""
+    share = population * sample_size / population.sum()
+    allocation = np.floor(share).astype(np.int64)
+    remainder = int(sample_size - allocation.sum())
+    if remainder > 0:
+        allocation[np.argsort(-(share - allocation), kind='stable')[:remainder]] += 1
+    return np.clip(allocation, 1, population)
+
+
+def stratified_sample(frame: pd.DataFrame, sample_size: int, seed: int = 0) -> StratifiedSample:
+    """
+    Proportionally allocated stratified sample of the rows of `frame` (only
+    the STRATA_COLUMNS are read). The same rows and seed give the same sample.
+    """
+    rows = len(frame)
+    keys = stratum_keys(frame)
+    columns = list(keys)
+    # Integer codes per column, coarsest first (missing values get their own code)
+    factors = [pd.factorize(key)[0].astype(np.int64) + 1 for key in keys.values()]
+    while True:
+        codes = np.zeros(rows, dtype=np.int64)
+        for factor in factors[:len(columns)]:
+            codes = codes * (int(factor.max()) + 1) + factor
+        codes = pd.factorize(codes)[0]
+        strata = int(codes.max()) + 1 if rows else 0
+        if not columns or strata * MIN_STRATUM_SAMPLES <= sample_size:
+            break
+        columns.pop()
+    population = np.bincount(codes, minlength=strata)
+    allocation = allocate(population, min(sample_size, rows))
+    # Shuffle within strata: rows ordered by stratum, then by a random key in [0, 1)
+    order = np.argsort(codes + np.random.default_rng(seed).random(rows))
+    starts = np.r_[0, np.cumsum(population)[:-1]]
+    rank = np.arange(rows) - starts[codes[order]]
+    positions = np.sort(order[rank < allocation[codes[order]]])
+    return StratifiedSample(positions, codes[positions], population, tuple(columns))
+
+
+def estimate_distribution(labels: Sequence[str], sample: StratifiedSample,
+                          categories: Sequence[str] = SENTIMENTS,
+                          n_boot: int = APPROXIMATE_BOOTSTRAP, confidence: float = APPROXIMATE_CONFIDENCE,
+                          seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Estimated share and number of posts per category, with a stratified
+    bootstrap confidence interval (`low`, `high`) for each share.
+    """
+    labels = np.asarray(labels, dtype=object)
+    sampled = sample.sampled
+    counts = np.zeros((len(sample.population), len(categories) + 1))
+    for j, category in enumerate(categories):
+        counts[:, j] = np.bincount(sample.strata[labels == category], minlength=len(sample.population))
+    counts[:, -1] = sampled - counts[:, :-1].sum(axis=1)  # labels outside `categories`
+    weights = sample.population / np.maximum(sampled, 1)
+    total = sample.population_size
+    estimate = (counts * weights[:, None]).sum(axis=0) / total
+
+    rng = np.random.default_rng(seed)
+    boot = np.zeros((n_boot, counts.shape[1]))
+    for h in np.flatnonzero(sampled):
+        boot += rng.multinomial(sampled[h], counts[h] / sampled[h], size=n_boot) * weights[h]
+    boot /= total
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(boot, [alpha, 1 - alpha], axis=0) if n_boot else (estimate, estimate)
+    return {
+        category: {
+            "share": round(float(estimate[j]), 4),
+            "low": round(float(low[j]), 4),
+            "high": round(float(high[j]), 4),
+            "count": int(round(estimate[j] * total)),
+        }
+        for j, category in enumerate(categories)
+    }
+
+
+def estimate_daily(timestamps: pd.Series, labels: Sequence[str], weights: np.ndarray,
+                   categories: Sequence[str] = SENTIMENTS) -> List[Dict[str, Any]]:
+    """Estimated posts per day and category (timeSeriesData rows)."""
+    dates = pd.to_datetime(pd.Series(timestamps).reset_index(drop=True), errors='coerce').dt.date
+    totals = pd.Series(weights).groupby([dates, pd.Series(np.asarray(labels, dtype=object))]).sum()
+    series = []
+    for date in sorted(totals.index.get_level_values(0).unique()):
+        day = totals.loc[date]
+        series.append({"date": str(date), **{c: int(round(day.get(c, 0))) for c in categories}})
+    return series
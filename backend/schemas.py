@@ -58,11 +58,30 @@ class AnalysisBase(BaseModel):
 class Analysis(AnalysisBase):
     id: int
     user_id: int
-    response_data: str  # JSON string
+    response_data: str  # JSON string ("" when it references a cached result)
+    model_versions: Optional[str] = None  # JSON string
+    result_id: Optional[int] = None
 
     class Config:
         orm_mode = True
+        protected_namespaces = ()  # allow the model_versions field name
 
 class AnalysisSummary(AnalysisBase):
     """Lightweight version for listing analyses"""
     pass
+
+# Monitoring Schemas
+class MonitorCreate(BaseModel):
+    query: str
+    source: str = "live"  # "live" or "replay"
+    source_path: Optional[str] = None
+    interval_seconds: float = 60
+
+class Monitor(MonitorCreate):
+    id: int
+    active: bool
+    created_at: datetime
+    user_id: int
+
+    class Config:
+        orm_mode = True
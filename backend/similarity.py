@@ -0,0 +1,176 @@
+"""
+Nearest-neighbour search over the posts of a stored analysis.
+
+Posts are represented by the classical models' feature rows (TF-IDF, or
+hashing features with CLASSICAL_FEATURES=hashing; sparse) or by pooled BERT
+embeddings (dense, read from the embedding store where possible). Rows are
+L2-normalized once, so the cosine similarity of a query to every post is a
+single sparse or dense matrix-vector product and the top k come from
+`argpartition`. Sparse rows are searched feature-major, so a query only
+touches the posts sharing one of its features (a few milliseconds for 100k
+posts); large dense indexes use a reduced-dimension first pass.
+
+Indexes are built on the first query for an analysis and kept in a small
+LRU cache (SIMILARITY_CACHE_SIZE), keyed by analysis, features and model
+versions, so later queries do not re-read or re-encode the posts.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+SIMILARITY_FEATURES = os.getenv("SIMILARITY_FEATURES", "tfidf").lower()
+SIMILARITY_CACHE_SIZE = int(os.getenv("SIMILARITY_CACHE_SIZE", "8"))
+SIMILARITY_MAX_RESULTS = 100
+# Dense indexes above this many rows are searched approximately (see SimilarityIndex)
+SIMILARITY_EXACT_ROWS = int(os.getenv("SIMILARITY_EXACT_ROWS", "20000"))
+SIMILARITY_REDUCED_DIM = int(os.getenv("SIMILARITY_REDUCED_DIM", "96"))
+SIMILARITY_RERANK = 10
+FEATURE_TYPES = ("tfidf", "bert")
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest finite scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return top[np.isfinite(scores[top])]
+
+
+class SimilarityIndex:
+    """
+    Cosine similarity search over a fixed set of posts.
+
+    Large dense indexes (BERT embeddings) are searched approximately: a coarse
+    pass over the rows projected onto their top SIMILARITY_REDUCED_DIM principal
+    directions picks SIMILARITY_RERANK candidates per result, which are then
+    scored exactly. Sparse indexes are always searched exactly.
+    """
+
+    def __init__(self, matrix, encode: Callable[[List[str]], Any], posts: Optional[List[Dict[str, Any]]] = None):
+        self._by_feature = self._projection = self._reduced = None
+        if sparse.issparse(matrix):
+            self.matrix = normalize(matrix.tocsr().astype(np.float32))
+            # Feature-major copy: a query only touches the posts that share one of its features
+            self._by_feature = self.matrix.T.tocsr()
+        else:
+            # float32 so the matrix-vector products go through BLAS
+            self.matrix = normalize(np.asarray(matrix, dtype=np.float32).reshape(len(matrix), -1))
+            if len(self.matrix) > SIMILARITY_EXACT_ROWS and self.matrix.shape[1] > SIMILARITY_REDUCED_DIM:
+                self._build_projection()
+        self.encode = encode
+        self.posts = posts or []
+        self.labels = np.array([post.get('bert_sentiment') for post in self.posts], dtype=object)
+
+    def _build_projection(self, sample_size: int = 5000, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        sample = self.matrix[rng.choice(len(self.matrix), min(sample_size, len(self.matrix)), replace=False)]
+        # Top right-singular vectors: the projection keeps most of each dot product
+        _, _, components = np.linalg.svd(sample, full_matrices=False)
+        self._projection = np.ascontiguousarray(components[:SIMILARITY_REDUCED_DIM].T)
+        self._reduced = self.matrix @ self._projection
+
+    @property
+    def approximate(self) -> bool:
+        return self._projection is not None
+
+    @classmethod
+    def build(cls, posts: List[Dict[str, Any]], encode: Callable[[List[str]], Any]) -> "SimilarityIndex":
+        """Index posts (rawData records) by their cleaned text."""
+        cleaned_texts = [str(post.get('cleaned_text') or post.get('text') or '') for post in posts]
+        return cls(encode(cleaned_texts), encode, posts)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _query_vector(self, vector):
+        if self._by_feature is not None:
+            return normalize(sparse.csr_matrix(vector, dtype=np.float32))
+        vector = vector.toarray() if sparse.issparse(vector) else np.asarray(vector, dtype=np.float32)
+        return normalize(vector.reshape(1, -1)).ravel()
+
+    def scores(self, vector) -> np.ndarray:
+        """Exact cosine similarity of one (1 x d) feature row to every indexed post."""
+        vector = self._query_vector(vector)
+        if self._by_feature is not None:
+            return (vector @ self._by_feature).toarray().ravel()
+        return self.matrix @ vector
+
+    def nearest(self, vector, k: int = 10, mask: Optional[np.ndarray] = None,
+                exclude: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """(position, similarity) of the k most similar posts, best first."""
+        if self.approximate:
+            query = self._query_vector(vector)
+            scores = self._reduced @ (query @ self._projection)
+        else:
+            scores = self.scores(vector).astype(np.float32, copy=False)
+            if self._by_feature is not None:
+                scores[scores <= 0] = -np.inf  # no feature in common
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        if len(exclude):
+            scores[list(exclude)] = -np.inf
+        if not self.approximate:
+            top = _top(scores, k)
+            return [(int(i), float(scores[i])) for i in top]
+        candidates = _top(scores, k * SIMILARITY_RERANK)
+        exact = self.matrix[candidates] @ query
+        top = _top(exact, k)
+        return [(int(candidates[i]), float(exact[i])) for i in top]
+
+    def similar_to_text(self, cleaned_text: str, k: int = 10, sentiment: Optional[str] = None):
+        return self.nearest(self.encode([cleaned_text]), k, self.sentiment_mask(sentiment))
+
+    def similar_to_post(self, position: int, k: int = 10, sentiment: Optional[str] = None):
+        if not 0 <= position < len(self):
+            raise IndexError(f"Post {position} is not in the analysis ({len(self)} posts)")
+        return self.nearest(self.matrix[position:position + 1], k, self.sentiment_mask(sentiment), exclude=[position])
+
+    def sentiment_mask(self, sentiment: Optional[str]) -> Optional[np.ndarray]:
+        return None if sentiment is None else self.labels == sentiment
+
+
+# --- Per-analysis cache ---
+_indexes: "OrderedDict[tuple, SimilarityIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def feature_encoder(features: str, bundle) -> Callable[[List[str]], Any]:
+    """Cleaned texts -> feature rows with the models of `bundle`."""
+    if features == "bert":
+        from . import analysis
+        return lambda cleaned_texts: analysis.embed_texts(cleaned_texts, bundle=bundle)
+    return bundle.models['classical'].transform
+
+
+def get_index(analysis_id: str, load_posts: Callable[[], List[Dict[str, Any]]], bundle,
+              features: str = SIMILARITY_FEATURES) -> SimilarityIndex:
+    """The cached index of an analysis; `load_posts` is only called when it has to be built."""
+    if features not in FEATURE_TYPES:
+        raise ValueError(f"features must be one of {list(FEATURE_TYPES)}")
+    key = (analysis_id, features, json.dumps(bundle.versions, sort_keys=True))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = SimilarityIndex.build(load_posts(), feature_encoder(features, bundle))
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > SIMILARITY_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def forget(analysis_id: str):
+    """Drop the cached indexes of a deleted analysis."""
+    with _indexes_lock:
+        for key in [key for key in _indexes if key[0] == analysis_id]:
+            del _indexes[key]
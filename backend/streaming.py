@@ -0,0 +1,331 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+from . import analysis, models
+from .database import SessionLocal
+from .fetch_scheduler import get_fetch_scheduler
+from .tweet_cache import newest_tweet_id
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Replay sources may only read CSV/JSONL files below this directory
+STREAM_REPLAY_DIR = os.path.realpath(os.getenv("STREAM_REPLAY_DIR", BASE_DIR))
+STREAM_MICRO_BATCH = int(os.getenv("STREAM_MICRO_BATCH", "64"))
+STREAM_REPLAY_BATCH = int(os.getenv("STREAM_REPLAY_BATCH", "50"))
+STREAM_LIVE_BATCH = int(os.getenv("STREAM_LIVE_BATCH", "100"))
+STREAM_PERSIST_INTERVAL = float(os.getenv("STREAM_PERSIST_INTERVAL", "30"))
+STREAM_MIN_INTERVAL = 5.0
+STREAM_TICK = 1.0
+
+SENTIMENTS = ("positive", "negative", "neutral")
+GRANULARITIES = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+# Buckets kept in memory per granularity (3 hours of minutes, 3 days of hours)
+RETENTION = {"minute": 180, "hour": 72}
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def resolve_replay_path(path: str) -> str:
+    """Validate a replay file path; only CSV/JSONL files inside STREAM_REPLAY_DIR are allowed."""
+    resolved = os.path.realpath(os.path.join(STREAM_REPLAY_DIR, path))
+    if not resolved.startswith(STREAM_REPLAY_DIR + os.sep):
+        raise ValueError("Replay file must be inside the replay directory")
+    if not resolved.lower().endswith((".csv", ".jsonl")):
+        raise ValueError("Replay file must be a .csv or .jsonl file")
+    if not os.path.exists(resolved):
+        raise ValueError(f"Replay file not found: {path}")
+    return resolved
+
+
+class RollingCounters:
+    """Per-minute and per-hour sentiment counts over a bounded window."""
+
+    def __init__(self):
+        self.buckets: Dict[str, "OrderedDict[datetime, Dict[str, int]]"] = {g: OrderedDict() for g in GRANULARITIES}
+        self.dirty: Set[tuple] = set()
+
+    def add(self, timestamps: List[datetime], sentiments: List[str]):
+        for timestamp, sentiment in zip(timestamps, sentiments):
+            if sentiment not in SENTIMENTS:
+                continue
+            for granularity in GRANULARITIES:
+                key = bucket_start(timestamp, granularity)
+                counts = self.buckets[granularity].setdefault(key, {s: 0 for s in SENTIMENTS})
+                counts[sentiment] += 1
+                self.dirty.add((granularity, key))
+        self._trim()
+
+    def load(self, granularity: str, key: datetime, counts: Dict[str, int]):
+        """Restore a persisted bucket."""
+        self.buckets[granularity][key] = {s: int(counts.get(s, 0)) for s in SENTIMENTS}
+        self._trim()
+
+    def _trim(self):
+        for granularity, buckets in self.buckets.items():
+            excess = len(buckets) - RETENTION[granularity]
+            if excess > 0:
+                for key in sorted(buckets)[:excess]:
+                    del buckets[key]
+                    self.dirty.discard((granularity, key))
+
+    def series(self, granularity: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Buckets in chronological order, shaped like `timeSeriesData` entries."""
+        keys = sorted(self.buckets[granularity])
+        if limit:
+            keys = keys[-limit:]
+        return [{"date": key.isoformat(), **self.buckets[granularity][key]} for key in keys]
+
+    def pop_dirty(self) -> List[tuple]:
+        """Copies of the buckets changed since the last call. Call it on the event loop, like `add`."""
+        dirty, self.dirty = self.dirty, set()
+        return [(g, key, dict(self.buckets[g][key])) for g, key in dirty if key in self.buckets[g]]
+
+
+class ReplaySource:
+    """
+    Replays a local CSV/JSONL file as a feed: each poll returns the next
+    `batch_size` rows, wrapping around at the end. Rows are stamped with the
+    ingestion time unless `use_source_time` is set.
+    """
+
+    def __init__(self, path: str, batch_size: int = STREAM_REPLAY_BATCH, use_source_time: bool = False):
+        if path.lower().endswith(".jsonl"):
+            df = pd.read_json(path, lines=True)
+        else:
+            df = pd.read_csv(path)
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        df['text'] = df['text'].astype(str).str.strip()
+        self.df = df[df['text'] != ''].reset_index(drop=True)
+        self.batch_size = batch_size
+        self.use_source_time = use_source_time and 'timestamp' in df.columns
+        self.position = 0
+        self.since_id = None
+
+    async def next_batch(self) -> pd.DataFrame:
+        if self.df.empty:
+            return self.df
+        end = self.position + self.batch_size
+        batch = self.df.iloc[self.position:end]
+        if end > len(self.df):
+            batch = pd.concat([batch, self.df.iloc[:end - len(self.df)]])
+        self.position = end % len(self.df)
+        batch = batch.copy()
+        if not self.use_source_time:
+            batch['timestamp'] = datetime.utcnow()
+        return batch.reset_index(drop=True)
+
+
+class LiveSource:
+    """Polls Twitter for tweets newer than the last one seen."""
+
+    def __init__(self, query: str, since_id: Optional[int] = None, user_key=None,
+                 max_results: int = STREAM_LIVE_BATCH):
+        self.query = query
+        self.since_id = since_id
+        self.user_key = user_key
+        self.max_results = max_results
+
+    async def next_batch(self) -> pd.DataFrame:
+        df = await get_fetch_scheduler().fetch(self.query, max_results=self.max_results,
+                                               user_key=self.user_key, since_id=self.since_id)
+        newest = newest_tweet_id(df)
+        if newest is not None:
+            self.since_id = max(newest, self.since_id or 0)
+        if not df.empty and 'timestamp' not in df.columns:
+            df['timestamp'] = datetime.utcnow()
+        return df
+
+
+class StreamingMonitor:
+    """One registered query: pulls batches, classifies them and keeps rolling counters."""
+
+    def __init__(self, monitor_id: int, query: str, source, interval: float):
+        self.monitor_id = monitor_id
+        self.query = query
+        self.source = source
+        self.interval = max(interval, STREAM_MIN_INTERVAL)
+        self.counters = RollingCounters()
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.next_run = 0.0
+        self.busy = False
+        self.processed = 0
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> int:
+        """Pull one batch and classify it in micro-batches with the existing models."""
+        self.busy = True
+        try:
+            df = await self.source.next_batch()
+            for start in range(0, len(df), STREAM_MICRO_BATCH):
+                batch = df.iloc[start:start + STREAM_MICRO_BATCH].copy()
+                results = await asyncio.to_thread(analysis.run_analysis, batch)
+                timestamps = pd.to_datetime(results['timestamp'], errors='coerce', utc=True)
+                timestamps = timestamps.fillna(pd.Timestamp.now(tz='UTC')).dt.tz_localize(None)
+                self.counters.add([ts.to_pydatetime() for ts in timestamps], results['bert_sentiment'].tolist())
+                self.processed += len(batch)
+            self.last_error = None
+            if len(df):
+                self.publish(self.snapshot())
+            return len(df)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Monitor {self.monitor_id} ingestion failed: {e}")
+            return 0
+        finally:
+            self.busy = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "monitorId": self.monitor_id,
+            "query": self.query,
+            "processed": self.processed,
+            "lastError": self.last_error,
+            "minute": self.counters.series("minute", limit=60),
+            "hour": self.counters.series("hour", limit=24),
+        }
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=16)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]):
+        for queue in list(self.subscribers):
+            if queue.full():
+                # Slow consumer: drop its oldest update rather than block ingestion
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class StreamingManager:
+    """
+    Runs all active monitors on their intervals and persists their counters.
+    Monitors live in this process only; with several API workers each would run
+    them all (see README, Multiple Workers).
+    """
+
+    def __init__(self):
+        self.monitors: Dict[int, StreamingMonitor] = {}
+        # Running ingestion passes, referenced so they are not garbage collected
+        self.tasks: Set[asyncio.Task] = set()
+        self._next_persist = time.monotonic() + STREAM_PERSIST_INTERVAL
+
+    def create_monitor(self, db_monitor: models.MonitoredQuery) -> StreamingMonitor:
+        if db_monitor.source == "replay":
+            source = ReplaySource(resolve_replay_path(db_monitor.source_path or ""))
+        else:
+            since_id = int(db_monitor.since_id) if db_monitor.since_id else None
+            source = LiveSource(db_monitor.query, since_id=since_id, user_key=db_monitor.user_id)
+        monitor = StreamingMonitor(db_monitor.id, db_monitor.query, source, db_monitor.interval_seconds)
+        self.monitors[db_monitor.id] = monitor
+        return monitor
+
+    def remove_monitor(self, monitor_id: int):
+        self.monitors.pop(monitor_id, None)
+
+    def load(self):
+        """Start every active monitor stored in the database, restoring its recent counters."""
+        db = SessionLocal()
+        try:
+            for db_monitor in db.query(models.MonitoredQuery).filter(models.MonitoredQuery.active == True).all():
+                try:
+                    monitor = self.create_monitor(db_monitor)
+                except Exception as e:
+                    logger.error(f"Could not start monitor {db_monitor.id}: {e}")
+                    continue
+                for granularity, retention in RETENTION.items():
+                    cutoff = bucket_start(datetime.utcnow(), granularity) - GRANULARITIES[granularity] * retention
+                    windows = db.query(models.SentimentWindow).filter(
+                        models.SentimentWindow.monitor_id == db_monitor.id,
+                        models.SentimentWindow.granularity == granularity,
+                        models.SentimentWindow.bucket_start >= cutoff
+                    ).all()
+                    for window in windows:
+                        monitor.counters.load(granularity, window.bucket_start, {
+                            "positive": window.positive, "negative": window.negative, "neutral": window.neutral
+                        })
+        finally:
+            db.close()
+
+    def collect_changes(self) -> List[tuple]:
+        """
+        Changed buckets and since_id of every monitor, as (monitor_id, buckets, since_id).
+        Runs on the event loop, where the counters are updated, so no bucket is lost.
+        """
+        return [(monitor.monitor_id, monitor.counters.pop_dirty(), monitor.source.since_id)
+                for monitor in list(self.monitors.values())]
+
+    def persist(self, changes: List[tuple]):
+        """Write changed buckets (and live sources' since_id) from `collect_changes` to the database."""
+        db = SessionLocal()
+        try:
+            for monitor_id, buckets, since_id in changes:
+                for granularity, key, counts in buckets:
+                    window = db.query(models.SentimentWindow).filter(
+                        models.SentimentWindow.monitor_id == monitor_id,
+                        models.SentimentWindow.granularity == granularity,
+                        models.SentimentWindow.bucket_start == key
+                    ).first()
+                    if window is None:
+                        window = models.SentimentWindow(monitor_id=monitor_id, granularity=granularity,
+                                                        bucket_start=key)
+                        db.add(window)
+                    window.positive = counts["positive"]
+                    window.negative = counts["negative"]
+                    window.neutral = counts["neutral"]
+                if since_id is not None:
+                    db.query(models.MonitoredQuery).filter(
+                        models.MonitoredQuery.id == monitor_id
+                    ).update({"since_id": str(since_id)})
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to persist sentiment windows: {e}")
+        finally:
+            db.close()
+
+    async def run(self):
+        """Background loop: start due monitors and persist counters periodically."""
+        try:
+            while True:
+                now = time.monotonic()
+                for monitor in list(self.monitors.values()):
+                    if not monitor.busy and now >= monitor.next_run:
+                        monitor.next_run = now + monitor.interval
+                        task = asyncio.create_task(monitor.run_once())
+                        self.tasks.add(task)
+                        task.add_done_callback(self.tasks.discard)
+                if now >= self._next_persist:
+                    self._next_persist = now + STREAM_PERSIST_INTERVAL
+                    await asyncio.to_thread(self.persist, self.collect_changes())
+                await asyncio.sleep(STREAM_TICK)
+        except asyncio.CancelledError:
+            tasks = list(self.tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.to_thread(self.persist, self.collect_changes())
+            raise
+
+
+streaming_manager = StreamingManager()
+
+
+def format_sse(event: Dict[str, Any], event_name: str = "sentiment") -> str:
+    return f"event: {event_name}\ndata: {json.dumps(event)}\n\n"
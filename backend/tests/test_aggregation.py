@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+import pandas as pd
+from backend.aggregation import WORDCLOUD_MAX_WORDS, SentimentAggregator
+
+
+def make_results(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.array(['negative', 'neutral', 'positive'])
+    words = np.array([f"word{i}" for i in range(150)])
+    return pd.DataFrame({
+        'text': [f"post {i}" for i in range(n)],
+        'cleaned_text': [' '.join(rng.choice(words, 3)) for _ in range(n)],
+        'nb_sentiment': rng.choice(labels, n),
+        'svm_sentiment': rng.choice(labels, n),
+        'bert_sentiment': rng.choice(labels, n),
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h').astype(str),
+    })
+
+
+class TestSentimentAggregator(unittest.TestCase):
+
+    def test_chunked_aggregation_matches_single_pass(self):
+        df = make_results()
+        whole = SentimentAggregator()
+        whole.add(df)
+        chunked = SentimentAggregator()
+        for start in range(0, len(df), 64):
+            chunked.add(df.iloc[start:start + 64])
+
+        self.assertEqual(chunked.total, whole.total)
+        self.assertEqual(chunked.combinations, whole.combinations)
+        self.assertEqual(chunked.daily, whole.daily)
+        for sentiment in ['positive', 'negative', 'neutral']:
+            self.assertListEqual(chunked.words_for_sentiment(sentiment), whole.words_for_sentiment(sentiment))
+        self.assertEqual(chunked.raw_data, whole.raw_data)
+
+    def test_counts_and_label_pairs(self):
+        df = make_results(100)
+        aggregator = SentimentAggregator()
+        aggregator.add(df)
+        self.assertEqual(dict(aggregator.counts('bert_sentiment')), df['bert_sentiment'].value_counts().to_dict())
+        y_true, y_pred, weights = aggregator.label_pairs('nb_sentiment')
+        agreement = weights[y_true == y_pred].sum()
+        self.assertEqual(agreement, (df['nb_sentiment'] == df['bert_sentiment']).sum())
+        self.assertEqual(weights.sum(), 100)
+
+    def test_cascade_label_pairs_cover_escalated_posts_only(self):
+        df = make_results(100)
+        df['escalated'] = np.arange(100) < 30
+        # Non-escalated posts keep the SVM label as their final label
+        df.loc[~df['escalated'], 'bert_sentiment'] = df.loc[~df['escalated'], 'svm_sentiment']
+        aggregator = SentimentAggregator()
+        aggregator.add(df.iloc[:50])
+        aggregator.add(df.iloc[50:])
+        y_true, y_pred, weights = aggregator.label_pairs('svm_sentiment')
+        self.assertEqual(weights.sum(), 30)
+        escalated = df[df['escalated']]
+        self.assertEqual(weights[y_true == y_pred].sum(), (escalated['svm_sentiment'] == escalated['bert_sentiment']).sum())
+
+        none_escalated = SentimentAggregator()
+        none_escalated.add(df.assign(escalated=False))
+        self.assertEqual(len(none_escalated.label_pairs('nb_sentiment')[2]), 0)
+
+    def test_memory_is_bounded(self):
+        aggregator = SentimentAggregator(raw_data_limit=10)
+        for seed in range(5):
+            aggregator.add(make_results(200, seed))
+        self.assertEqual(aggregator.total, 1000)
+        self.assertEqual(len(aggregator.raw_data), 10)
+        self.assertLessEqual(len(aggregator.words_for_sentiment('positive')), WORDCLOUD_MAX_WORDS)
+        self.assertLessEqual(len(aggregator.combinations), 27)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+import unittest.mock
+from backend.async_twitter_client import AsyncTwitterClient
+from backend.fetch_scheduler import FetchScheduler
+from backend.twitter_client import TwitterClient
+from backend.twitter_stub import FakeTweetSource, StubTwitterClient, start_stub_server
+
+
+class TestAsyncTwitterClient(unittest.TestCase):
+
+    def setUp(self):
+        self.source = FakeTweetSource(total_results=150)
+        self.server = start_stub_server(self.source)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_matches_sync_client_output(self):
+        async def run():
+            client = AsyncTwitterClient(bearer_token="test", base_url=self.base_url)
+            try:
+                return await client.search_tweets("park", max_results=120)
+            finally:
+                await client.aclose()
+
+        async_df = asyncio.run(run())
+        sync_df = TwitterClient(client=StubTwitterClient(base_url=self.base_url)).search_tweets("park", max_results=120)
+
+        self.assertEqual(len(async_df), 120)
+        self.assertListEqual(list(async_df.columns), list(sync_df.columns))
+        self.assertListEqual(async_df['text'].tolist(), sync_df['text'].tolist())
+
+    def test_last_page_is_trimmed_to_max_results(self):
+        async def run():
+            client = AsyncTwitterClient(bearer_token="test", base_url=self.base_url)
+            try:
+                return await client.search_tweets("park", max_results=105)
+            finally:
+                await client.aclose()
+
+        # The last page asks for the API minimum of 10 tweets
+        df = asyncio.run(run())
+        self.assertEqual(len(df), 105)
+        self.assertEqual(df['id'].nunique(), 105)
+
+    def test_scheduler_uses_async_client(self):
+        scheduler = FetchScheduler(
+            client_factory=lambda: self.fail("sync client should not be used"),
+            async_client_factory=lambda: AsyncTwitterClient(bearer_token="test", base_url=self.base_url),
+        )
+
+        async def run():
+            df = await scheduler.fetch("park", max_results=30)
+            await scheduler.async_client.aclose()
+            return df
+
+        df = asyncio.run(run())
+        self.assertEqual(len(df), 30)
+        self.assertIn('original_text', df.columns)
+
+    def test_rate_limit_error_message(self):
+        self.source.rate_limit = 0
+
+        async def run():
+            client = AsyncTwitterClient(bearer_token="test", base_url=self.base_url)
+            try:
+                await client.search_tweets("park")
+            finally:
+                await client.aclose()
+
+        with unittest.mock.patch('backend.async_twitter_client.RATE_LIMIT_MAX_RETRIES', 0):
+            with self.assertRaises(Exception) as context:
+                asyncio.run(run())
+        self.assertIn("rate limit", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from backend.benchmark import compare_results, make_corpus
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_corpus_is_deterministic(self):
+        seed_texts = ["I love this product", "Traffic was terrible this morning", "It is okay"]
+        first = make_corpus(seed_texts, 50, seed=7)
+        second = make_corpus(seed_texts, 50, seed=7)
+        self.assertEqual(len(first), 50)
+        self.assertListEqual(first['text'].tolist(), second['text'].tolist())
+
+    def test_compare_flags_slowdowns(self):
+        baseline = [{"case": "clean_text", "rows": 1000, "seconds": 1.0}]
+        self.assertEqual(compare_results([{"case": "clean_text", "rows": 1000, "seconds": 1.05}], baseline, 0.10), [])
+        regressions = compare_results([{"case": "clean_text", "rows": 1000, "seconds": 1.5}], baseline, 0.10)
+        self.assertEqual(len(regressions), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import threading
+import unittest
+from backend.bert_batching import BatchEncoder, TokenCache, length_sorted_batches, pad_batch
+
+
+class WordTokenizer:
+    """Stand-in for a fast tokenizer: [CLS] + one id per word + [SEP], truncated."""
+    pad_token_id = 0
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, truncation=True, max_length=128, padding=False):
+        self.calls.append(list(texts))
+        encoded = []
+        for text in texts:
+            ids = [101] + [1000 + len(word) for word in text.split()] + [102]
+            encoded.append(ids[:max_length - 1] + [102] if len(ids) > max_length else ids)
+        return {'input_ids': encoded}
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = TokenCache(maxsize=2)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        cache.get("a")
+        cache.put("c", [3])
+        self.assertEqual(cache.get("a"), (1,))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+
+class TestBatchEncoder(unittest.TestCase):
+
+    def test_only_cache_misses_are_tokenized_once_per_batch(self):
+        tokenizer = WordTokenizer()
+        encoder = BatchEncoder(tokenizer, TokenCache(maxsize=10))
+        first = encoder.encode(["good day", "bad", "good day"])
+        second = encoder.encode(["bad", "new post here"])
+        self.assertListEqual(tokenizer.calls, [["good day", "bad"], ["new post here"]])
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(second[0], first[1])
+        self.assertEqual(encoder.cache.hits, 1)
+
+    def test_sequences_are_truncated_to_max_length(self):
+        encoder = BatchEncoder(WordTokenizer(), TokenCache(), max_length=4)
+        self.assertEqual(len(encoder.encode(["one two three four five"])[0]), 4)
+
+    def test_concurrent_encoding(self):
+        encoder = BatchEncoder(WordTokenizer(), TokenCache(maxsize=50))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(encoder.encode([f"post {i}" for i in range(100)])))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(result == results[0] for result in results))
+
+
+class TestBatching(unittest.TestCase):
+
+    def test_batches_group_similar_lengths_and_cover_every_position(self):
+        lengths = [5, 30, 6, 29, 4, 31]
+        batches = length_sorted_batches(lengths, batch_size=3)
+        self.assertListEqual(sorted(int(i) for batch in batches for i in batch), list(range(6)))
+        self.assertListEqual([sorted(lengths[i] for i in batch) for batch in batches], [[4, 5, 6], [29, 30, 31]])
+
+    def test_batch_is_padded_to_its_longest_member(self):
+        input_ids, attention_mask = pad_batch([(101, 7, 102), (101, 102)], pad_id=0)
+        self.assertEqual(input_ids.shape, (2, 3))
+        self.assertListEqual(input_ids.tolist(), [[101, 7, 102], [101, 102, 0]])
+        self.assertListEqual(attention_mask.tolist(), [[1, 1, 1], [1, 1, 0]])
+        self.assertEqual(pad_batch([])[0].shape, (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
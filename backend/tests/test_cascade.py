@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+import pandas as pd
+from backend import cascade
+from backend.aggregation import SentimentAggregator
+
+
+class TestEscalation(unittest.TestCase):
+
+    def test_low_confidence_posts_are_escalated(self):
+        mask = cascade.escalation_mask([0.9, 0.55, 0.6, 0.2], 0.6)
+        self.assertListEqual(mask.tolist(), [False, True, False, True])
+
+    def test_disagreement_is_escalated(self):
+        mask = cascade.escalation_mask([0.9, 0.9], 0.6, ["positive", "negative"], ["positive", "positive"])
+        self.assertListEqual(mask.tolist(), [False, True])
+
+    def test_threshold_resolution(self):
+        self.assertEqual(cascade.resolve_threshold(0.7), 0.7)
+        with mock.patch.object(cascade, "CASCADE_MODE", False):
+            self.assertIsNone(cascade.resolve_threshold(None))
+        with mock.patch.object(cascade, "CASCADE_MODE", True), mock.patch.object(cascade, "CASCADE_THRESHOLD", 0.8):
+            self.assertEqual(cascade.resolve_threshold(None), 0.8)
+
+
+class TestEvaluateThresholds(unittest.TestCase):
+
+    def test_higher_thresholds_trade_cost_for_accuracy(self):
+        labels = ["positive", "negative", "neutral", "positive"]
+        gate_labels = ["positive", "positive", "negative", "positive"]  # right, wrong, wrong, right
+        confidence = [0.95, 0.5, 0.7, 0.9]
+        bert_labels = labels
+        rows = cascade.evaluate_thresholds(labels, gate_labels, confidence, bert_labels, [0.0, 0.6, 0.8, 1.1])
+        self.assertListEqual([r["escalatedFraction"] for r in rows], [0.0, 0.25, 0.5, 1.0])
+        self.assertListEqual([r["Accuracy"] for r in rows], [0.5, 0.75, 1.0, 1.0])
+        self.assertEqual(set(rows[0]), {"threshold", "escalatedFraction", "Accuracy", "Precision", "Recall", "F1-Score"})
+
+    def test_reference_results_are_loaded(self):
+        reference = cascade.load_reference_results()
+        self.assertIn("BERT", reference)
+        self.assertIn("Accuracy", reference["BERT"])
+
+
+class TestAggregatorEscalation(unittest.TestCase):
+
+    def test_escalated_posts_are_counted_across_chunks(self):
+        df = pd.DataFrame({
+            'text': ['a', 'b', 'c'], 'cleaned_text': ['a', 'b', 'c'],
+            'nb_sentiment': ['positive'] * 3, 'svm_sentiment': ['positive'] * 3, 'bert_sentiment': ['positive'] * 3,
+            'escalated': [True, False, True],
+        })
+        aggregator = SentimentAggregator()
+        aggregator.add(df.iloc[:2])
+        aggregator.add(df.iloc[2:])
+        self.assertEqual(aggregator.escalated, 2)
+        self.assertIsNone(SentimentAggregator().escalated)
+
+
+if __name__ == '__main__':
+    unittest.main()
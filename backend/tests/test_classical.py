@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.svm import SVC
+import os
+import shutil
+import tempfile
+import joblib
+from backend.classical import (MODEL_FILES, ClassicalPipeline, FeatureRows, load_classical_pipeline,
+                               train_hashing_models)
+
+TEXTS = ["love great day", "hate terrible traffic", "okay average day", "great fantastic love",
+         "awful hate rain", "fine normal meeting"]
+LABELS = ["positive", "negative", "neutral", "positive", "negative", "neutral"]
+
+
+class TestClassicalPipeline(unittest.TestCase):
+
+    def setUp(self):
+        vectorizer = TfidfVectorizer().fit(TEXTS)
+        features = vectorizer.transform(TEXTS)
+        self.pipeline = ClassicalPipeline(vectorizer)
+        self.pipeline.register("naive_bayes", MultinomialNB().fit(features, LABELS))
+        self.pipeline.register("svm", SVC().fit(features, LABELS))
+
+    def test_batch_predictions_match_per_text_predictions(self):
+        features = self.pipeline.transform(TEXTS)
+        predictions = self.pipeline.predict(features)
+        for model in self.pipeline.models.values():
+            single = [model.estimator.predict(self.pipeline.vectorizer.transform([t]))[0] for t in TEXTS]
+            self.assertListEqual(list(predictions[model.column]), single)
+        self.assertListEqual(sorted(predictions), ["nb_sentiment", "svm_sentiment"])
+
+    def test_extra_models_reuse_the_feature_matrix(self):
+        features = self.pipeline.transform(TEXTS)
+        self.pipeline.register("logreg", LogisticRegression().fit(features, LABELS))
+        predictions = self.pipeline.predict(features)
+        self.assertEqual(len(predictions["logreg_sentiment"]), len(TEXTS))
+        self.assertEqual(self.pipeline.models["logreg"].confidence_column, "logreg_confidence")
+
+    def test_confidence_is_a_probability(self):
+        features = self.pipeline.transform(TEXTS)
+        for model in self.pipeline.models.values():
+            confidence = model.confidence(features)
+            self.assertEqual(len(confidence), len(TEXTS))
+            self.assertTrue(np.all((confidence > 0) & (confidence <= 1)))
+
+    def test_empty_batch(self):
+        features = self.pipeline.transform([])
+        for values in self.pipeline.predict(features).values():
+            self.assertEqual(len(values), 0)
+
+    def test_hashing_features_need_no_vocabulary(self):
+        pipeline = train_hashing_models(TEXTS * 5, LABELS * 5)
+        predictions = pipeline.predict(pipeline.transform(["love great", "hate traffic", "unseen words here"]))
+        self.assertListEqual(list(predictions["nb_sentiment"][:2]), ["positive", "negative"])
+        self.assertListEqual(list(predictions["svm_sentiment"][:2]), ["positive", "negative"])
+
+    def test_models_can_be_memory_mapped(self):
+        pipeline = train_hashing_models(TEXTS * 5, LABELS * 5)
+        models_dir = tempfile.mkdtemp()
+        try:
+            for name, filename in MODEL_FILES["hashing"].items():
+                joblib.dump(pipeline.models[name].estimator, os.path.join(models_dir, filename))
+            mapped = load_classical_pipeline(models_dir, "hashing", mmap=True)
+            self.assertIsInstance(mapped.models["naive_bayes"].estimator.feature_log_prob_, np.memmap)
+            features = mapped.transform(TEXTS)
+            self.assertListEqual(list(mapped.predict(features)["svm_sentiment"]),
+                                 list(pipeline.predict(features)["svm_sentiment"]))
+        finally:
+            shutil.rmtree(models_dir)
+
+    def test_feature_rows_vectorize_only_missing_posts(self):
+        rows = FeatureRows(len(TEXTS))
+        rows.add(np.array([4, 1]), self.pipeline.transform([TEXTS[4], TEXTS[1]]))
+        subset = FeatureRows(2)
+        subset.add(np.array([0]), self.pipeline.transform([TEXTS[3]]))
+        rows.merge(subset, np.array([3, 5]))
+
+        taken = rows.take(np.array([3, 1, 0]))
+        expected = self.pipeline.transform([TEXTS[3], TEXTS[1], TEXTS[0]])
+        # Placeholder text: the posts that already have rows must not be vectorized again
+        matrix = taken.matrix(self.pipeline, [TEXTS[2], TEXTS[2], TEXTS[0]])
+        np.testing.assert_allclose(matrix.toarray(), expected.toarray())
+        self.assertEqual(rows.matrix(self.pipeline, TEXTS).shape, (len(TEXTS), expected.shape[1]))
+        np.testing.assert_allclose(rows.matrix(self.pipeline, TEXTS).toarray(),
+                                   self.pipeline.transform(TEXTS).toarray())
+        self.assertEqual(FeatureRows(0).matrix(self.pipeline, []).shape[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
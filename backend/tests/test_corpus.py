@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+import unittest
+import pandas as pd
+import numpy as np
+from backend.corpus import CorpusIndex, get_corpus, tokenize, union_rows
+
+
+class TestCorpusIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tweets.csv")
+        self.write([
+            " Enjoying a beautiful day at the #Park!   ",
+            "Traffic was terrible this morning.",
+            "The park was   crowded, traffic too",
+            "Learning C++ (finally) and loving it",
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, texts):
+        pd.DataFrame({"Text": texts, " Sentiment ": ["x"] * len(texts)}).to_csv(self.path)
+
+    def texts(self, corpus, query):
+        return corpus.frame(corpus.search(query))['text'].tolist()
+
+    def test_columns_are_normalized(self):
+        corpus = CorpusIndex(self.path)
+        df = corpus.frame()
+        self.assertListEqual(list(df.columns), ["text", "sentiment"])
+        self.assertEqual(df['text'][0], "Enjoying a beautiful day at the #Park!")
+
+    def test_frame_of_selected_columns(self):
+        corpus = CorpusIndex(self.path)
+        df = corpus.frame(corpus.search("park"), columns=("sentiment", "platform"))
+        self.assertListEqual(list(df.columns), ["sentiment"])
+        self.assertEqual(len(df), 2)
+
+    def test_keyword_search_is_token_based_and_case_insensitive(self):
+        corpus = CorpusIndex(self.path)
+        self.assertEqual(len(corpus.search("PARK")), 2)
+        self.assertEqual(len(corpus.search("missing")), 0)
+
+    def test_phrase_search_requires_literal_phrase(self):
+        corpus = CorpusIndex(self.path)
+        self.assertListEqual(self.texts(corpus, "park was crowded"), ["The park was   crowded, traffic too"])
+        self.assertListEqual(self.texts(corpus, "traffic was"), ["Traffic was terrible this morning."])
+        self.assertListEqual(self.texts(corpus, "was traffic"), [])
+
+    def test_query_is_not_a_regex(self):
+        corpus = CorpusIndex(self.path)
+        self.assertListEqual(self.texts(corpus, "C++ (finally)"), ["Learning C++ (finally) and loving it"])
+        self.assertEqual(len(corpus.search("(")), 0)
+
+    def test_reloads_when_file_changes(self):
+        corpus = get_corpus(self.path)
+        self.assertEqual(corpus.loads, 1)
+        self.assertFalse(corpus.refresh())
+        time.sleep(0.01)
+        self.write(["Only one tweet about parks"])
+        self.assertIs(get_corpus(self.path), corpus)
+        self.assertEqual(corpus.loads, 2)
+        self.assertEqual(len(corpus), 1)
+        self.assertEqual(len(corpus.search("park")), 0)
+
+    def test_snapshot_is_unchanged_by_a_reload(self):
+        corpus = CorpusIndex(self.path)
+        snapshot = corpus.snapshot()
+        time.sleep(0.01)
+        self.write(["Only one tweet about parks"])
+        self.assertEqual(len(corpus.search("parks")), 1)
+        # Rows found in the old version still refer to the old frame
+        rows = snapshot.search("traffic")
+        self.assertListEqual(snapshot.frame(rows)['text'].tolist(),
+                             ["Traffic was terrible this morning.", "The park was   crowded, traffic too"])
+        self.assertIsNot(corpus.snapshot(), snapshot)
+
+    def test_union_rows_maps_each_set_into_the_union(self):
+        union, positions = union_rows([np.array([5, 1, 9]), np.array([9, 2]), np.array([], dtype=np.int32)])
+        self.assertListEqual(union.tolist(), [1, 2, 5, 9])
+        self.assertListEqual([union[p].tolist() for p in positions], [[5, 1, 9], [9, 2], []])
+        self.assertEqual(len(union_rows([])[0]), 0)
+
+    def test_tokenize(self):
+        self.assertListEqual(tokenize("Hello, #World! it's"), ["hello", "world", "it", "s"])
+
+
+if __name__ == '__main__':
+    unittest.main()
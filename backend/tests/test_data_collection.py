@@ -1,6 +1,8 @@
+import time
 import unittest
 from unittest.mock import patch
 from backend.twitter_client import TwitterClient
+from backend.twitter_stub import FakeTweetSource, StubTwitterClient
 
 
 class TestTwitterClient(unittest.TestCase):
@@ -31,6 +33,25 @@ class TestTwitterClient(unittest.TestCase):
 
             self.assertEqual(str(context.exception), "Authentication failed")
 
+    def test_search_follows_pagination_beyond_100(self):
+        source = FakeTweetSource(total_results=250)
+        twitter_client = TwitterClient(client=StubTwitterClient(source=source))
+        pages = list(twitter_client.iter_tweet_pages("park", total=230))
+
+        self.assertEqual([len(page) for page in pages], [100, 100, 30])
+        self.assertEqual(source.calls, 3)
+        self.assertEqual(len(twitter_client.search_tweets("park", max_results=500)), 250)
+
+    def test_rate_limited_page_is_retried(self):
+        source = FakeTweetSource(total_results=40, rate_limit=1, window_seconds=0.05)
+        twitter_client = TwitterClient(client=StubTwitterClient(source=source))
+        real_sleep = time.sleep
+        with patch('backend.twitter_client.time.sleep', side_effect=lambda seconds: real_sleep(0.06)) as mock_sleep:
+            pages = list(twitter_client.iter_tweet_pages("park", total=20, page_size=10))
+        self.assertEqual(sum(len(page) for page in pages), 20)
+        self.assertTrue(mock_sleep.called)
+        self.assertEqual(source.rate_limited, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from backend.embedding_store import EmbeddingHead, EmbeddingStore, train_head
+
+DIM = 8
+
+
+class TestEmbeddingStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = EmbeddingStore(self.tmp_dir, DIM)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_add_and_lookup(self):
+        vectors = np.arange(3 * DIM, dtype=np.float32).reshape(3, DIM) / 10
+        self.assertEqual(self.store.add(["a", "b", "a"], vectors), 2)
+        self.assertEqual(self.store.add(["b", "c"], vectors[:2]), 1)
+
+        rows = self.store.lookup(["c", "a", "missing", "b"])
+        self.assertEqual(rows.tolist()[2], -1)
+        stored = self.store.vectors(rows[[1, 3]])
+        np.testing.assert_allclose(stored, vectors[:2], atol=1e-2)
+        np.testing.assert_allclose(self.store.vectors(rows[:1]), vectors[1:2], atol=1e-2)
+        self.assertEqual(self.store.matrix().dtype, np.float16)
+        self.assertEqual(len(self.store), 3)
+
+    def test_rows_are_shared_with_other_instances(self):
+        other = EmbeddingStore(self.tmp_dir, DIM)
+        self.store.add(["a"], np.ones((1, DIM)))
+        self.assertEqual(other.lookup(["a"]).tolist(), [0])
+        self.assertEqual(EmbeddingStore(self.tmp_dir, DIM).lookup(["a"]).tolist(), [0])
+        with self.assertRaises(ValueError):
+            EmbeddingStore(self.tmp_dir, DIM * 2)
+
+    def test_lookup_over_several_appends(self):
+        rng = np.random.default_rng(0)
+        texts = [f"post {i}" for i in range(500)]
+        for start in range(0, 500, 100):
+            batch = texts[start:start + 100]
+            self.store.add(batch + batch[:5], rng.normal(size=(105, DIM)))
+        queries = [texts[i] for i in rng.permutation(500)] + ["missing"]
+        expected = [texts.index(text) for text in queries[:-1]] + [-1]
+        self.assertListEqual(self.store.lookup(queries).tolist(), expected)
+        self.assertListEqual(EmbeddingStore(self.tmp_dir, DIM).lookup(queries).tolist(), expected)
+
+    def test_interrupted_write_is_discarded(self):
+        self.store.add(["a"], np.ones((1, DIM)))
+        # Embedding row written without its id
+        with open(os.path.join(self.tmp_dir, "embeddings.f16"), "ab") as f:
+            f.write(np.zeros(DIM, dtype=np.float16).tobytes())
+        reopened = EmbeddingStore(self.tmp_dir, DIM)
+        self.assertEqual(len(reopened), 1)
+        reopened.add(["b"], np.full((1, DIM), 2.0))
+        np.testing.assert_allclose(reopened.vectors(reopened.lookup(["b"])), np.full((1, DIM), 2.0))
+
+
+class TestEmbeddingHead(unittest.TestCase):
+
+    def test_linear_head_matches_softmax_of_scores(self):
+        head = EmbeddingHead(classes=["negative", "positive"], weight=np.array([[-1.0, 0.0], [1.0, 0.0]]),
+                             bias=np.zeros(2))
+        labels, confidences = head.predict_with_confidence(np.array([[2.0, 5.0], [-1.0, 0.0]]))
+        self.assertEqual(labels, ["positive", "negative"])
+        self.assertAlmostEqual(confidences[0], 1 / (1 + np.exp(-4.0)), places=5)
+        self.assertEqual(head.predict_with_confidence(np.zeros((0, 2))), ([], []))
+
+    def test_trained_head_round_trips(self):
+        rng = np.random.default_rng(0)
+        centers = {"negative": -2.0, "neutral": 0.0, "positive": 2.0}
+        labels = [label for label in centers for _ in range(20)]
+        embeddings = np.array([rng.normal(centers[label], 0.3, DIM) for label in labels])
+        head = train_head(embeddings, labels, name="sentiment")
+        self.assertEqual(head.predict(embeddings), labels)
+
+        binary = train_head(embeddings[20:], labels[20:])
+        self.assertEqual(binary.weight.shape, (2, DIM))
+        self.assertEqual(binary.predict(embeddings[20:]), labels[20:])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "heads", "sentiment.joblib")
+            head.save(path)
+            self.assertEqual(EmbeddingHead.load(path).predict(embeddings[:3]), labels[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from backend.fetch_scheduler import FairQueue, FetchScheduler, RateLimitExceeded, RateLimitWindow
+from backend.twitter_client import TwitterClient
+from backend.twitter_stub import FakeTweetSource, StubTwitterClient
+
+
+def make_scheduler(source, **kwargs):
+    return FetchScheduler(client_factory=lambda: TwitterClient(client=StubTwitterClient(source=source)), **kwargs)
+
+
+class TestFetchScheduler(unittest.TestCase):
+
+    def test_identical_queries_are_coalesced(self):
+        source = FakeTweetSource(latency=0.1, total_results=30)
+        scheduler = make_scheduler(source)
+
+        async def run():
+            return await asyncio.gather(
+                scheduler.fetch("Park", max_results=20, user_key=1),
+                scheduler.fetch("  park ", max_results=20, user_key=2),
+                scheduler.fetch("traffic", max_results=20, user_key=3),
+            )
+
+        first, second, third = asyncio.run(run())
+        self.assertEqual(len(first), 20)
+        self.assertIsNot(first, second)
+        self.assertEqual(scheduler.coalesced, 1)
+        self.assertEqual(source.calls, 2)
+
+    def test_fair_queue_round_robin(self):
+        async def run():
+            queue = FairQueue()
+            for item in ["a1", "a2", "a3"]:
+                queue.put("alice", item)
+            queue.put("bob", "b1")
+            return [await queue.get() for _ in range(4)]
+
+        self.assertEqual(asyncio.run(run()), ["a1", "b1", "a2", "a3"])
+
+    def test_exhausted_window_raises(self):
+        window = RateLimitWindow(limit=1, window_seconds=60)
+        scheduler = make_scheduler(FakeTweetSource(), window=window, max_wait=0.1)
+
+        async def run():
+            await scheduler.fetch("park", max_results=10)
+            await scheduler.fetch("traffic", max_results=10)
+
+        with self.assertRaises(RateLimitExceeded):
+            asyncio.run(run())
+
+    def test_api_rate_limit_raises(self):
+        # The stub's tweepy client raises tweepy.TooManyRequests, with a reset beyond the client's retry wait
+        scheduler = make_scheduler(FakeTweetSource(rate_limit=0, window_seconds=600),
+                                   window=RateLimitWindow(limit=10, window_seconds=60))
+
+        async def run():
+            await scheduler.fetch("park", max_results=10)
+
+        with self.assertRaises(RateLimitExceeded) as raised:
+            asyncio.run(run())
+        self.assertGreater(raised.exception.retry_after, 50)
+        self.assertEqual((scheduler.rate_limited, scheduler.window.remaining), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from backend.corpus import ANALYSIS_COLUMNS, TOKEN_INDEX_SUFFIX, CorpusIndex
+from backend.ingest import ingest_csv
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp.name, "tweets.csv")
+        pd.DataFrame({
+            "Text": [" Enjoying the park! ", "Traffic was terrible.", "Park was crowded", "Rainy day"],
+            "Platform": [" Twitter ", " Twitter ", " Instagram ", " Twitter "],
+            "Timestamp": ["2023-01-15 12:30:00", "2023-01-15 08:45:00", "2023-01-16 10:00:00", "bad date"],
+            "Likes": [30.0, 10.0, None, 5.0],
+        }).to_csv(self.csv_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ingest(self, name, chunksize=2):
+        path = os.path.join(self.tmp.name, name)
+        summary = ingest_csv(self.csv_path, path, chunksize=chunksize, cleaner=str.upper)
+        return path, summary
+
+    def test_columns_are_typed_and_dictionary_encoded(self):
+        _, summary = self.ingest("tweets.arrow")
+        columns = summary["columns"]
+        self.assertEqual(summary["rows"], 4)
+        self.assertTrue(columns["platform"].startswith("dictionary"))
+        self.assertEqual(columns["text"], "string")
+        self.assertTrue(columns["timestamp"].startswith("timestamp"))
+        self.assertEqual(columns["likes"], "double")
+        self.assertNotIn("unnamed: 0", columns)
+
+    def test_columnar_corpus_matches_csv_corpus(self):
+        for name in ("tweets.arrow", "tweets.parquet"):
+            path, _ = self.ingest(name)
+            self.assertTrue(os.path.exists(path + TOKEN_INDEX_SUFFIX))
+            columnar = CorpusIndex(path, ANALYSIS_COLUMNS)
+            csv = CorpusIndex(self.csv_path, ANALYSIS_COLUMNS)
+            for query in ("park", "park was", "missing"):
+                self.assertListEqual(columnar.search(query).tolist(), csv.search(query).tolist())
+            df = columnar.frame(columnar.search("park"))
+            self.assertListEqual(list(df.columns), ["text", "timestamp", "cleaned_text"])
+            self.assertListEqual(df["text"].tolist(), ["Enjoying the park!", "Park was crowded"])
+            self.assertListEqual(df["cleaned_text"].tolist(), ["ENJOYING THE PARK!", "PARK WAS CROWDED"])
+            self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["timestamp"]))
+
+    def test_rejects_unknown_output_format(self):
+        with self.assertRaises(ValueError):
+            self.ingest("tweets.json")
+
+
+if __name__ == '__main__':
+    unittest.main()
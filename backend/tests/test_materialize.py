@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from backend import analysis, materialize
+from backend.corpus import CorpusIndex
+
+VERSIONS = {"naive_bayes": "a", "svm": "b", "vectorizer": "c", "bert": "d"}
+
+
+def fake_run_analysis(df, trace=None, with_confidence=False, bundle=None):
+    """Stand-in classifier: labels by keyword, confidence 0.9."""
+    df['cleaned_text'] = df['text'].str.lower()
+    label = df['text'].str.contains('good').map({True: 'positive', False: 'negative'})
+    for column in analysis.PREDICTION_COLUMNS:
+        df[column] = label
+    for column in analysis.CONFIDENCE_COLUMNS:
+        df[column] = 0.9
+    return df
+
+
+class TestMaterialize(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tweets.csv")
+        self.write(["good park", "bad traffic", "good coffee"])
+        bundle = mock.Mock(version="test", versions=VERSIONS)
+        patches = [
+            mock.patch.object(analysis, "model_registry", mock.Mock(active=mock.Mock(return_value=bundle))),
+            mock.patch.object(analysis, "get_model_versions", return_value=VERSIONS),
+            mock.patch.object(analysis, "run_analysis", side_effect=fake_run_analysis),
+        ]
+        self.run_analysis = patches[2].start()
+        patches[0].start()
+        patches[1].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, texts):
+        pd.DataFrame({"Text": texts}).to_csv(self.path, index=False)
+
+    def test_incremental_recompute_only_classifies_new_or_changed_rows(self):
+        first = materialize.materialize(self.path)
+        self.assertEqual((first["reused"], first["classified"]), (0, 3))
+        self.assertTrue(first["output"].endswith(materialize.version_key(VERSIONS) + ".arrow"))
+
+        self.write(["good park", "bad traffic, again", "good coffee", "good news"])
+        second = materialize.materialize(self.path)
+        self.assertEqual((second["reused"], second["classified"]), (2, 2))
+
+        stored = materialize.read_predictions(second["output"]).to_pandas()
+        self.assertListEqual(stored["bert_sentiment"].tolist(), ["positive", "negative", "positive", "positive"])
+        self.assertListEqual(stored["nb_confidence"].tolist(), [0.9] * 4)
+
+    def test_attach_predictions_marks_stale_rows_for_classification(self):
+        materialize.materialize(self.path)
+        self.write(["good park", "changed text", "good coffee", "appended"])
+        corpus = CorpusIndex(self.path)
+        rows = corpus.search("good")
+        df = corpus.frame()
+
+        hits = materialize.attach_predictions(df, self.path, store=materialize.PredictionStore())
+        self.assertEqual(hits, 2)
+        self.assertListEqual(df["bert_sentiment"].isna().tolist(), [False, True, False, True])
+        self.assertListEqual(rows.tolist(), [0, 2])
+
+    def test_predictions_of_the_pinned_versions_are_attached(self):
+        materialize.materialize(self.path)
+        df = CorpusIndex(self.path).frame()
+        # The active models changed after the analysis pinned VERSIONS
+        with mock.patch.object(analysis, "get_model_versions", return_value={**VERSIONS, "bert": "e"}):
+            store = materialize.PredictionStore()
+            self.assertEqual(materialize.attach_predictions(df.copy(), self.path, store=store), 0)
+            self.assertEqual(materialize.attach_predictions(df, self.path, store=store, versions=VERSIONS), 3)
+
+    def test_no_stored_predictions(self):
+        df = CorpusIndex(self.path).frame()
+        self.assertEqual(materialize.attach_predictions(df, self.path, store=materialize.PredictionStore()), 0)
+        self.assertNotIn("bert_sentiment", df.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
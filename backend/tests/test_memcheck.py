@@ -0,0 +1,39 @@
+import os
+import unittest
+from backend.memcheck import child_pids, parse_smaps_rollup, process_memory, summarize
+
+SMAPS_ROLLUP = """55d0c0a00000-7ffd1e5f2000 ---p 00000000 00:00 0                          [rollup]
+Rss:             2048000 kB
+Pss:             1100000 kB
+Shared_Clean:    1800000 kB
+Shared_Dirty:      48000 kB
+Private_Clean:      1000 kB
+Private_Dirty:    199000 kB
+Swap:                  0 kB
+"""
+
+
+class TestMemcheck(unittest.TestCase):
+
+    def test_parse_smaps_rollup(self):
+        values = parse_smaps_rollup(SMAPS_ROLLUP)
+        self.assertEqual(values["Rss"], 2048000)
+        self.assertEqual(values["Private_Dirty"], 199000)
+
+    def test_workers_that_fit(self):
+        workers = [{"pid": i, "rssKb": 2000, "pssKb": 1100, "sharedKb": 1800, "privateKb": 200, "swapKb": 0}
+                   for i in range(2)]
+        summary = summarize(workers, available=10000)
+        self.assertEqual(summary["totalPssKb"], 2200)
+        self.assertEqual(summary["workersThatFit"], 41)
+
+    @unittest.skipUnless(os.path.exists("/proc/self/smaps_rollup"), "needs Linux /proc")
+    def test_current_process(self):
+        memory = process_memory(os.getpid())
+        self.assertGreater(memory["rssKb"], 0)
+        self.assertEqual(memory["rssKb"], memory["sharedKb"] + memory["privateKb"])
+        self.assertIn(os.getpid(), child_pids(os.getppid()))
+
+
+if __name__ == '__main__':
+    unittest.main()
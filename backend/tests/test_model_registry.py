@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, inspect
+from backend.database import ensure_columns
+from backend.model_registry import LEGACY_VERSION, ModelBundle, ModelManifest, ModelRegistry
+
+FILES = {"vectorizer": "vec.pkl", "naive_bayes": "nb.pkl", "svm": "svm.pkl", "bert": "bert.pth"}
+
+
+def fake_loader(manifest):
+    with open(manifest.path("svm")) as f:
+        return ModelBundle(manifest=manifest, models={"svm": f.read()}, versions={"svm": manifest.version})
+
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp_dir, "models")
+        os.makedirs(self.source)
+        self.write_models("v1")
+        legacy = ModelManifest(version=LEGACY_VERSION, directory=self.source, files=dict(FILES))
+        self.registry = ModelRegistry(os.path.join(self.tmp_dir, "registry"), fake_loader, legacy=legacy)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_models(self, content):
+        for filename in FILES.values():
+            with open(os.path.join(self.source, filename), "w") as f:
+                f.write(content)
+
+    def publish(self, version):
+        self.write_models(version)
+        return self.registry.publish(version, self.source, files=FILES)
+
+    def test_serves_legacy_models_without_registry(self):
+        bundle = self.registry.active()
+        self.assertEqual(bundle.version, LEGACY_VERSION)
+        self.assertIsNone(self.registry.check())
+
+    def test_publish_and_activate(self):
+        manifest = self.publish("v1")
+        self.assertEqual(ModelManifest.read(manifest.directory).files, FILES)
+        self.assertEqual(self.registry.versions(), ["v1"])
+        with self.assertRaises(ValueError):
+            self.publish("v1")
+        with self.assertRaises(FileNotFoundError):
+            self.registry.activate("missing")
+
+        self.registry.activate("v1")
+        self.assertEqual(self.registry.active_version(), "v1")
+        self.assertEqual(self.registry.active().models["svm"], "v1")
+        self.assertEqual(self.registry.active().describe(), {"svm": "v1", "release": "v1"})
+
+    def test_reload_swaps_in_background(self):
+        self.publish("v1")
+        self.publish("v2")
+        self.registry.activate("v1")
+        old = self.registry.active()
+
+        release = threading.Event()
+
+        def slow_loader(manifest):
+            release.wait(10)
+            return fake_loader(manifest)
+
+        self.registry.loader = slow_loader
+        self.registry.activate("v2")
+        thread = self.registry.check()
+        self.assertIsNotNone(thread)
+        # The previous bundle keeps serving while v2 loads, and a second check does not start another load
+        self.assertIs(self.registry.active(), old)
+        self.assertIsNone(self.registry.check())
+        release.set()
+        thread.join(10)
+        self.assertEqual(self.registry.active().version, "v2")
+        self.assertEqual(old.models["svm"], "v1")  # analyses holding it are unaffected
+
+    def test_failed_load_keeps_serving_and_is_not_retried(self):
+        self.publish("v1")
+        self.publish("v2")
+        self.registry.activate("v1")
+        self.registry.active()
+        os.remove(os.path.join(self.registry.root, "v2", "svm.pkl"))
+
+        self.registry.activate("v2")
+        self.registry.check().join(10)
+        self.assertEqual(self.registry.active().version, "v1")
+        self.assertIn("v2", self.registry.status()["lastError"])
+        self.assertIsNone(self.registry.check())
+
+        # Rolling back clears the error on the next check
+        self.registry.activate(LEGACY_VERSION)
+        self.registry.check().join(10)
+        self.assertEqual(self.registry.active().version, LEGACY_VERSION)
+        self.assertIsNone(self.registry.status()["lastError"])
+
+
+class TestEnsureColumns(unittest.TestCase):
+
+    def test_adds_missing_columns_once(self):
+        engine = create_engine("sqlite://")
+        Table("analyses", MetaData(), Column("id", Integer, primary_key=True)).create(engine)
+        ensure_columns(engine, "analyses", {"model_versions": "TEXT"})
+        ensure_columns(engine, "analyses", {"model_versions": "TEXT"})
+        columns = [column["name"] for column in inspect(engine).get_columns("analyses")]
+        self.assertEqual(columns, ["id", "model_versions"])
+
+
+if __name__ == '__main__':
+    unittest.main()
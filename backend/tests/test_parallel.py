@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+import joblib
+import numpy as np
+from backend.classical import MODEL_FILES, load_classical_pipeline, train_hashing_models
+from backend.parallel import ModelExecutors, torch_thread_budget
+
+TEXTS = ["love great day", "hate terrible traffic", "okay average day", "great fantastic love",
+         "awful hate rain", "fine normal meeting"]
+LABELS = ["positive", "negative", "neutral", "positive", "negative", "neutral"]
+
+
+class TestThreadBudget(unittest.TestCase):
+
+    def test_torch_gets_the_cores_left_by_classical_workers(self):
+        self.assertEqual(torch_thread_budget(2, cpu_count=8), 6)
+        self.assertEqual(torch_thread_budget(1, cpu_count=1), 1)
+
+
+class TestModelExecutors(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.models_dir = tempfile.mkdtemp()
+        cls.pipeline = train_hashing_models(TEXTS * 5, LABELS * 5)
+        for name, filename in MODEL_FILES["hashing"].items():
+            joblib.dump(cls.pipeline.models[name].estimator, os.path.join(cls.models_dir, filename))
+        cls.spec = ModelExecutors.model_spec(load_classical_pipeline(cls.models_dir, "hashing"))
+        cls.executors = ModelExecutors(classical_workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executors.shutdown()
+        shutil.rmtree(cls.models_dir)
+
+    def test_worker_predictions_match_in_process_predictions(self):
+        expected = self.pipeline.classify(TEXTS, with_confidence=True)
+        result = self.executors.submit_classical(self.spec, TEXTS, with_confidence=True).result(timeout=120)
+        self.assertEqual(sorted(result), sorted(expected))
+        for column, values in expected.items():
+            if column.endswith('_confidence'):
+                np.testing.assert_allclose(result[column], values)
+            else:
+                self.assertListEqual(list(result[column]), list(values))
+
+    def test_bert_pass_runs_on_a_separate_thread(self):
+        import threading
+        name = self.executors.submit_bert(lambda: threading.current_thread().name).result(timeout=10)
+        self.assertTrue(name.startswith("bert"))
+
+    def test_pool_is_recreated_after_reset(self):
+        self.executors.submit_classical(self.spec, TEXTS[:1]).result(timeout=120)
+        self.executors.reset_classical()
+        result = self.executors.submit_classical(self.spec, TEXTS[:2]).result(timeout=120)
+        self.assertEqual(len(result["nb_sentiment"]), 2)
+
+    def test_spec_identifies_the_model_files(self):
+        features, paths = self.spec
+        self.assertEqual(features, "hashing")
+        self.assertEqual(dict(paths)["svm"], os.path.join(self.models_dir, MODEL_FILES["hashing"]["svm"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend import models
+from backend.request_logger import RequestLogBuffer, get_token_subject
+from backend.utils import create_access_token
+
+
+class TestRequestLogBuffer(unittest.TestCase):
+
+    def test_drops_when_full(self):
+        buffer = RequestLogBuffer(capacity=2, batch_size=10)
+        self.assertTrue(buffer.record("GET", "/api/analyses/", 200))
+        self.assertTrue(buffer.record("POST", "/api/analyze_query/", 200))
+        self.assertFalse(buffer.record("GET", "/", 200))
+        self.assertEqual(buffer.stats()["dropped"], 1)
+        self.assertEqual(len(buffer), 2)
+
+    def test_drain_is_fifo_and_bounded(self):
+        buffer = RequestLogBuffer(capacity=10, batch_size=2)
+        for path in ["/a", "/b", "/c"]:
+            buffer.record("GET", path, 200)
+        self.assertEqual([entry["path"] for entry in buffer.drain()], ["/a", "/b"])
+        self.assertEqual([entry["path"] for entry in buffer.drain()], ["/c"])
+        self.assertEqual(buffer.drain(), [])
+
+    def test_tokens_are_resolved_when_the_batch_is_written(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        db.add(models.User(email="user@example.com", password="x", name="User"))
+        db.commit()
+        user_id = db.query(models.User.id).scalar()
+
+        buffer = RequestLogBuffer()
+        token = create_access_token({"sub": "user@example.com"})
+        for header in [f"Bearer {token}", "Bearer not-a-token", None]:
+            buffer.record("GET", "/api/analyses/", 200, authorization=header)
+        # Only the raw header is queued; decoding waits for the flush
+        self.assertEqual(buffer._buffer[0]["authorization"], f"Bearer {token}")
+        with mock.patch("backend.request_logger.SessionLocal", Session):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertListEqual([row.user_id for row in db.query(models.Log).order_by(models.Log.id)],
+                             [user_id, None, None])
+        db.close()
+
+    def test_token_subject(self):
+        token = create_access_token({"sub": "user@example.com"})
+        self.assertEqual(get_token_subject(f"Bearer {token}"), "user@example.com")
+        self.assertIsNone(get_token_subject("Bearer not-a-token"))
+        self.assertIsNone(get_token_subject(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
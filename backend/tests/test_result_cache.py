@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend import models
+from backend.result_cache import AnalysisResultCache, cache_key, source_fingerprint, with_analysis_id
+
+VERSIONS = {"release": "v1", "svm": "abc"}
+
+
+def response_json(analysis_id):
+    return json.dumps({"id": analysis_id, "query": "delays", "rawData": [{"text": "Flight delayed"}]})
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def test_key_normalizes_query_and_tracks_file_versions_and_options(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("text\nFlight delayed\n")
+        try:
+            source = source_fingerprint(f.name)
+            key = cache_key("Flight  Delays", source, VERSIONS, {"cascadeThreshold": None})
+            self.assertEqual(key, cache_key("flight delays", source, VERSIONS, {"cascadeThreshold": None}))
+            self.assertNotEqual(key, cache_key("flight delays", source, {**VERSIONS, "release": "v2"},
+                                               {"cascadeThreshold": None}))
+            self.assertNotEqual(key, cache_key("flight delays", source, VERSIONS, {"cascadeThreshold": 0.6}))
+            with open(f.name, "a") as out:
+                out.write("Lost luggage\n")
+            self.assertNotEqual(key, cache_key("flight delays", source_fingerprint(f.name), VERSIONS,
+                                               {"cascadeThreshold": None}))
+        finally:
+            os.remove(f.name)
+
+    def test_analysis_id_is_replaced_without_changing_the_rest(self):
+        replaced = with_analysis_id(response_json("first"), "second")
+        self.assertEqual(json.loads(replaced), json.loads(response_json("second")))
+        with_query = with_analysis_id(json.dumps({"id": "first", "query": "a, \"b\"", "rawData": []}), "second", "c")
+        self.assertEqual(json.loads(with_query), {"id": "second", "query": "c", "rawData": []})
+        # Falls back to parsing when the id is not the first field
+        reordered = json.dumps({"query": "delays", "id": "first"})
+        self.assertEqual(json.loads(with_analysis_id(reordered, "second"))["id"], "second")
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        models.Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.cache = AnalysisResultCache(ttl=60)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_stored_result_is_found_and_loaded_per_analysis(self):
+        self.assertIsNone(self.cache.lookup(self.db, "k1"))
+        stored = self.cache.store(self.db, "k1", response_json("first"), VERSIONS)
+        found = self.cache.lookup(self.db, "k1")
+        self.assertEqual((found.id, found.model_versions), (stored.id, VERSIONS))
+        self.assertEqual(json.loads(self.cache.load(self.db, stored.id, "second"))["id"], "second")
+        self.assertEqual(self.cache.hits, 1)
+        with self.assertRaises(LookupError):
+            self.cache.load(self.db, stored.id + 1, "second")
+
+    def test_expired_results_are_recomputed_and_pruned_when_unreferenced(self):
+        kept = self.cache.store(self.db, "kept", response_json("a"))
+        dropped = self.cache.store(self.db, "dropped", response_json("b"))
+        self.db.add(models.Analysis(analysis_id="a", query="delays", response_data="", result_id=kept.id, user_id=1))
+        old = datetime.utcnow() - timedelta(seconds=120)
+        self.db.query(models.AnalysisResult).update({"created_at": old})
+        self.db.commit()
+        self.assertIsNone(self.cache.lookup(self.db, "kept"))
+
+        self.cache.store(self.db, "new", response_json("c"))
+        remaining = {row.id for row in self.db.query(models.AnalysisResult.id)}
+        self.assertIn(kept.id, remaining)
+        self.assertNotIn(dropped.id, remaining)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_identical_requests_compute_once(self):
+        cache = AnalysisResultCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(cache.run("k", compute) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(main()), ["result"] * 5)
+        self.assertEqual((len(calls), cache.misses, cache.coalesced), (1, 1, 4))
+        self.assertEqual(cache._inflight, {})
+
+    def test_failure_is_shared_and_not_cached(self):
+        cache = AnalysisResultCache()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("no posts")
+
+        async def main():
+            return await asyncio.gather(cache.run("k", fail), cache.run("k", fail), return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(cache._inflight, {})
+
+    def test_cancelled_computation_is_retried_by_a_waiter(self):
+        cache = AnalysisResultCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            leader = asyncio.create_task(cache.run("k", compute))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(cache.run("k", compute)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return results
+
+        self.assertEqual(asyncio.run(main()), ["result"] * 3)
+        self.assertEqual((len(calls), cache.misses, cache.coalesced), (2, 2, 3))
+        self.assertEqual(cache._inflight, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
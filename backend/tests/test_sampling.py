@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+import pandas as pd
+from backend import sampling
+from backend.sampling import allocate, estimate_daily, estimate_distribution, stratified_sample
+
+
+def make_posts(rows=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    posts = pd.DataFrame({
+        "timestamp": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 10, rows), unit="D"),
+        "platform": rng.choice(["Twitter", "Facebook", "Instagram"], rows, p=[0.6, 0.3, 0.1]),
+        "country": rng.choice([f"c{i}" for i in range(50)], rows),
+    })
+    # Sentiment depends on the platform, so stratifying by it matters
+    positive = rng.random(rows) < np.where(posts["platform"] == "Twitter", 0.7, 0.2)
+    labels = np.where(positive, "positive", np.where(rng.random(rows) < 0.5, "negative", "neutral"))
+    return posts, labels
+
+
+class TestStratifiedSample(unittest.TestCase):
+
+    def test_allocation_is_proportional_with_every_stratum_represented(self):
+        allocation = allocate(np.array([900, 95, 5]), 100)
+        self.assertListEqual(allocation.tolist(), [90, 10, 1])
+        self.assertListEqual(allocate(np.array([3, 1000]), 500).tolist(), [1, 499])
+
+    def test_sample_is_stratified_and_reproducible(self):
+        posts, _ = make_posts()
+        sample = stratified_sample(posts, 1000)
+        # 10 days x 3 platforms x 50 countries is too fine for 1000 posts, so country is dropped
+        self.assertEqual(sample.columns, ("day", "platform"))
+        self.assertEqual(len(sample.population), 30)
+        self.assertEqual(len(sample.positions), 1000)
+        self.assertTrue(np.all(np.diff(sample.positions) > 0))
+        expected = sample.population * 1000 / len(posts)
+        self.assertTrue(np.all(np.abs(sample.sampled - expected) <= 1))
+        self.assertAlmostEqual(sample.weights().sum(), len(posts))
+        np.testing.assert_array_equal(stratified_sample(posts, 1000).positions, sample.positions)
+        self.assertFalse(np.array_equal(stratified_sample(posts, 1000, seed=1).positions, sample.positions))
+
+    def test_without_strata_columns_the_sample_is_simple(self):
+        sample = stratified_sample(pd.DataFrame({"text": ["post"] * 50}), 10)
+        self.assertEqual((sample.columns, len(sample.population), len(sample.positions)), ((), 1, 10))
+
+
+class TestEstimates(unittest.TestCase):
+
+    def test_distribution_intervals_cover_the_exact_shares(self):
+        posts, labels = make_posts()
+        exact = {sentiment: float(np.mean(labels == sentiment)) for sentiment in sampling.SENTIMENTS}
+        covered = 0
+        for seed in range(20):
+            sample = stratified_sample(posts, 1000, seed=seed)
+            estimates = estimate_distribution(labels[sample.positions], sample, n_boot=300, seed=seed)
+            self.assertAlmostEqual(sum(e["share"] for e in estimates.values()), 1.0, places=3)
+            self.assertAlmostEqual(sum(e["count"] for e in estimates.values()), len(posts), delta=2)
+            for sentiment, estimate in estimates.items():
+                self.assertLess(estimate["low"], estimate["share"])
+                self.assertGreater(estimate["high"], estimate["share"])
+                covered += estimate["low"] <= exact[sentiment] <= estimate["high"]
+        self.assertGreaterEqual(covered, 52)  # of 60 intervals at 95%
+
+    def test_daily_estimates_add_up_to_the_population(self):
+        posts, labels = make_posts(rows=5000)
+        sample = stratified_sample(posts, 500)
+        series = estimate_daily(posts["timestamp"].iloc[sample.positions], labels[sample.positions], sample.weights())
+        self.assertEqual(len(series), 10)
+        total = sum(day[s] for day in series for s in sampling.SENTIMENTS)
+        self.assertAlmostEqual(total, 5000, delta=15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from backend import similarity
+from backend.similarity import SimilarityIndex
+
+POSTS = [
+    {"text": "Flight delayed again", "cleaned_text": "flight delayed again", "bert_sentiment": "negative"},
+    {"text": "My flight was delayed three hours", "cleaned_text": "flight delayed three hours", "bert_sentiment": "negative"},
+    {"text": "Great crew on my flight", "cleaned_text": "great crew flight", "bert_sentiment": "positive"},
+    {"text": "Lost luggage at the airport", "cleaned_text": "lost luggage airport", "bert_sentiment": "negative"},
+    {"text": "Lovely breakfast", "cleaned_text": "lovely breakfast", "bert_sentiment": "positive"},
+]
+
+
+class TestSimilarityIndex(unittest.TestCase):
+
+    def setUp(self):
+        vectorizer = TfidfVectorizer().fit([post["cleaned_text"] for post in POSTS])
+        self.index = SimilarityIndex.build(POSTS, vectorizer.transform)
+
+    def test_text_query_ranks_by_cosine_similarity(self):
+        matches = self.index.similar_to_text("delayed flight", k=3)
+        self.assertEqual([position for position, _ in matches][:2], [0, 1])
+        self.assertGreater(matches[0][1], matches[1][1])
+        self.assertEqual(self.index.similar_to_text("unrelated words", k=3), [])
+
+    def test_post_query_excludes_itself_and_filters_by_sentiment(self):
+        matches = self.index.similar_to_post(0, k=2)
+        self.assertNotIn(0, [position for position, _ in matches])
+        self.assertEqual(matches[0][0], 1)
+        positive = self.index.similar_to_post(0, k=5, sentiment="positive")
+        self.assertEqual([position for position, _ in positive], [2])
+        with self.assertRaises(IndexError):
+            self.index.similar_to_post(len(POSTS))
+
+    def test_dense_approximate_search_matches_exact_search(self):
+        rng = np.random.default_rng(0)
+        basis = rng.normal(size=(8, 64))
+        embeddings = rng.normal(size=(3000, 8)) @ basis + 0.05 * rng.normal(size=(3000, 64))
+        exact = SimilarityIndex(embeddings, None)
+        original = (similarity.SIMILARITY_EXACT_ROWS, similarity.SIMILARITY_REDUCED_DIM)
+        similarity.SIMILARITY_EXACT_ROWS, similarity.SIMILARITY_REDUCED_DIM = 1000, 16
+        try:
+            approximate = SimilarityIndex(embeddings, None)
+        finally:
+            similarity.SIMILARITY_EXACT_ROWS, similarity.SIMILARITY_REDUCED_DIM = original
+        self.assertFalse(exact.approximate)
+        self.assertTrue(approximate.approximate)
+        for position in range(5):
+            expected = exact.nearest(embeddings[position], k=5)
+            found = approximate.nearest(embeddings[position], k=5)
+            self.assertEqual([p for p, _ in found], [p for p, _ in expected])
+            np.testing.assert_allclose([s for _, s in found], [s for _, s in expected], rtol=1e-4)
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def test_index_is_built_once_per_model_version(self):
+        vectorizer = TfidfVectorizer().fit([post["cleaned_text"] for post in POSTS])
+        bundle = SimpleNamespace(versions={"svm": "v1"}, models={"classical": SimpleNamespace(transform=vectorizer.transform)})
+        loads = []
+
+        def load_posts():
+            loads.append(1)
+            return POSTS
+
+        first = similarity.get_index("a1", load_posts, bundle, "tfidf")
+        self.assertIs(similarity.get_index("a1", load_posts, bundle, "tfidf"), first)
+        self.assertEqual(len(loads), 1)
+
+        bundle.versions = {"svm": "v2"}
+        self.assertIsNot(similarity.get_index("a1", load_posts, bundle, "tfidf"), first)
+        similarity.forget("a1")
+        similarity.get_index("a1", load_posts, bundle, "tfidf")
+        self.assertEqual(len(loads), 3)
+        with self.assertRaises(ValueError):
+            similarity.get_index("a1", load_posts, bundle, "words")
+        similarity.forget("a1")
+
+
+if __name__ == '__main__':
+    unittest.main()
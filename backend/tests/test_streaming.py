@@ -0,0 +1,139 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend import models, streaming
+
+
+class TestRollingCounters(unittest.TestCase):
+
+    def test_counts_are_bucketed_by_minute_and_hour(self):
+        counters = streaming.RollingCounters()
+        counters.add(
+            [datetime(2024, 1, 1, 10, 0, 5), datetime(2024, 1, 1, 10, 0, 50), datetime(2024, 1, 1, 10, 1, 0)],
+            ["positive", "negative", "positive"]
+        )
+        minutes = counters.series("minute")
+        self.assertEqual(len(minutes), 2)
+        self.assertEqual(minutes[0], {"date": "2024-01-01T10:00:00", "positive": 1, "negative": 1, "neutral": 0})
+        hours = counters.series("hour")
+        self.assertEqual(hours, [{"date": "2024-01-01T10:00:00", "positive": 2, "negative": 1, "neutral": 0}])
+
+    def test_old_buckets_are_trimmed(self):
+        counters = streaming.RollingCounters()
+        limit = streaming.RETENTION["minute"]
+        timestamps = [datetime(2024, 1, 1) + pd.Timedelta(minutes=i) for i in range(limit + 10)]
+        counters.add(timestamps, ["neutral"] * len(timestamps))
+        minutes = counters.series("minute")
+        self.assertEqual(len(minutes), limit)
+        self.assertEqual(minutes[0]["date"], timestamps[10].isoformat())
+
+    def test_dirty_buckets_are_reported_once(self):
+        counters = streaming.RollingCounters()
+        counters.add([datetime(2024, 1, 1, 10, 0)], ["positive"])
+        self.assertEqual(len(counters.pop_dirty()), 2)
+        self.assertEqual(counters.pop_dirty(), [])
+
+
+class TestReplaySource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "feed.csv")
+        pd.DataFrame({"Text": ["good", "bad", "fine"], "Timestamp": ["2023-01-15 12:30:00"] * 3}).to_csv(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batches_wrap_around(self):
+        source = streaming.ReplaySource(self.path, batch_size=2)
+        first = asyncio.run(source.next_batch())
+        second = asyncio.run(source.next_batch())
+        self.assertListEqual(first['text'].tolist(), ["good", "bad"])
+        self.assertListEqual(second['text'].tolist(), ["fine", "good"])
+
+    def test_replay_path_must_stay_inside_replay_dir(self):
+        with mock.patch.object(streaming, "STREAM_REPLAY_DIR", os.path.realpath(self.tmp.name)):
+            self.assertEqual(streaming.resolve_replay_path("feed.csv"), os.path.realpath(self.path))
+            with self.assertRaises(ValueError):
+                streaming.resolve_replay_path("../feed.csv")
+            with self.assertRaises(ValueError):
+                streaming.resolve_replay_path("missing.csv")
+
+    def test_monitor_classifies_batches_and_publishes(self):
+        def fake_analysis(df, trace=None):
+            df = df.copy()
+            df['bert_sentiment'] = "positive"
+            return df
+
+        monitor = streaming.StreamingMonitor(1, "feed", streaming.ReplaySource(self.path, batch_size=3), 5)
+        queue = monitor.subscribe()
+        with mock.patch.object(streaming.analysis, "run_analysis", side_effect=fake_analysis):
+            processed = asyncio.run(monitor.run_once())
+        self.assertEqual(processed, 3)
+        event = queue.get_nowait()
+        self.assertEqual(event["minute"][0]["positive"], 3)
+
+
+class TestStreamingManager(unittest.TestCase):
+
+    def make_monitor(self, manager):
+        monitor = streaming.StreamingMonitor(1, "feed", SimpleNamespace(since_id=None), 5)
+        manager.monitors[1] = monitor
+        return monitor
+
+    def test_buckets_counted_while_persisting_are_kept(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        manager = streaming.StreamingManager()
+        monitor = self.make_monitor(manager)
+        monitor.counters.add([datetime(2024, 1, 1, 10, 0)], ["positive"])
+        changes = manager.collect_changes()
+        # Counted after the changes were collected but before they are written
+        monitor.counters.add([datetime(2024, 1, 1, 10, 0)], ["positive"])
+        with mock.patch.object(streaming, "SessionLocal", Session):
+            manager.persist(changes)
+            manager.persist(manager.collect_changes())
+        db = Session()
+        counts = {w.granularity: w.positive for w in db.query(models.SentimentWindow)}
+        db.close()
+        self.assertEqual(counts, {"minute": 2, "hour": 2})
+
+    def test_ingestion_tasks_are_kept_and_cancelled_on_shutdown(self):
+        manager = streaming.StreamingManager()
+        monitor = self.make_monitor(manager)
+        started = []
+
+        async def run_once():
+            started.append(1)
+            await asyncio.sleep(60)
+
+        async def main():
+            runner = asyncio.create_task(manager.run())
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(manager.tasks), 1)
+            task = next(iter(manager.tasks))
+            runner.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await runner
+            return task
+
+        with mock.patch.object(monitor, "run_once", run_once), \
+                mock.patch.object(streaming, "STREAM_TICK", 0.01), \
+                mock.patch.object(manager, "persist"):
+            task = asyncio.run(main())
+        self.assertEqual(started, [1])
+        self.assertTrue(task.cancelled())
+        self.assertEqual(manager.tasks, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
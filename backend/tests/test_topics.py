@@ -0,0 +1,108 @@
+import unittest
+import unittest.mock
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from backend.aggregation import SentimentAggregator
+from backend.classical import ClassicalPipeline, FeatureRows, make_hashing_vectorizer
+from backend.topics import SentimentTopics, describe_topics, fill_feature_rows
+
+THEMES = {
+    "negative": [["flight", "delayed", "hours", "gate"], ["luggage", "lost", "airport", "bag"]],
+    "positive": [["crew", "friendly", "service", "smile"], ["food", "tasty", "meal", "snack"]],
+}
+
+
+def make_posts(per_theme=60, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for sentiment, themes in THEMES.items():
+        for words in themes:
+            for _ in range(per_theme):
+                text = " ".join(rng.choice(words, size=4))
+                rows.append({"text": text.capitalize(), "cleaned_text": text, "bert_sentiment": sentiment})
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+class TestSentimentTopics(unittest.TestCase):
+
+    def setUp(self):
+        self.posts = make_posts()
+        vectorizer = TfidfVectorizer().fit(self.posts["cleaned_text"])
+        self.pipeline = ClassicalPipeline(vectorizer)
+
+    def test_topics_separate_themes_per_sentiment(self):
+        extractor = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+        extractor.add(self.posts)
+        summary = extractor.summary()
+        self.assertEqual(set(summary), {"negative", "positive"})
+        for sentiment, themes in THEMES.items():
+            found = [set(topic["terms"][:4]) for topic in summary[sentiment]]
+            for words in themes:
+                self.assertIn(set(words), found)
+            for topic in summary[sentiment]:
+                self.assertEqual(len(topic["posts"]), 3)
+                self.assertAlmostEqual(topic["share"], 0.5, delta=0.15)
+
+    def test_chunked_input_gives_the_same_topics(self):
+        whole = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+        whole.add(self.posts)
+        chunked = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+        for start in range(0, len(self.posts), 37):
+            chunked.add(self.posts.iloc[start:start + 37])
+            self.assertTrue(all(len(pending) < 50 for pending in chunked._pending.values()))
+        self.assertEqual(whole.summary(), chunked.summary())
+
+    def test_classical_feature_rows_are_reused(self):
+        expected = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+        expected.add(self.posts)
+        feature_rows = FeatureRows(len(self.posts))
+        half = np.arange(0, len(self.posts), 2)
+        feature_rows.add(half, self.pipeline.transform(self.posts["cleaned_text"].iloc[half]))
+        reused = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+        with unittest.mock.patch.object(self.pipeline, "transform", wraps=self.pipeline.transform) as transform:
+            reused.add(self.posts, feature_rows)
+        self.assertEqual(len(transform.call_args.args[0]), len(self.posts) - len(half))
+        self.assertEqual(expected.summary(), reused.summary())
+
+    def test_queries_sharing_posts_vectorize_them_once(self):
+        queries = [np.arange(0, 150), np.arange(100, len(self.posts))]
+        expected = []
+        for positions in queries:
+            extractor = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+            extractor.add(self.posts.iloc[positions].reset_index(drop=True))
+            expected.append(extractor.summary())
+        feature_rows = FeatureRows(len(self.posts))
+        with unittest.mock.patch.object(self.pipeline, "transform", wraps=self.pipeline.transform) as transform:
+            fill_feature_rows(SimpleNamespace(models={"classical": self.pipeline}), feature_rows,
+                              self.posts["cleaned_text"])
+            for positions, summary in zip(queries, expected):
+                reused = SentimentTopics(self.pipeline, n_topics=2, batch_rows=50)
+                reused.add(self.posts.iloc[positions].reset_index(drop=True), feature_rows.take(positions))
+                self.assertEqual(reused.summary(), summary)
+        self.assertEqual(transform.call_count, 1)
+
+    def test_small_sentiments_get_no_topics(self):
+        extractor = SentimentTopics(self.pipeline, n_topics=2)
+        extractor.add(self.posts.head(10))
+        self.assertEqual(extractor.summary(), {})
+        self.assertIsNone(describe_topics({}))
+
+    def test_hashing_features_are_named_from_the_posts(self):
+        extractor = SentimentTopics(ClassicalPipeline(make_hashing_vectorizer(), "hashing"), n_topics=2, batch_rows=50)
+        extractor.add(self.posts)
+        negative = extractor.summary()["negative"]
+        self.assertIn(set(THEMES["negative"][0]), [set(topic["terms"][:4]) for topic in negative])
+
+    def test_aggregator_feeds_topics_and_insight_sentence(self):
+        aggregator = SentimentAggregator(topics=SentimentTopics(self.pipeline, n_topics=2, batch_rows=50))
+        posts = self.posts.assign(nb_sentiment=self.posts["bert_sentiment"], svm_sentiment=self.posts["bert_sentiment"])
+        aggregator.add(posts)
+        sentence = describe_topics(aggregator.topics.summary())
+        self.assertTrue(sentence.startswith("Negative posts mostly discuss"))
+        self.assertIn("Positive posts", sentence)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from backend.tracing import Histogram, PipelineTrace, render_metrics
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_trace_records_stages(self):
+        trace = PipelineTrace()
+        with trace.stage("preprocessing", rows=10):
+            pass
+        with trace.stage("bert") as record:
+            record["rows"] = 4
+
+        timings = trace.as_dict()
+        self.assertEqual([s["stage"] for s in timings["stages"]], ["preprocessing", "bert"])
+        self.assertEqual(timings["stages"][1]["rows"], 4)
+        self.assertIn("bert;dur=", trace.server_timing_header())
+        self.assertIn('analysis_stage_duration_seconds_count{stage="bert"}', render_metrics())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "Test.", "stage", buckets=(0.1, 1.0))
+        histogram.observe("a", 0.05)
+        histogram.observe("a", 0.5)
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{stage="a",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{stage="a",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{stage="a",le="+Inf"} 2', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import time
+import unittest
+import pandas as pd
+from backend.fetch_scheduler import FetchScheduler
+from backend.tweet_cache import TweetCache, fetch_live_tweets
+from backend.twitter_client import TwitterClient
+from backend.twitter_stub import FakeTweetSource, StubTwitterClient
+
+
+class TestTweetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.source = FakeTweetSource(total_results=50, new_tweets_per_minute=6000)
+        self.scheduler = FetchScheduler(
+            client_factory=lambda: TwitterClient(client=StubTwitterClient(source=self.source))
+        )
+        self.cache = TweetCache(ttl=60)
+
+    def fetch(self, query, incremental=False):
+        return asyncio.run(fetch_live_tweets(query, 20, incremental=incremental,
+                                             cache=self.cache, scheduler=self.scheduler))
+
+    def test_repeated_query_is_served_from_cache(self):
+        first = self.fetch("Park")
+        second = self.fetch(" park")
+        self.assertEqual(self.source.calls, 1)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertListEqual(first['id'].tolist(), second['id'].tolist())
+
+    def test_incremental_refresh_only_fetches_newer_tweets(self):
+        first = self.fetch("park")
+        time.sleep(0.1)
+        refreshed = self.fetch("park", incremental=True)
+
+        self.assertEqual(self.cache.refreshes, 1)
+        self.assertGreater(refreshed['id'].iloc[0], first['id'].iloc[0])
+        self.assertEqual(len(refreshed), 20)
+        self.assertTrue(refreshed['id'].is_unique)
+
+    def test_lru_eviction_by_size(self):
+        df = pd.DataFrame({'id': range(100), 'text': ['some tweet text'] * 100})
+        cache = TweetCache(ttl=60, max_bytes=int(df.memory_usage(deep=True).sum() * 1.5))
+        cache.put("a", df, 100)
+        cache.put("b", df.copy(), 100)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+        self.assertEqual(cache.evictions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import tweepy
+from backend.twitter_client import TwitterClient
+from backend.twitter_stub import FakeTweetSource, StubTwitterClient, start_stub_server
+
+
+class TestTwitterStub(unittest.TestCase):
+
+    def test_pagination_through_tweepy(self):
+        client = StubTwitterClient(source=FakeTweetSource(page_size=10, total_results=25))
+        first = client.search_recent_tweets(query="park", max_results=10)
+        self.assertEqual(len(first.data), 10)
+        self.assertIn("next_token", first.meta)
+
+        ids = [t.id for t in first.data]
+        token = first.meta["next_token"]
+        while token:
+            page = client.search_recent_tweets(query="park", max_results=10, next_token=token)
+            ids.extend(t.id for t in page.data)
+            token = page.meta.get("next_token")
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_rate_limit_raises_too_many_requests(self):
+        client = StubTwitterClient(source=FakeTweetSource(rate_limit=1))
+        client.search_recent_tweets(query="park", max_results=10)
+        with self.assertRaises(tweepy.TooManyRequests) as context:
+            client.search_recent_tweets(query="park", max_results=10)
+        self.assertIn("x-rate-limit-reset", context.exception.response.headers)
+
+    def test_last_page_is_trimmed_to_max_results(self):
+        twitter_client = TwitterClient(client=StubTwitterClient(source=FakeTweetSource(total_results=150)))
+        df = twitter_client.search_tweets("park", max_results=105)
+        self.assertEqual(len(df), 105)
+        self.assertEqual(df['id'].nunique(), 105)
+
+    def test_twitter_client_over_http_stub(self):
+        server = start_stub_server(FakeTweetSource(total_results=15))
+        try:
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            twitter_client = TwitterClient(client=StubTwitterClient(base_url=base_url))
+            df = twitter_client.search_tweets("park", max_results=10)
+            self.assertEqual(len(df), 10)
+            self.assertTrue(df['username'].str.startswith('user').all())
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
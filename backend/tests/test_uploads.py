@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from backend import uploads
+
+
+class TestUploads(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_csv_is_read_in_chunks(self):
+        path = os.path.join(self.tmp.name, "upload.csv")
+        pd.DataFrame({" Text ": [f" post {i} " for i in range(25)] + [" "]}).to_csv(path, index=False)
+        chunks = list(uploads.iter_upload_chunks(path, chunk_rows=10))
+        self.assertListEqual([len(chunk) for chunk, _ in chunks], [10, 10, 5])
+        self.assertEqual(chunks[0][0]['text'][0], "post 0")
+        self.assertEqual(chunks[-1][1], os.path.getsize(path))
+
+    def test_jsonl_is_supported(self):
+        path = os.path.join(self.tmp.name, "upload.jsonl")
+        pd.DataFrame({"text": ["a", "b", "c"], "timestamp": ["2024-01-01"] * 3}).to_json(path, orient="records", lines=True)
+        chunks = [chunk for chunk, _ in uploads.iter_upload_chunks(path, chunk_rows=2)]
+        self.assertListEqual(pd.concat(chunks)['text'].tolist(), ["a", "b", "c"])
+
+    def test_text_column_is_required(self):
+        path = os.path.join(self.tmp.name, "upload.csv")
+        pd.DataFrame({"body": ["a"]}).to_csv(path, index=False)
+        with self.assertRaises(ValueError):
+            list(uploads.iter_upload_chunks(path))
+
+    def test_job_registry_rejects_other_formats(self):
+        with self.assertRaises(ValueError):
+            uploads.upload_jobs.create(1, "data.xlsx", self.tmp.name)
+        job = uploads.upload_jobs.create(1, "data.csv", self.tmp.name)
+        self.assertIs(uploads.upload_jobs.get(job.job_id), job)
+        self.assertTrue(job.path.endswith(".csv"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+"""
+Topic extraction per sentiment, fitted incrementally while posts are aggregated.
+
+For every BERT sentiment a `MiniBatchNMF` is fitted with `partial_fit` on the
+classical models' feature rows (TF-IDF, or hashing features). The rows the
+classical pass already computed are reused (classical.FeatureRows), so posts
+are not vectorized a second time. Posts are buffered per sentiment and fitted
+in batches of TOPIC_BATCH_ROWS, so memory stays bounded by one batch plus the
+topic matrices however large the corpus is, and feeding the posts in chunks
+gives the same topics as feeding them at once. The posts that load most on
+each topic are kept as examples.
+
+With CLASSICAL_FEATURES=hashing there is no vocabulary to name topic terms
+by, and 2**18 columns would make every NMF update slow; topics then use a
+smaller unigram hashing space whose columns are named from the posts seen.
+"""
+import heapq
+import os
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.decomposition import MiniBatchNMF
+from sklearn.feature_extraction.text import HashingVectorizer
+
+TOPIC_EXTRACTION = os.getenv("TOPIC_EXTRACTION", "true").lower() in ("1", "true", "yes")
+TOPICS_PER_SENTIMENT = int(os.getenv("TOPICS_PER_SENTIMENT", "5"))
+TOPIC_BATCH_ROWS = int(os.getenv("TOPIC_BATCH_ROWS", "512"))
+# Sentiments with fewer posts get no topics
+TOPIC_MIN_POSTS = 20
+TOPIC_TERMS = 8
+TOPIC_EXAMPLE_POSTS = 3
+TOPIC_SENTIMENTS = ('negative', 'neutral', 'positive')
+# Without a fitted vocabulary: size of the unigram hashing space, and words whose column is remembered
+TOPIC_HASHING_FEATURES = 2 ** 15
+TOPIC_MAX_TERMS = 200000
+
+
+class PendingPosts:
+    """Posts of one sentiment waiting for a full batch: their feature rows, cleaned texts and texts."""
+
+    def __init__(self):
+        self._chunks = deque()  # (features, cleaned, texts); the first one is consumed from `_start`
+        self._start = 0
+        self._rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, features: sparse.csr_matrix, cleaned: List[str], texts: List[str]):
+        self._chunks.append((features, cleaned, texts))
+        self._rows += len(cleaned)
+
+    def take(self, n: Optional[int] = None) -> tuple:
+        """Remove and return the first `n` posts (all if None) as (features, [(cleaned, text)])."""
+        n = self._rows if n is None else min(n, self._rows)
+        features, rows = [], []
+        while len(rows) < n:
+            chunk_features, cleaned, texts = self._chunks[0]
+            stop = min(len(cleaned), self._start + n - len(rows))
+            features.append(chunk_features[self._start:stop])
+            rows.extend(zip(cleaned[self._start:stop], texts[self._start:stop]))
+            if stop == len(cleaned):
+                self._chunks.popleft()
+                self._start = 0
+            else:
+                self._start = stop
+        self._rows -= n
+        return sparse.vstack(features, format='csr'), rows
+
+    def clear(self):
+        self._chunks.clear()
+        self._start = self._rows = 0
+
+
+class SentimentTopics:
+    """Incremental NMF topics per BERT sentiment over a `ClassicalPipeline`'s features."""
+
+    def __init__(self, pipeline, n_topics: int = TOPICS_PER_SENTIMENT, batch_rows: int = TOPIC_BATCH_ROWS,
+                 sentiments: Sequence[str] = TOPIC_SENTIMENTS):
+        self.pipeline = pipeline
+        self.n_topics = n_topics
+        self.batch_rows = max(batch_rows, n_topics)
+        self.sentiments = tuple(sentiments)
+        self._models: Dict[str, MiniBatchNMF] = {}
+        self._pending: Dict[str, PendingPosts] = {s: PendingPosts() for s in self.sentiments}
+        self._posts: Counter = Counter()
+        self._loadings: Dict[str, np.ndarray] = {}  # sentiment -> summed weight per topic
+        self._examples: Dict[str, List[list]] = {}  # sentiment -> per topic min-heap of (weight, text)
+        if hasattr(pipeline.vectorizer, 'vocabulary_'):
+            self._vocabulary = np.asarray(pipeline.vectorizer.get_feature_names_out(), dtype=object)
+            self._transform = pipeline.transform
+        else:
+            self._vocabulary = None
+            self._transform = HashingVectorizer(n_features=TOPIC_HASHING_FEATURES, stop_words='english',
+                                                alternate_sign=False, norm='l2').transform
+        self._terms: Dict[int, str] = {}
+        self._seen_words = set()
+
+    def add(self, df: pd.DataFrame, feature_rows=None):
+        """
+        Buffer classified posts (cleaned_text, text, bert_sentiment); fits every full batch.
+        `feature_rows` (a classical.FeatureRows over the rows of `df`) holds the
+        features the classical pass computed, which are reused when topics use them.
+        """
+        if df.empty:
+            return
+        cleaned = df['cleaned_text'].astype(str).to_numpy(dtype=object)
+        texts = (df['text'] if 'text' in df.columns else df['cleaned_text']).astype(str).to_numpy(dtype=object)
+        sentiments = df['bert_sentiment'].to_numpy(dtype=object)
+        if self._vocabulary is not None and feature_rows is not None:
+            features = feature_rows.matrix(self.pipeline, cleaned)
+        else:
+            features = self._transform(cleaned)
+        for sentiment, pending in self._pending.items():
+            positions = np.flatnonzero(sentiments == sentiment)
+            if not len(positions):
+                continue
+            pending.append(features[positions], cleaned[positions].tolist(), texts[positions].tolist())
+            while len(pending) >= self.batch_rows:
+                self._fit(sentiment, *pending.take(self.batch_rows))
+
+    def finish(self):
+        """Fit the partially filled batches."""
+        for sentiment, pending in self._pending.items():
+            if len(pending) and (sentiment in self._models or len(pending) >= TOPIC_MIN_POSTS):
+                self._fit(sentiment, *pending.take())
+            pending.clear()
+
+    def _fit(self, sentiment: str, features: sparse.csr_matrix, rows: List[tuple]):
+        keep = np.flatnonzero(features.getnnz(axis=1) > 0)
+        model = self._models.get(sentiment)
+        if len(keep) == 0 or (model is None and len(keep) < self.n_topics):
+            return
+        features = features[keep]
+        if model is None:
+            model = self._models[sentiment] = MiniBatchNMF(n_components=self.n_topics, init='nndsvda',
+                                                           batch_size=self.batch_rows, random_state=0)
+            self._loadings[sentiment] = np.zeros(self.n_topics)
+            self._examples[sentiment] = [[] for _ in range(self.n_topics)]
+        model.partial_fit(features)
+        weights = model.transform(features)
+        self._posts[sentiment] += len(keep)
+        self._loadings[sentiment] += weights.sum(axis=0)
+        for topic, heap in enumerate(self._examples[sentiment]):
+            for i in np.argsort(-weights[:, topic])[:TOPIC_EXAMPLE_POSTS]:
+                entry = (float(weights[i, topic]), rows[keep[i]][1])
+                if entry[0] <= 0 or entry[1] in (text for _, text in heap):
+                    continue
+                if len(heap) < TOPIC_EXAMPLE_POSTS:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heappushpop(heap, entry)
+        if self._vocabulary is None:
+            self._remember_terms([cleaned for cleaned, _ in rows])
+
+    def _remember_terms(self, cleaned_texts: List[str]):
+        if len(self._seen_words) >= TOPIC_MAX_TERMS:
+            return
+        words = sorted({word for text in cleaned_texts for word in text.split()} - self._seen_words)
+        if not words:
+            return
+        self._seen_words.update(words)
+        # A one-word document hashes to that word's column only
+        columns = self._transform(words)
+        for row, word in enumerate(words):
+            indices = columns.indices[columns.indptr[row]:columns.indptr[row + 1]]
+            if len(indices) == 1:
+                self._terms.setdefault(int(indices[0]), word)
+
+    def _term(self, column: int) -> Optional[str]:
+        if self._vocabulary is not None:
+            return str(self._vocabulary[column])
+        return self._terms.get(column)
+
+    def summary(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Topics per sentiment, largest first: top terms, share of the sentiment's posts, example posts."""
+        self.finish()
+        result = {}
+        for sentiment, model in self._models.items():
+            loadings = self._loadings[sentiment]
+            total = loadings.sum()
+            topics = []
+            for topic, component in enumerate(model.components_):
+                terms = []
+                for column in np.argsort(-component):
+                    if component[column] <= 0 or len(terms) >= TOPIC_TERMS:
+                        break
+                    term = self._term(int(column))
+                    if term is not None:
+                        terms.append(term)
+                if not terms:
+                    continue
+                topics.append({
+                    "terms": terms,
+                    "share": round(float(loadings[topic] / total), 3) if total > 0 else 0.0,
+                    "posts": [text for _, text in sorted(self._examples[sentiment][topic], reverse=True)],
+                })
+            topics.sort(key=lambda t: t["share"], reverse=True)
+            result[sentiment] = topics
+        return result
+
+
+def describe_topics(topics: Dict[str, List[Dict[str, Any]]], terms_per_topic: int = 3) -> Optional[str]:
+    """One sentence per sentiment naming its two largest topics (None without topics)."""
+    sentences = []
+    for sentiment in TOPIC_SENTIMENTS:
+        parts = [f"{', '.join(topic['terms'][:terms_per_topic])} ({topic['share']:.0%})"
+                 for topic in topics.get(sentiment, [])[:2]]
+        if parts:
+            sentences.append(f"{sentiment.capitalize()} posts mostly discuss {' and '.join(parts)}.")
+    return " ".join(sentences) or None
+
+
+def fill_feature_rows(bundle, feature_rows, cleaned_texts: Sequence[str]):
+    """
+    Vectorize once the posts topics would need features for, before `feature_rows`
+    is split between several analyses that share posts (no-op when topics don't use them).
+    """
+    pipeline = bundle.models['classical']
+    if TOPIC_EXTRACTION and hasattr(pipeline.vectorizer, 'vocabulary_'):
+        feature_rows.fill(pipeline, cleaned_texts)
+
+
+def for_bundle(bundle) -> Optional[SentimentTopics]:
+    """A topic extractor over the classical features of a model bundle (None when TOPIC_EXTRACTION is off)."""
+    if not TOPIC_EXTRACTION:
+        return None
+    return SentimentTopics(bundle.models['classical'])
@@ -0,0 +1,178 @@
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument is optional, cProfile is always available
+    PyinstrumentProfiler = None
+
+# Per-request profiling is only honoured when explicitly enabled on the server
+ENABLE_REQUEST_PROFILING = os.getenv("ENABLE_REQUEST_PROFILING", "false").lower() in ("1", "true", "yes")
+PROFILER = os.getenv("PROFILER", "cprofile").lower()
+
+# Histogram buckets (seconds) for pipeline stage durations
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Minimal thread-safe Prometheus-style histogram with one label."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[label_value] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                label = f'{self.label}="{label_value}"'
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{label}}} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{{{label}}} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Minimal thread-safe Prometheus-style counter with one label."""
+
+    def __init__(self, name: str, help_text: str, label: str):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._lock = threading.Lock()
+        self._values: Dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_value, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{{self.label}="{label_value}"}} {value:g}')
+        return lines
+
+
+STAGE_DURATION = Histogram(
+    "analysis_stage_duration_seconds",
+    "Duration of each analysis pipeline stage.",
+    "stage",
+)
+STAGE_ROWS = Counter(
+    "analysis_stage_rows_total",
+    "Rows processed by each analysis pipeline stage.",
+    "stage",
+)
+
+
+class PipelineTrace:
+    """
+    Records per-stage durations and row counts for a single analysis.
+
+    Usage:
+        trace = PipelineTrace()
+        with trace.stage("bert", rows=len(df)):
+            ...
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        record = {"stage": name, "rows": rows}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            duration = time.perf_counter() - start
+            record["durationMs"] = round(duration * 1000, 3)
+            self.stages.append(record)
+            STAGE_DURATION.observe(name, duration)
+            if record["rows"] is not None:
+                STAGE_ROWS.inc(name, record["rows"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": list(self.stages),
+            "totalMs": round((time.perf_counter() - self._start) * 1000, 3),
+        }
+
+    def server_timing_header(self) -> str:
+        """Format the stages as a `Server-Timing` header value."""
+        return ", ".join(f"{s['stage']};dur={s['durationMs']}" for s in self.stages)
+
+
+@contextmanager
+def stage(trace: Optional[PipelineTrace], name: str, rows: Optional[int] = None):
+    """Like `trace.stage(...)` but a no-op when no trace is given."""
+    if trace is None:
+        yield {"stage": name, "rows": rows}
+    else:
+        with trace.stage(name, rows=rows) as record:
+            yield record
+
+
+@contextmanager
+def profile_request(enabled: bool, output_path: str):
+    """
+    Capture a profile of the enclosed block when `enabled` and server-side
+    profiling is switched on (ENABLE_REQUEST_PROFILING). Writes a `.prof`
+    file for cProfile or an `.html` report for pyinstrument.
+    Yields the written path, or None when profiling is off.
+    """
+    result = {"path": None}
+    if not (enabled and ENABLE_REQUEST_PROFILING):
+        yield result
+        return
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if PROFILER == "pyinstrument" and PyinstrumentProfiler is not None:
+        profiler = PyinstrumentProfiler(async_mode="enabled")
+        profiler.start()
+        try:
+            yield result
+        finally:
+            profiler.stop()
+            result["path"] = f"{output_path}.html"
+            with open(result["path"], "w") as f:
+                f.write(profiler.output_html())
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result["path"] = f"{output_path}.prof"
+            profiler.dump_stats(result["path"])
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of all pipeline metrics."""
+    lines = STAGE_DURATION.render() + STAGE_ROWS.render()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Optional
+
+import pandas as pd
+
+from .fetch_scheduler import FetchScheduler, get_fetch_scheduler, normalize_query
+
+TWEET_CACHE_TTL = float(os.getenv("TWEET_CACHE_TTL", "300"))
+TWEET_CACHE_MAX_MB = float(os.getenv("TWEET_CACHE_MAX_MB", "256"))
+
+
+@dataclass
+class CacheEntry:
+    df: pd.DataFrame
+    max_results: int
+    since_id: Optional[int]
+    nbytes: int
+    created_at: float = field(default_factory=time.monotonic)
+    refreshed_at: float = field(default_factory=time.monotonic)
+
+
+def newest_tweet_id(df: pd.DataFrame) -> Optional[int]:
+    if df.empty or 'id' not in df.columns:
+        return None
+    return int(pd.to_numeric(df['id'], errors='coerce').max())
+
+
+class TweetCache:
+    """
+    TTL cache of preprocessed live-search results keyed by normalized query text.
+    Bounded by the total in-memory size of the cached DataFrames (LRU eviction).
+    """
+
+    def __init__(self, ttl: float = TWEET_CACHE_TTL, max_bytes: int = int(TWEET_CACHE_MAX_MB * 1024 * 1024)):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, query: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """Return the entry for a query, or None. Expired entries count only with `allow_stale`."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not allow_stale and time.monotonic() - entry.refreshed_at > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, query: str, df: pd.DataFrame, max_results: int) -> CacheEntry:
+        key = normalize_query(query)
+        entry = CacheEntry(
+            df=df,
+            max_results=max_results,
+            since_id=newest_tweet_id(df),
+            nbytes=int(df.memory_usage(deep=True).sum()),
+        )
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+                entry.created_at = previous.created_at
+            if entry.nbytes > self.max_bytes:
+                # Too large to cache at all
+                return entry
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+        }
+
+    def render_metrics(self) -> str:
+        """Prometheus exposition of the cache counters."""
+        lines = []
+        for name, value in [
+            ("tweet_cache_hits_total", self.hits),
+            ("tweet_cache_misses_total", self.misses),
+            ("tweet_cache_refreshes_total", self.refreshes),
+            ("tweet_cache_evictions_total", self.evictions),
+        ]:
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        lines += ["# TYPE tweet_cache_bytes gauge", f"tweet_cache_bytes {self.bytes}"]
+        return "\n".join(lines) + "\n"
+
+
+tweet_cache = TweetCache()
+
+
+async def fetch_live_tweets(query: str, max_results: int, user_key: Hashable = None,
+                            incremental: bool = False, cache: TweetCache = None,
+                            scheduler: FetchScheduler = None) -> pd.DataFrame:
+    """
+    Preprocessed tweets for a live query, served from the cache when possible.
+
+    * fresh hit: return the cached rows without calling the API
+    * incremental: fetch only tweets newer than the cached `since_id` and
+      prepend them to the cached rows (works on stale entries too)
+    * miss: run a full search through the fetch scheduler and cache it
+    """
+    cache = tweet_cache if cache is None else cache
+    scheduler = get_fetch_scheduler() if scheduler is None else scheduler
+
+    if incremental:
+        entry = cache.get(query, allow_stale=True)
+        if entry is not None and entry.max_results >= max_results and entry.since_id is not None:
+            cache.refreshes += 1
+            new_rows = await scheduler.fetch(query, max_results=max_results, user_key=user_key,
+                                             since_id=entry.since_id)
+            df = entry.df
+            if not new_rows.empty:
+                df = pd.concat([new_rows, entry.df], ignore_index=True)
+                df = df.drop_duplicates(subset='id', keep='first').head(entry.max_results).reset_index(drop=True)
+            entry = cache.put(query, df, entry.max_results)
+            return entry.df.head(max_results).copy()
+    else:
+        entry = cache.get(query)
+        if entry is not None and entry.max_results >= max_results:
+            cache.hits += 1
+            return entry.df.head(max_results).copy()
+
+    cache.misses += 1
+    df = await scheduler.fetch(query, max_results=max_results, user_key=user_key)
+    if not df.empty:
+        cache.put(query, df, max_results)
+    return df.copy()
@@ -5,7 +5,9 @@ import re
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
-from typing import List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator
 from dotenv import load_dotenv
 import logging
 
@@ -22,15 +24,34 @@ except Exception as e:
 
 logger = logging.getLogger(__name__)
 
+# Twitter API v2 recent search accepts 10-100 results per page
+MIN_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+# Rate-limit handling for paginated collection
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('TWITTER_RATE_LIMIT_RETRIES', '3'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('TWITTER_RATE_LIMIT_MAX_WAIT', '60'))
+RATE_LIMIT_INITIAL_BACKOFF = 2.0
+
 class TwitterClient:
-    def __init__(self):
-        """Initialize Twitter API client with Bearer Token"""
-        self.bearer_token = os.getenv('TWITTER_BEARER_TOKEN')
-        if not self.bearer_token:
-            raise ValueError("TWITTER_BEARER_TOKEN not found in environment variables")
+    def __init__(self, client: tweepy.Client = None):
+        """
+        Initialize Twitter API client with Bearer Token
         
-        # Initialize Tweepy client with Bearer Token
-        self.client = tweepy.Client(bearer_token=self.bearer_token)
+        Args:
+            client: Optional pre-built tweepy client (e.g. the local API stub);
+                    when omitted one is created from TWITTER_BEARER_TOKEN
+        """
+        if client is not None:
+            self.bearer_token = client.bearer_token
+            self.client = client
+        else:
+            self.bearer_token = os.getenv('TWITTER_BEARER_TOKEN')
+            if not self.bearer_token:
+                raise ValueError("TWITTER_BEARER_TOKEN not found in environment variables")
+            
+            # Initialize Tweepy client with Bearer Token
+            self.client = tweepy.Client(bearer_token=self.bearer_token)
         
         # Initialize text preprocessing tools
         self.lemmatizer = WordNetLemmatizer()
@@ -51,78 +72,155 @@ class TwitterClient:
                 'further', 'then', 'once'
             }
     
-    def search_tweets(self, query: str, max_results: int = 100) -> pd.DataFrame:
+    def search_tweets(self, query: str, max_results: int = 100, since_id: int = None) -> pd.DataFrame:
         """
         Search for tweets based on a query and return as DataFrame
         
         Args:
             query: Search query for tweets
-            max_results: Maximum number of tweets to fetch (10-100)
+            max_results: Maximum number of tweets to fetch (at least 10); more than
+                         100 follows the API's pagination
+            since_id: Only return tweets newer than this tweet id
             
         Returns:
-            DataFrame with columns: text, created_at, author_id, public_metrics
+            DataFrame with columns: id, text, created_at, author_id, username and public metrics
         """
+        chunks = [chunk for chunk in self.iter_tweet_pages(query, total=max_results, since_id=since_id) if not chunk.empty]
+        
+        if not chunks:
+            logger.warning(f"No English tweets found for query: {query}")
+            return pd.DataFrame(columns=['id', 'text', 'created_at', 'author_id', 'username'])
+        
+        df = pd.concat(chunks, ignore_index=True)
+        logger.info(f"Successfully fetched {len(df)} tweets for query: {query}")
+        return df
+    
+    def iter_tweet_pages(self, query: str, total: int = 100, page_size: int = MAX_PAGE_SIZE,
+                         since_id: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Fetch up to `total` tweets for a query, following `next_token` pagination.
+        
+        Yields one DataFrame per page as soon as it arrives. The next page is
+        requested in the background while the caller processes the current one.
+        Rate-limit responses are retried after the window resets (see `_fetch_page`).
+        
+        Args:
+            query: Search query for tweets
+            total: Maximum number of tweets to fetch across all pages
+            page_size: Tweets requested per call (10-100)
+            since_id: Only return tweets newer than this tweet id
+        """
+        total = max(total, MIN_PAGE_SIZE)
+        page_size = min(max(page_size, MIN_PAGE_SIZE), MAX_PAGE_SIZE)
+        
+        def request_page(next_token, remaining):
+            return self._fetch_page(query, min(page_size, max(remaining, MIN_PAGE_SIZE)), next_token, since_id)
+        
         try:
-            # Ensure max_results is within Twitter API limits
-            max_results = min(max(max_results, 10), 100)
-            
-            # Search for tweets
-            tweets = self.client.search_recent_tweets(
-                query=query,
-                max_results=max_results,
-                tweet_fields=['created_at', 'author_id', 'public_metrics', 'lang'],
-                expansions=['author_id'],
-                user_fields=['username', 'name']
-            )
-            
-            if not tweets.data:
-                logger.warning(f"No tweets found for query: {query}")
-                return pd.DataFrame(columns=['text', 'created_at', 'author_id', 'username'])
-            
-            # Convert tweets to list of dictionaries
-            tweet_data = []
-            users_dict = {}
-            
-            # Create users dictionary if users data is available
-            if tweets.includes and 'users' in tweets.includes:
-                users_dict = {user.id: user.username for user in tweets.includes['users']}
-            
-            for tweet in tweets.data:
-                # Skip non-English tweets to improve analysis quality
-                if hasattr(tweet, 'lang') and tweet.lang != 'en':
-                    continue
+            with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                fetched = 0
+                pending = prefetcher.submit(request_page, None, total)
+                while pending is not None:
+                    tweets = pending.result()
+                    pending = None
                     
-                tweet_info = {
-                    'text': tweet.text,
-                    'created_at': tweet.created_at,
-                    'author_id': tweet.author_id,
-                    'username': users_dict.get(tweet.author_id, 'unknown'),
-                    'retweet_count': tweet.public_metrics['retweet_count'] if tweet.public_metrics else 0,
-                    'like_count': tweet.public_metrics['like_count'] if tweet.public_metrics else 0,
-                    'reply_count': tweet.public_metrics['reply_count'] if tweet.public_metrics else 0
-                }
-                tweet_data.append(tweet_info)
-            
-            if not tweet_data:
-                logger.warning(f"No English tweets found for query: {query}")
-                return pd.DataFrame(columns=['text', 'created_at', 'author_id', 'username'])
-            
-            df = pd.DataFrame(tweet_data)
-            logger.info(f"Successfully fetched {len(df)} tweets for query: {query}")
-            return df
-            
-        except tweepy.TooManyRequests:
+                    # The API returns at least 10 tweets per page, so the last page may overshoot `total`
+                    remaining = total - fetched
+                    page_count = len(tweets.data) if tweets.data else 0
+                    fetched += page_count
+                    next_token = (tweets.meta or {}).get('next_token')
+                    
+                    # Start fetching the next page before handing this one to the caller
+                    if next_token and page_count and fetched < total:
+                        pending = prefetcher.submit(request_page, next_token, total - fetched)
+                    
+                    yield self._tweets_to_dataframe(tweets).head(remaining)
+        except Exception as e:
+            self._raise_api_error(e)
+    
+    def _fetch_page(self, query: str, max_results: int, next_token: str = None, since_id: int = None):
+        """
+        Make one search_recent_tweets call, waiting out rate limits.
+        
+        On TooManyRequests the call is retried after the `x-rate-limit-reset`
+        time from the response headers (or an exponential backoff when the
+        header is missing), up to RATE_LIMIT_MAX_RETRIES times and never
+        waiting longer than RATE_LIMIT_MAX_WAIT seconds in total.
+        """
+        params = {
+            'query': query,
+            'max_results': max_results,
+            'tweet_fields': ['created_at', 'author_id', 'public_metrics', 'lang'],
+            'expansions': ['author_id'],
+            'user_fields': ['username', 'name']
+        }
+        if next_token:
+            params['next_token'] = next_token
+        if since_id:
+            params['since_id'] = since_id
+        
+        backoff = RATE_LIMIT_INITIAL_BACKOFF
+        waited = 0.0
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            try:
+                return self.client.search_recent_tweets(**params)
+            except tweepy.TooManyRequests as e:
+                reset = (getattr(e.response, 'headers', None) or {}).get('x-rate-limit-reset')
+                wait = max(float(reset) - time.time(), 0) + 1 if reset else backoff
+                if attempt == RATE_LIMIT_MAX_RETRIES or waited + wait > RATE_LIMIT_MAX_WAIT:
+                    raise
+                logger.warning(f"Twitter API rate limit hit, retrying in {wait:.1f}s")
+                time.sleep(wait)
+                waited += wait
+                backoff *= 2
+    
+    def _tweets_to_dataframe(self, tweets) -> pd.DataFrame:
+        """Convert one search_recent_tweets response into a DataFrame of English tweets."""
+        if not tweets.data:
+            return pd.DataFrame(columns=['id', 'text', 'created_at', 'author_id', 'username'])
+        
+        # Convert tweets to list of dictionaries
+        tweet_data = []
+        users_dict = {}
+        
+        # Create users dictionary if users data is available
+        if tweets.includes and 'users' in tweets.includes:
+            users_dict = {user.id: user.username for user in tweets.includes['users']}
+        
+        for tweet in tweets.data:
+            # Skip non-English tweets to improve analysis quality
+            if hasattr(tweet, 'lang') and tweet.lang != 'en':
+                continue
+                
+            tweet_info = {
+                'id': tweet.id,
+                'text': tweet.text,
+                'created_at': tweet.created_at,
+                'author_id': tweet.author_id,
+                'username': users_dict.get(tweet.author_id, 'unknown'),
+                'retweet_count': tweet.public_metrics['retweet_count'] if tweet.public_metrics else 0,
+                'like_count': tweet.public_metrics['like_count'] if tweet.public_metrics else 0,
+                'reply_count': tweet.public_metrics['reply_count'] if tweet.public_metrics else 0
+            }
+            tweet_data.append(tweet_info)
+        
+        if not tweet_data:
+            return pd.DataFrame(columns=['id', 'text', 'created_at', 'author_id', 'username'])
+        return pd.DataFrame(tweet_data)
+    
+    def _raise_api_error(self, error: Exception):
+        """Translate tweepy errors into the messages the API layer reports."""
+        if isinstance(error, tweepy.TooManyRequests):
             logger.error("Twitter API rate limit exceeded")
             raise Exception("Twitter API rate limit exceeded. Please try again later.")
-        except tweepy.Unauthorized:
+        if isinstance(error, tweepy.Unauthorized):
             logger.error("Twitter API unauthorized - check bearer token")
             raise Exception("Twitter API authentication failed. Please check your bearer token.")
-        except tweepy.NotFound:
+        if isinstance(error, tweepy.NotFound):
             logger.error("Twitter API endpoint not found")
             raise Exception("Twitter API endpoint not found.")
-        except Exception as e:
-            logger.error(f"Error fetching tweets: {str(e)}")
-            raise Exception(f"Failed to fetch tweets from Twitter API: {str(e)}")
+        logger.error(f"Error fetching tweets: {str(error)}")
+        raise Exception(f"Failed to fetch tweets from Twitter API: {str(error)}")
     
     def clean_tweet_text(self, text: str) -> str:
         """
@@ -196,5 +294,11 @@ class TwitterClient:
         return df.reset_index(drop=True)
 
 def get_twitter_client() -> TwitterClient:
-    """Factory function to get Twitter client instance"""
+    """
+    Factory function to get Twitter client instance.
+    Set TWITTER_API_STUB=1 to use the local API stand-in (see twitter_stub.py).
+    """
+    if os.getenv('TWITTER_API_STUB', '').lower() in ('1', 'true', 'yes'):
+        from .twitter_stub import create_stub_client
+        return TwitterClient(client=create_stub_client())
     return TwitterClient()
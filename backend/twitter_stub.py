@@ -0,0 +1,306 @@
+"""
+Local stand-in for the Twitter v2 recent-search API.
+
+Two ways to use it:
+  * In-process: `StubTwitterClient` is a `tweepy.Client` whose HTTP layer is
+    replaced by `FakeTweetSource`, so tweepy's own response parsing and error
+    handling still run. Enabled for the API with TWITTER_API_STUB=1.
+  * Over HTTP: `python -m backend.twitter_stub --port 8765` serves
+    /2/tweets/search/recent from a `FakeTweetSource`. Point the API at it with
+    TWITTER_API_STUB=1 TWITTER_STUB_URL=http://127.0.0.1:8765 so that several
+    workers share one rate-limit window, like they would against Twitter.
+
+Latency, page sizes, result counts and the rate-limit window are configurable.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import tweepy
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_ROUTE = "/2/tweets/search/recent"
+FIRST_TWEET_ID = 1_600_000_000_000_000_000
+
+DEFAULT_TEXTS = [
+    "I love this product! It's amazing!",
+    "This is terrible, worst experience ever",
+    "It's okay, nothing special",
+    "Absolutely fantastic! Highly recommend",
+    "Not good at all, very disappointed",
+    "Pretty decent, could be better",
+]
+
+
+def load_stub_texts(path: str = os.path.join(BASE_DIR, "sample_tweets.csv")) -> List[str]:
+    """Use the sample corpus as tweet bodies when it is available."""
+    try:
+        import pandas as pd
+        df = pd.read_csv(path)
+        column = 'text' if 'text' in df.columns else 'Text'
+        texts = [str(text).strip() for text in df[column].dropna()]
+        return texts or DEFAULT_TEXTS
+    except Exception:
+        return DEFAULT_TEXTS
+
+
+class FakeTweetSource:
+    """
+    Deterministic generator of recent-search responses.
+
+    Each query has `total_results` tweets available, growing by
+    `new_tweets_per_minute` over time so `since_id` polling sees new data.
+    Results are returned newest first and paginated with `next_token`.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, page_size: int = 100,
+                 total_results: int = 500, rate_limit: int = 450, window_seconds: float = 900,
+                 new_tweets_per_minute: float = 0.0, texts: Optional[List[str]] = None, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.total_results = total_results
+        self.rate_limit = rate_limit
+        self.window_seconds = window_seconds
+        self.new_tweets_per_minute = new_tweets_per_minute
+        self.texts = texts or load_stub_texts()
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._window_start = self._started
+        self._window_calls = 0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _take_rate_limit_slot(self) -> Tuple[bool, Dict[str, str]]:
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.window_seconds:
+                self._window_start = now
+                self._window_calls = 0
+            reset = int(self._window_start + self.window_seconds)
+            allowed = self._window_calls < self.rate_limit
+            if allowed:
+                self._window_calls += 1
+            else:
+                self.rate_limited += 1
+            self.calls += 1
+            headers = {
+                "x-rate-limit-limit": str(self.rate_limit),
+                "x-rate-limit-remaining": str(max(0, self.rate_limit - self._window_calls)),
+                "x-rate-limit-reset": str(reset),
+            }
+            return allowed, headers
+
+    def _available(self) -> int:
+        minutes = (time.time() - self._started) / 60
+        return self.total_results + int(self.new_tweets_per_minute * minutes)
+
+    def _make_tweet(self, query: str, position: int, newest_position: int) -> Dict[str, Any]:
+        tweet_id = FIRST_TWEET_ID + position
+        rng = random.Random(self.seed * 1_000_003 + position)
+        author_id = str(1000 + position % 50)
+        created_at = datetime.now(timezone.utc) - timedelta(minutes=newest_position - position)
+        return {
+            "id": str(tweet_id),
+            "edit_history_tweet_ids": [str(tweet_id)],
+            "text": f"{rng.choice(self.texts)} #{query.split()[0] if query.split() else 'stub'}",
+            "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "author_id": author_id,
+            "lang": "en",
+            "public_metrics": {
+                "retweet_count": rng.randint(0, 50),
+                "reply_count": rng.randint(0, 10),
+                "like_count": rng.randint(0, 200),
+                "quote_count": 0,
+            },
+        }
+
+    def search_recent(self, params: Dict[str, Any]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Return (status_code, headers, json_payload) for a recent-search call."""
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        allowed, headers = self._take_rate_limit_slot()
+        if not allowed:
+            return 429, headers, {"title": "Too Many Requests", "detail": "Too Many Requests", "status": 429}
+
+        query = str(params.get("query", ""))
+        max_results = min(int(params.get("max_results", 10)), self.page_size)
+        offset = int(str(params.get("next_token") or "page-0").split("-")[-1])
+        since_id = int(params["since_id"]) if params.get("since_id") else None
+
+        newest_position = self._available() - 1
+        positions = []
+        position = newest_position - offset
+        while position >= 0 and len(positions) < max_results:
+            if since_id is not None and FIRST_TWEET_ID + position <= since_id:
+                break
+            positions.append(position)
+            position -= 1
+
+        tweets = [self._make_tweet(query, p, newest_position) for p in positions]
+        has_more = bool(positions) and position >= 0 and (since_id is None or FIRST_TWEET_ID + position > since_id)
+        meta = {"result_count": len(tweets)}
+        if tweets:
+            meta["newest_id"] = tweets[0]["id"]
+            meta["oldest_id"] = tweets[-1]["id"]
+        if has_more:
+            meta["next_token"] = f"page-{offset + len(tweets)}"
+
+        payload = {"meta": meta}
+        if tweets:
+            author_ids = sorted({t["author_id"] for t in tweets})
+            payload["data"] = tweets
+            payload["includes"] = {
+                "users": [{"id": a, "name": f"Stub User {a}", "username": f"user{a}"} for a in author_ids]
+            }
+        return 200, headers, payload
+
+
+class FakeHTTPResponse:
+    """The subset of `requests.Response` that tweepy reads."""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], payload: Dict[str, Any]):
+        self.status_code = status_code
+        self.reason = "OK" if status_code == 200 else "Too Many Requests" if status_code == 429 else "Error"
+        self.headers = headers
+        self._payload = payload
+        self.content = json.dumps(payload).encode()
+
+    def json(self):
+        return self._payload
+
+
+class StubTwitterClient(tweepy.Client):
+    """
+    `tweepy.Client` that talks to a `FakeTweetSource` (in-process) or to a
+    stub server at `base_url` instead of api.twitter.com.
+    """
+
+    def __init__(self, source: Optional[FakeTweetSource] = None, base_url: Optional[str] = None, **kwargs):
+        super().__init__(bearer_token="stub-token", **kwargs)
+        self.source = source or FakeTweetSource()
+        self.base_url = base_url.rstrip("/") if base_url else None
+
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        if self.base_url:
+            response = self.session.request(
+                method, self.base_url + route, params=params, json=json,
+                headers={"Authorization": f"Bearer {self.bearer_token}"}
+            )
+        elif route == SEARCH_ROUTE:
+            response = FakeHTTPResponse(*self.source.search_recent(params or {}))
+        else:
+            response = FakeHTTPResponse(404, {}, {"title": "Not Found Error", "detail": route})
+
+        if response.status_code == 429:
+            raise tweepy.TooManyRequests(response)
+        if response.status_code == 404:
+            raise tweepy.NotFound(response)
+        if not 200 <= response.status_code < 300:
+            raise tweepy.HTTPException(response)
+        return response
+
+
+_stub_source = None
+
+
+def stub_source_from_env() -> FakeTweetSource:
+    """Process-wide fake source configured from TWITTER_STUB_* environment variables."""
+    global _stub_source
+    if _stub_source is None:
+        _stub_source = FakeTweetSource(
+            latency=float(os.getenv("TWITTER_STUB_LATENCY", "0.1")),
+            jitter=float(os.getenv("TWITTER_STUB_JITTER", "0.0")),
+            page_size=int(os.getenv("TWITTER_STUB_PAGE_SIZE", "100")),
+            total_results=int(os.getenv("TWITTER_STUB_TOTAL", "500")),
+            rate_limit=int(os.getenv("TWITTER_STUB_RATE_LIMIT", "450")),
+            window_seconds=float(os.getenv("TWITTER_STUB_WINDOW", "900")),
+            new_tweets_per_minute=float(os.getenv("TWITTER_STUB_NEW_PER_MINUTE", "0")),
+        )
+    return _stub_source
+
+
+def create_stub_client() -> StubTwitterClient:
+    """Build the stub client used when TWITTER_API_STUB is set."""
+    base_url = os.getenv("TWITTER_STUB_URL")
+    if base_url:
+        return StubTwitterClient(base_url=base_url)
+    return StubTwitterClient(source=stub_source_from_env())
+
+
+# --- HTTP stub server ---
+def make_handler(source: FakeTweetSource):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != SEARCH_ROUTE:
+                status, headers, payload = 404, {}, {"title": "Not Found Error", "detail": url.path}
+            else:
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, headers, payload = source.search_recent(params)
+
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(source: Optional[FakeTweetSource] = None, host: str = "127.0.0.1",
+                      port: int = 0) -> ThreadingHTTPServer:
+    """Start a stub server on a background thread. Use port=0 for a free port."""
+    server = ThreadingHTTPServer((host, port), make_handler(source or FakeTweetSource()))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Twitter recent-search API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency")
+    parser.add_argument("--page-size", type=int, default=100, help="Maximum tweets per page")
+    parser.add_argument("--total", type=int, default=500, help="Tweets available per query")
+    parser.add_argument("--rate-limit", type=int, default=450, help="Requests allowed per window")
+    parser.add_argument("--window", type=float, default=900, help="Rate-limit window in seconds")
+    parser.add_argument("--new-per-minute", type=float, default=0.0, help="New tweets appearing per minute")
+    args = parser.parse_args(argv)
+
+    source = FakeTweetSource(
+        latency=args.latency, jitter=args.jitter, page_size=args.page_size, total_results=args.total,
+        rate_limit=args.rate_limit, window_seconds=args.window, new_tweets_per_minute=args.new_per_minute,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(source))
+    print(f"Twitter API stub listening on http://{args.host}:{args.port}{SEARCH_ROUTE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+from . import analysis, topics
+from .aggregation import SentimentAggregator
+from .classical import FeatureRows
+from .corpus import CorpusIndex
+
+logger = logging.getLogger(__name__)
+
+# Rows cleaned and classified per chunk; memory use is bounded by this, not the file size
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "2000"))
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "1024"))
+UPLOAD_READ_SIZE = 1024 * 1024
+# Rows of rawData kept in the stored response (the full file would not fit in it)
+UPLOAD_RAW_DATA_LIMIT = int(os.getenv("UPLOAD_RAW_DATA_LIMIT", "1000"))
+# Finished jobs are forgotten after this many seconds
+UPLOAD_JOB_TTL = float(os.getenv("UPLOAD_JOB_TTL", "3600"))
+UPLOAD_EXTENSIONS = (".csv", ".jsonl")
+
+
+@dataclass
+class UploadJob:
+    job_id: str
+    user_id: int
+    filename: str
+    path: str
+    total_bytes: int = 0
+    bytes_processed: int = 0
+    rows_processed: int = 0
+    status: str = "uploading"  # uploading -> queued -> processing -> completed / failed
+    analysis_id: Optional[str] = None
+    model_versions: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    updated_at: float = field(default_factory=time.time)
+    task: Any = field(default=None, repr=False)  # keeps the background task referenced
+
+    def as_dict(self) -> Dict[str, Any]:
+        progress = self.bytes_processed / self.total_bytes if self.total_bytes else 0.0
+        if self.status == "completed":
+            progress = 1.0
+        return {
+            "jobId": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "rowsProcessed": self.rows_processed,
+            "bytesProcessed": self.bytes_processed,
+            "totalBytes": self.total_bytes,
+            "progress": round(progress, 4),
+            "analysisId": self.analysis_id,
+            "error": self.error,
+        }
+
+
+class UploadJobs:
+    """In-memory registry of upload analysis jobs (per process)."""
+
+    def __init__(self):
+        self._jobs: Dict[str, UploadJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self, user_id: int, filename: str, upload_dir: str) -> UploadJob:
+        extension = os.path.splitext(filename or "")[1].lower()
+        if extension not in UPLOAD_EXTENSIONS:
+            raise ValueError("Upload must be a .csv or .jsonl file")
+        os.makedirs(upload_dir, exist_ok=True)
+        job_id = str(uuid.uuid4())
+        job = UploadJob(job_id=job_id, user_id=user_id, filename=os.path.basename(filename),
+                        path=os.path.join(upload_dir, job_id + extension))
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - UPLOAD_JOB_TTL
+        for job_id, job in list(self._jobs.items()):
+            if job.status in ("completed", "failed") and job.updated_at < cutoff:
+                del self._jobs[job_id]
+
+
+upload_jobs = UploadJobs()
+
+
+def iter_upload_chunks(path: str, chunk_rows: int = UPLOAD_CHUNK_ROWS) -> Iterator[tuple]:
+    """
+    Yield (chunk, bytes read so far) for a CSV or JSON-lines file.
+    Columns are normalized like the local corpus (lowercase, stripped); a `text` column is required.
+    """
+    with open(path, "rb") as f:
+        if path.lower().endswith(".jsonl"):
+            reader = pd.read_json(f, lines=True, chunksize=chunk_rows)
+        else:
+            reader = pd.read_csv(f, chunksize=chunk_rows)
+        for chunk in reader:
+            if 'text' not in [str(c).strip().lower() for c in chunk.columns]:
+                raise ValueError("Uploaded file must have a 'text' column")
+            chunk = CorpusIndex.normalize_columns(chunk)
+            chunk = chunk[chunk['text'] != ''].reset_index(drop=True)
+            yield chunk, f.tell()
+
+
+def process_upload(job: UploadJob, chunk_rows: int = UPLOAD_CHUNK_ROWS) -> SentimentAggregator:
+    """Clean, classify and aggregate the uploaded file chunk by chunk (runs on a worker thread)."""
+    job.status = "processing"
+    # Every chunk uses the same models, even if a new version is activated meanwhile
+    bundle = analysis.model_registry.active()
+    aggregator = SentimentAggregator(raw_data_limit=UPLOAD_RAW_DATA_LIMIT, topics=topics.for_bundle(bundle))
+    job.model_versions = bundle.describe()
+    for chunk, bytes_read in iter_upload_chunks(job.path, chunk_rows):
+        if not chunk.empty:
+            feature_rows = FeatureRows(len(chunk))
+            aggregator.add(analysis.run_analysis(chunk, bundle=bundle, feature_rows=feature_rows), feature_rows)
+        job.rows_processed += len(chunk)
+        job.bytes_processed = min(bytes_read, job.total_bytes)
+        job.updated_at = time.time()
+    if aggregator.total == 0:
+        raise ValueError("Uploaded file has no posts with text")
+    return aggregator